@@ -0,0 +1,112 @@
+"""
+批量评分命令行工具：分块流式读取 CSV，计算每行收入/资产的百分位和绝对排名
+
+用法:
+    python batch_score.py customers.csv -o scored.csv
+    cat customers.csv | python batch_score.py - --chunk-size 100000 > scored.csv
+"""
+import argparse
+import csv
+import math
+import sys
+
+from country_dataset import load_dataset
+from quantile_tables import load_quantile_tables
+from wealth_model import COUNTRY_DATA, score_batch
+
+OUTPUT_FIELDS = ["income_percentile", "income_rank", "wealth_percentile", "wealth_rank"]
+
+
+def _to_float(raw):
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _format_percentile(value):
+    return "" if math.isnan(value) else repr(float(value))
+
+
+def _format_rank(value):
+    return "" if math.isnan(value) else str(int(value))
+
+
+def iter_chunks(reader, chunk_size):
+    """按固定行数切分 CSV 行，内存占用只与 chunk_size 有关"""
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_stream(infile, outfile, country_col="country", income_col="income", wealth_col="wealth", chunk_size=100000, quantile_tables=None, country_data=COUNTRY_DATA):
+    """
+    流式评分：读入一块、向量化计算一块、写出一块
+    :return: 处理的总行数
+    """
+    reader = csv.reader(infile)
+    header = next(reader, None)
+    if header is None:
+        return 0
+    try:
+        c_idx, i_idx, w_idx = (header.index(col) for col in (country_col, income_col, wealth_col))
+    except ValueError as e:
+        raise SystemExit(f"CSV 缺少必需的列: {e}")
+
+    writer = csv.writer(outfile)
+    writer.writerow(header + OUTPUT_FIELDS)
+    total = 0
+    for chunk in iter_chunks(reader, chunk_size):
+        result = score_batch(
+            [row[c_idx].strip().upper() for row in chunk],
+            [_to_float(row[i_idx]) for row in chunk],
+            [_to_float(row[w_idx]) for row in chunk],
+            country_data=country_data,
+            quantile_tables=quantile_tables,
+        )
+        columns = zip(
+            map(_format_percentile, result["income_percentile"].tolist()),
+            map(_format_rank, result["income_rank"].tolist()),
+            map(_format_percentile, result["wealth_percentile"].tolist()),
+            map(_format_rank, result["wealth_rank"].tolist()),
+        )
+        writer.writerows(row + list(extra) for row, extra in zip(chunk, columns))
+        total += len(chunk)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量计算 CSV 中每条记录的收入/资产百分位与绝对排名")
+    parser.add_argument("input", help="输入 CSV 路径，'-' 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出 CSV 路径，默认标准输出")
+    parser.add_argument("--country-col", default="country", help="国家代码列名 (默认: country)")
+    parser.add_argument("--income-col", default="income", help="年收入列名 (默认: income)")
+    parser.add_argument("--wealth-col", default="wealth", help="净资产列名 (默认: wealth)")
+    parser.add_argument("--dataset", default=None, help="国家数据文件 (JSON/CSV/Parquet)，默认使用内置数据")
+    parser.add_argument("--quantile-file", default=None, help="经验分位数表 (CSV/JSON)，提供后相应国家改用分位数表")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="每块处理的行数 (默认: 100000)")
+    args = parser.parse_args(argv)
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size 必须为正整数")
+
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        tables = load_quantile_tables(args.quantile_file) if args.quantile_file else None
+        countries = load_dataset(args.dataset).records if args.dataset else COUNTRY_DATA
+        total = score_stream(infile, outfile, args.country_col, args.income_col, args.wealth_col, args.chunk_size, tables, countries)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print(f"已处理 {total} 行", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
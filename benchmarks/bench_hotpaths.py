@@ -0,0 +1,201 @@
+"""
+计算与渲染热点的微基准测试
+
+    python benchmarks/bench_hotpaths.py -o bench.json                  # 运行并写入 JSON
+    python benchmarks/bench_hotpaths.py --compare baseline.json        # 与基线比较，退化时退出码为 1
+
+升级 Streamlit / matplotlib / numpy 前后各跑一次，即可判断页面是否变慢
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 基准测试不能污染线上的访问统计与权限记录
+_tmp = tempfile.mkdtemp(prefix="wealthrank-bench-")
+os.environ.setdefault("WEALTHRANK_VISIT_DB", os.path.join(_tmp, "visits.sqlite3"))
+os.environ.setdefault("WEALTHRANK_ENTITLEMENT_DB", os.path.join(_tmp, "entitlements.sqlite3"))
+
+import numpy as np  # noqa: E402
+
+import wealth_matrix  # noqa: E402
+from country_compare import CountryComparison  # noqa: E402
+from ui_components import INCOME_COLORS  # noqa: E402
+from wealth_model import (  # noqa: E402
+    COUNTRY_DATA, format_compact_localized, get_log_normal_percentile, get_log_normal_percentile_batch, norm_cdf_batch,
+)
+
+APP_FILE = os.path.join(ROOT, "streamlit_app.py")
+DEFAULT_THRESHOLD = 0.25
+
+
+def _measure(func, repeat=5):
+    """自动确定循环次数，返回每次调用耗时的中位数与最小值（微秒）"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "number": number, "repeat": repeat}
+
+
+def _measure_once(func, repeat):
+    """每次都需要重新准备状态的场景（冷启动等），逐次计时"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "number": 1, "repeat": repeat}
+
+
+# -------------------------- 计算 --------------------------
+def _synthetic_countries(n):
+    """n 个参数随机的国家，用于衡量跨国比较随国家数的开销"""
+    rng = np.random.default_rng(0)
+    return {
+        f"C{i:03d}": dict(COUNTRY_DATA["US"], usdRate=float(rng.uniform(0.5, 2000)),
+                          medianIncome=float(rng.uniform(1e3, 1e7)), incomeSigma=float(rng.uniform(0.4, 1.2)))
+        for i in range(n)
+    }
+
+
+def bench_compute():
+    cn = COUNTRY_DATA["CN"]
+    values = np.random.default_rng(0).lognormal(11, 1.5, 100_000)
+    z = np.random.default_rng(1).standard_normal(100_000) * 3
+    comparison = CountryComparison(_synthetic_countries(200))
+    return {
+        "compare.200_countries": _measure(lambda: comparison.compare({"income": 90000, "wealth": 180000}, cn["usdRate"])),
+        "percentile.scalar": _measure(lambda: get_log_normal_percentile(90000, cn["medianIncome"], cn["incomeSigma"])),
+        "percentile.batch_100k": _measure(lambda: get_log_normal_percentile_batch(values, cn["medianIncome"], cn["incomeSigma"])),
+        "norm_cdf.batch_100k": _measure(lambda: norm_cdf_batch(z)),
+        "format_compact.zh": _measure(lambda: format_compact_localized(123456789, "中文")),
+        "format_compact.en": _measure(lambda: format_compact_localized(123456789, "English")),
+    }
+
+
+# -------------------------- 渲染 --------------------------
+def bench_render():
+    from ui_components import TRANSLATIONS, render_metric_card, render_wealth_matrix
+
+    text = TRANSLATIONS["中文"]
+    results = {}
+    # 未命中缓存：直接调用底层绘制函数，绕过 LRU 缓存
+    for renderer, draw in (("svg", wealth_matrix._draw_matrix_svg), ("matplotlib", wealth_matrix._draw_matrix_png)):
+        if renderer == "matplotlib" and wealth_matrix.resolve_matrix_renderer(renderer) != renderer:
+            continue
+        results[f"matrix.{renderer}.uncached"] = _measure_once(lambda: draw(37, *INCOME_COLORS), repeat=5 if renderer == "matplotlib" else 50)
+        wealth_matrix.render_matrix(renderer, 37, *INCOME_COLORS)
+        results[f"matrix.{renderer}.cached"] = _measure(lambda: wealth_matrix.render_matrix(renderer, 37, *INCOME_COLORS))
+
+    # 密度曲线：背景首次绘制与每次重跑的叠加
+    import density_chart
+    us = COUNTRY_DATA["US"]
+    for renderer in ("svg", "matplotlib"):
+        if wealth_matrix.resolve_matrix_renderer(renderer) != renderer:
+            continue
+        draw = density_chart._SvgBackground if renderer == "svg" else density_chart._PngBackground
+        curve = density_chart.build_density_curve(us, "wealth")
+        results[f"density.{renderer}.background"] = _measure_once(
+            lambda: draw(curve, *INCOME_COLORS, "$", "English"), repeat=5 if renderer == "matplotlib" else 50)
+        background = draw(curve, *INCOME_COLORS, "$", "English")
+        results[f"density.{renderer}.overlay"] = _measure_once(lambda: background.compose(0.6), repeat=10 if renderer == "matplotlib" else 200)
+
+    # 不在会话中运行时 st.* 仍会构建元素，只是不发送，可用来衡量组件本身的开销
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        results["render_wealth_matrix"] = _measure(lambda: render_wealth_matrix(0.82, *INCOME_COLORS, "中文"))
+        results["render_metric_card"] = _measure(
+            lambda: render_metric_card(text, 90000, "¥", 0.82, 254115000, 0.6, 800000000, *INCOME_COLORS, "中文"))
+    return results
+
+
+# -------------------------- 整页运行 --------------------------
+def bench_app(repeat=5):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    def cold_run():
+        # 清空所有进程内缓存，模拟新会话第一次打开页面
+        st.cache_data.clear()
+        wealth_matrix.MATRIX_IMAGE_CACHE.clear()
+        at = AppTest.from_file(APP_FILE, default_timeout=60)
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"AppTest 运行失败: {at.exception}")
+        return at
+
+    cold_run()  # 首次运行包含模块导入，不计入结果
+    results = {"app.cold_run": _measure_once(cold_run, repeat)}
+    at = cold_run()
+    results["app.warm_rerun"] = _measure_once(at.run, repeat * 2)
+    return results
+
+
+# -------------------------- 报告与比较 --------------------------
+def _versions():
+    versions = {"python": platform.python_version(), "platform": platform.platform()}
+    for name in ("numpy", "streamlit", "matplotlib"):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def compare(current, baseline, threshold):
+    """返回退化项列表：最小耗时比基线慢 threshold 以上（最小值受机器噪声影响最小）"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["min_us"] / base["min_us"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{name:32s} {base['min_us']:12.2f} -> {result['min_us']:12.2f} us  x{ratio:5.2f}  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="计算与渲染热点的微基准测试")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="结果 JSON 路径 (默认: bench_results.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="与基线 JSON 比较，出现退化时退出码为 1")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定退化的相对阈值 (默认: 0.25)")
+    parser.add_argument("--skip-app", action="store_true", help="跳过 AppTest 整页运行")
+    parser.add_argument("--app-repeat", type=int, default=5, help="整页运行的重复次数 (默认: 5)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    results.update(bench_compute())
+    results.update(bench_render())
+    if not args.skip_app:
+        results.update(bench_app(args.app_repeat))
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "versions": _versions(), "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项性能退化: {', '.join(regressions)}")
+            return 1
+    else:
+        for name, result in results.items():
+            print(f"{name:32s} median {result['median_us']:12.2f} us  min {result['min_us']:12.2f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+冷启动基准：导入耗时预算与重启后首个访客的等待时间
+
+    python benchmarks/cold_start.py                              # 导入预算 + 有/无预热各启动一次
+    python benchmarks/cold_start.py --repeat 3 -o cold.json      # 每种方式启动 3 次取中位数
+    python benchmarks/cold_start.py --imports-only               # 只检查导入（CI 中很快）
+    python benchmarks/cold_start.py --max-first-run-ms 300       # 预热后首次运行超过 300ms 时退出码为 1
+
+1. 导入：在子进程中以 python -X importtime 导入 streamlit_app.py 依赖的全部本仓库模块，
+   汇总总耗时、本仓库模块自身耗时与按顶层包的耗时；导入时加载了 HEAVY_MODULES 中的模块
+   （matplotlib、pandas 等应在首次使用时才导入；numpy 的取舍见 HEAVY_MODULES 处的说明）或超过预算时退出码为 1
+2. 启动：分别以 serve.py（先预热）与 serve.py --no-warmup 启动服务，记录
+   从启动进程到健康检查 /_stcore/health 返回 ok 的时间（ready_s）、第一个会话首次运行的耗时（first_run_ms），
+   以及两者之和；预热把首次运行的开销移到就绪之前，编排系统在就绪后才导入流量，访客等待的是 first_run_ms
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from load_test_app import ROOT, _free_port, _Session
+
+APP_FILE = os.path.join(ROOT, "streamlit_app.py")
+SERVE_FILE = os.path.join(ROOT, "serve.py")
+# 不应在导入时加载的重量级依赖
+# numpy 有意不在其中：每次页面运行（全球排名、门槛表、跨国比较、联合排名）都要用到，延迟导入只是把它的导入耗时
+# 移到首次运行，而 serve.py 的预热在就绪前就完成首次运行，访客等待的时间不变；其耗时单独记在 numpy_ms 中
+HEAVY_MODULES = ("matplotlib", "pandas", "pyarrow", "PIL", "scipy")
+DEFAULT_MAX_APP_IMPORT_MS = 50.0
+
+
+# -------------------------- 1. 导入耗时 --------------------------
+def app_imports(app_file=APP_FILE):
+    """streamlit_app.py 顶层导入的第三方包与本仓库模块（按出现顺序）"""
+    with open(app_file, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def _local_modules():
+    return {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")}
+
+
+def measure_imports(modules):
+    """在新进程中导入 modules，解析 -X importtime 输出"""
+    # importtime 也会记录导入失败的可选依赖，是否真正加载以 sys.modules 为准
+    code = f"import {', '.join(modules)}, json, sys; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"导入失败:\n{result.stderr[-2000:]}")
+
+    loaded = {name.split(".")[0] for name in json.loads(result.stdout.strip().splitlines()[-1])}
+    local = _local_modules()
+    total_us, local_us, by_package = 0, 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        top = name.split(".")[0]
+        self_us = int(self_us)
+        total_us += self_us
+        by_package[top] = by_package.get(top, 0) + self_us
+        if top in local:
+            local_us += self_us
+    top_packages = sorted(by_package.items(), key=lambda item: -item[1])[:8]
+    return {
+        "total_ms": total_us / 1e3,
+        "app_modules_ms": local_us / 1e3,
+        "top_packages_ms": {name: us / 1e3 for name, us in top_packages},
+        "numpy_ms": by_package.get("numpy", 0) / 1e3,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+# -------------------------- 2. 冷启动首屏 --------------------------
+def _wait_health(port, process, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while True:
+        if process.poll() is not None:
+            raise SystemExit(f"服务进程已退出，退出码 {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.perf_counter() > deadline:
+            raise SystemExit("等待健康检查超时")
+        time.sleep(0.05)
+
+
+async def _first_render(port):
+    import websockets
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None) as ws:
+        session = _Session(ws)
+        start = time.perf_counter()
+        error = await session.rerun()
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        await session.rerun()
+        return first, time.perf_counter() - start, error
+
+
+def measure_cold_start(warmup, env):
+    """启动一次服务，返回 {ready_s, first_run_ms, second_run_ms, ready_plus_first_run_s}"""
+    port = _free_port()
+    command = [sys.executable, SERVE_FILE, "--port", str(port), "--address", "127.0.0.1"]
+    if not warmup:
+        command.append("--no-warmup")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_health(port, process)
+        ready = time.perf_counter() - start
+        first, second, error = asyncio.run(_first_render(port))
+    finally:
+        process.terminate()
+        process.wait()
+    if error:
+        raise SystemExit(f"首次运行出错: {error}")
+    return {"ready_s": ready, "first_run_ms": first * 1e3, "second_run_ms": second * 1e3, "ready_plus_first_run_s": ready + first}
+
+
+def _median_runs(runs):
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入耗时预算与冷启动首屏时间")
+    parser.add_argument("-o", "--output", default=None, help="结果另存为 JSON 文件")
+    parser.add_argument("--repeat", type=int, default=1, help="每种启动方式重复次数，取中位数 (默认: 1)")
+    parser.add_argument("--imports-only", action="store_true", help="只检查导入耗时")
+    parser.add_argument("--max-app-import-ms", type=float, default=DEFAULT_MAX_APP_IMPORT_MS,
+                        help=f"本仓库模块自身导入耗时上限 (默认: {DEFAULT_MAX_APP_IMPORT_MS:.0f})")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="全部导入（含 streamlit）耗时上限")
+    parser.add_argument("--max-first-run-ms", type=float, default=None, help="预热启动后第一个会话首次运行的耗时上限")
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    # 取多次中最快的一次，排除磁盘缓存等干扰
+    imports = min((measure_imports(modules) for _ in range(3)), key=lambda r: r["total_ms"])
+    report = {"imports": imports}
+
+    failures = []
+    if imports["heavy_modules"]:
+        failures.append(f"导入时加载了重量级模块: {', '.join(imports['heavy_modules'])}")
+    if imports["app_modules_ms"] > args.max_app_import_ms:
+        failures.append(f"本仓库模块导入 {imports['app_modules_ms']:.1f}ms 超过 {args.max_app_import_ms:.1f}ms")
+    if args.max_import_ms is not None and imports["total_ms"] > args.max_import_ms:
+        failures.append(f"全部导入 {imports['total_ms']:.1f}ms 超过 {args.max_import_ms:.1f}ms")
+
+    if not args.imports_only:
+        # 基准测试不能污染线上的访问统计与权限记录
+        tmp = tempfile.mkdtemp(prefix="wealthrank-cold-")
+        env = dict(os.environ, WEALTHRANK_VISIT_DB=os.path.join(tmp, "visits.sqlite3"),
+                   WEALTHRANK_ENTITLEMENT_DB=os.path.join(tmp, "entitlements.sqlite3"))
+        for name, warmup in (("warm", True), ("cold", False)):
+            report[name] = _median_runs([measure_cold_start(warmup, env) for _ in range(args.repeat)])
+        if args.max_first_run_ms is not None and report["warm"]["first_run_ms"] > args.max_first_run_ms:
+            failures.append(f"预热后首次运行 {report['warm']['first_run_ms']:.0f}ms 超过 {args.max_first_run_ms:.0f}ms")
+
+    report["failures"] = failures
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+rank_api 本地压测：多个长连接并发发送请求，统计吞吐与延迟分位
+
+    python benchmarks/load_test_api.py --spawn                       # 自动启动单进程服务并压测
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8600 --duration 30 --connections 64
+    python benchmarks/load_test_api.py --spawn --batch-size 1000     # 压测批量接口
+
+只用标准库（asyncio 原始 socket + HTTP/1.1 keep-alive），客户端开销尽量小，不依赖 aiohttp / httpx
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COUNTRIES = ("CN", "US", "JP")
+
+
+def _single_request(host, rng):
+    code = rng.choice(COUNTRIES)
+    scale = 7.2 if code == "CN" else 150.0 if code == "JP" else 1.0
+    income = int(rng.lognormvariate(10, 1) * scale)
+    wealth = int(rng.lognormvariate(11, 1.5) * scale)
+    path = f"/v1/rank?country={code}&income={income}&wealth={wealth}"
+    return f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("ascii")
+
+
+def _batch_request(host, rng, size):
+    items = [{"country": rng.choice(COUNTRIES), "income": int(rng.lognormvariate(10, 1)),
+              "wealth": int(rng.lognormvariate(11, 1.5))} for _ in range(size)]
+    body = json.dumps({"items": items}).encode("utf-8")
+    head = (f"POST /v1/rank/batch HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode("ascii")
+    return head + body
+
+
+async def _read_response(reader):
+    """读取一个响应，返回状态码；依赖 Content-Length（服务端不使用分块编码）"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, requests, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, duration, connections, batch_size=0, warmup=1.0):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    rng = random.Random(0)
+    # 预先生成请求报文，压测期间客户端只做读写
+    if batch_size:
+        requests = [_batch_request(host, rng, batch_size) for _ in range(16)]
+    else:
+        requests = [_single_request(host, rng) for _ in range(1024)]
+
+    if warmup > 0:
+        await asyncio.gather(*(_worker(host, port, requests, time.perf_counter() + warmup, [], [])
+                               for _ in range(min(connections, 4))))
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, requests, start + duration, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "rps": len(latencies) / elapsed,
+        "rows_per_s": len(latencies) * max(batch_size, 1) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1e3 if latencies else 0.0,
+        "p50_ms": quantile(0.5),
+        "p95_ms": quantile(0.95),
+        "p99_ms": quantile(0.99),
+    }
+
+
+def _spawn_server(port):
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "rank_api.py"), "--port", str(port)], cwd=ROOT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 1))
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit("rank_api 启动失败")
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("等待 rank_api 启动超时")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="rank_api 本地压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8600", help="服务地址 (默认: http://127.0.0.1:8600)")
+    parser.add_argument("--spawn", action="store_true", help="在本机启动一个单进程 rank_api 再压测")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长，秒 (默认: 10)")
+    parser.add_argument("--connections", type=int, default=32, help="并发长连接数 (默认: 32)")
+    parser.add_argument("--batch-size", type=int, default=0, help="大于 0 时压测批量接口，每个请求包含的条数")
+    parser.add_argument("--min-rps", type=float, default=None, help="吞吐低于该值时退出码为 1")
+    args = parser.parse_args(argv)
+
+    proc = _spawn_server(urlsplit(args.url).port or 80) if args.spawn else None
+    try:
+        report = asyncio.run(run_load(args.url, args.duration, args.connections, args.batch_size))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(json.dumps(report, indent=2))
+    if args.min_rps is not None and report["rps"] < args.min_rps:
+        print(f"吞吐 {report['rps']:.0f} req/s 低于要求的 {args.min_rps:.0f} req/s", file=sys.stderr)
+        return 1
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
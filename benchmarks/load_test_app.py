@@ -0,0 +1,369 @@
+"""
+Streamlit 应用并发会话压测：在本机启动应用，用 N 个 websocket 客户端模拟并发访客，统计重跑延迟与服务端内存增长
+
+    python benchmarks/load_test_app.py                                   # 8 个并发会话，运行 60 秒
+    python benchmarks/load_test_app.py --sessions 32 --duration 300 --reruns-per-session 20
+    python benchmarks/load_test_app.py --max-growth-kb 256               # 每个会话的内存增长超过阈值时退出码为 1
+
+客户端直接使用 Streamlit 的 websocket 协议（BackMsg / ForwardMsg protobuf），与浏览器发送的消息相同：
+随机切换国家（片段重跑）、切换语言（整页重跑）、修改收入/资产后提交表单（片段重跑），
+共 --reruns-per-session 次后断开，再以新会话重连，与线上访客不断进出相同
+（AppTest 依赖全局的 Runtime 替身，多个实例不能在同一进程内并发运行，因此不用它）
+
+服务端运行在子进程中，另有一个统计线程，在预热后记录基线、结束时汇报：
+- 重跑延迟 p50/p95/p99 与吞吐（次/秒），以发出重跑消息到收到 script_finished 计
+- 服务进程 RSS 与 tracemalloc 的增长，折算到每个会话的增长，以及增长最多的代码位置
+- 泄漏检查：pyplot 中未关闭的图（Streamlit 每次运行结束会 close("all")）、
+  存活的 matplotlib Figure 数量（密度曲线背景缓存持有的除外，模块级列表等持有的 Figure 会在这里暴露）、
+  单个会话 session_state 键数是否随重跑增长
+"""
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ui_components import TRANSLATIONS  # noqa: E402
+
+LANGUAGES = ("中文", "English")
+# 收入/资产所在的表单（st.form 的 key）
+ANALYSIS_FORM = "analysis_form"
+# 角色 -> (组件类型, 所在表单, 各语言下的标签)；表单为空串表示不在表单中，语言选择框按选项识别
+WIDGET_ROLES = {
+    "language": ("selectbox", "", None),
+    "country": ("selectbox", "", {text["location"] for text in TRANSLATIONS.values()}),
+    "income": ("number_input", ANALYSIS_FORM, {text["income"] for text in TRANSLATIONS.values()}),
+    "wealth": ("number_input", ANALYSIS_FORM, {text["wealth"] for text in TRANSLATIONS.values()}),
+    "submit": ("button", ANALYSIS_FORM, {text["btn_calc"] for text in TRANSLATIONS.values()}),
+}
+# 服务端统计线程对每个会话 session_state 键数的采样间隔，秒
+SAMPLE_SECONDS = 1.0
+
+
+# -------------------------- 1. 服务端（子进程） --------------------------
+def _rss_bytes():
+    """当前常驻内存；没有 /proc 时退回峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _figures():
+    """(pyplot 中打开的图数, 存活的 Figure 对象数, 密度曲线背景缓存持有的 Figure 数)"""
+    if "matplotlib.figure" not in sys.modules:
+        return 0, 0, 0
+    from matplotlib.figure import Figure
+
+    import density_chart
+
+    gc.collect()
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    open_figures = len(pyplot.get_fignums()) if pyplot is not None else 0
+    live = sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+    cached = sum(1 for background in list(density_chart.BACKGROUND_CACHE._data.values()) if hasattr(background, "fig"))
+    return open_figures, live, cached
+
+
+def _session_states():
+    """{会话 id: session_state 键数}，只统计当前连接中、且没有脚本正在运行的会话（运行中途的键数不完整）"""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.app_session import AppSessionState
+
+    if not Runtime.exists():
+        return {}
+    sessions = [info.session for info in Runtime.instance()._session_mgr.list_active_sessions()]
+    return {session.id: len(session.session_state.filtered_state) for session in sessions
+            if session._state == AppSessionState.APP_NOT_RUNNING}
+
+
+def _stats_loop(conn):
+    """响应主进程的 baseline / report 请求；空闲时采样各会话的 session_state 键数"""
+    baseline = None
+    # 会话 id -> [首次采样键数, 最近键数]；第一次运行之前键数为 0，不作为参考
+    samples = {}
+    while True:
+        if not conn.poll(SAMPLE_SECONDS):
+            if baseline is not None:
+                for session_id, keys in _session_states().items():
+                    if keys:
+                        samples.setdefault(session_id, [keys, keys])[1] = keys
+            continue
+        command = conn.recv()
+        if command == "baseline":
+            gc.collect()
+            tracemalloc.start()
+            baseline = {"rss": _rss_bytes(), "snapshot": tracemalloc.take_snapshot(), "figures": _figures()}
+            samples.clear()
+            conn.send(True)
+        elif command == "report":
+            gc.collect()
+            diff = tracemalloc.take_snapshot().compare_to(baseline["snapshot"], "lineno")
+            conn.send({
+                "rss_baseline": baseline["rss"], "rss_end": _rss_bytes(),
+                "traced_growth": sum(stat.size_diff for stat in diff),
+                "top_growth": [{"where": str(stat.traceback[0]), "kb": stat.size_diff / 1024, "blocks": stat.count_diff}
+                               for stat in diff[:5] if stat.size_diff > 0],
+                "figures_baseline": baseline["figures"], "figures_end": _figures(),
+                "sessions_sampled": len(samples),
+                "state_growth": [last - first for first, last in samples.values() if last > first],
+            })
+            return
+
+
+def _serve(app_file, port, conn):
+    """子进程入口：启动统计线程后在主线程运行 Streamlit 服务（信号处理需要主线程）"""
+    from streamlit.web import bootstrap
+
+    # 服务的启动提示写到 stderr，stdout 只留给压测报告
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    threading.Thread(target=_stats_loop, args=(conn,), name="load-test-stats", daemon=True).start()
+    flags = {"server_port": port, "server_headless": True, "browser_gatherUsageStats": False, "server_fileWatcherType": "none"}
+    bootstrap.load_config_options(flags)
+    bootstrap.run(app_file, False, [], flags)
+
+
+# -------------------------- 2. 客户端 --------------------------
+class _Session:
+    """一个模拟访客：维护与浏览器相同的组件状态，按角色记录组件 id"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}      # 角色 -> (组件 id, 片段 id, 选项)
+        self.values = {}       # 组件 id -> WidgetState
+        self.query_string = "" # 页面写回地址栏的查询参数（访问令牌），与浏览器一样随每次重跑发送
+
+    @staticmethod
+    def _roles(kind, widget):
+        """组件符合的全部角色：按类型、所在表单与标签识别，不依赖组件在页面上的顺序"""
+        if kind == "selectbox" and tuple(widget.options) == LANGUAGES:
+            return ["language"]
+        return [role for role, (role_kind, form_id, labels) in WIDGET_ROLES.items()
+                if role != "language" and role_kind == kind and widget.form_id == form_id and widget.label in labels]
+
+    def _collect(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind not in ("selectbox", "number_input", "button"):
+            return
+        widget = getattr(element, kind)
+        roles = self._roles(kind, widget)
+        if len(roles) > 1:
+            raise RuntimeError(f"组件 {widget.label!r} 同时符合多个角色: {roles}")
+        if not roles:
+            return
+        role = roles[0]
+        # 同一次运行中出现第二个符合条件的组件时，说明页面结构已变，角色定义需要更新
+        if role in self.widgets and self.widgets[role][0] != widget.id:
+            raise RuntimeError(f"角色 {role} 不唯一: {widget.label!r} 与之前收集的组件都符合条件")
+        self.widgets[role] = (widget.id, fragment_id, list(getattr(widget, "options", [])))
+
+    async def rerun(self, fragment_id=""):
+        """发送一次重跑并等待 script_finished；返回错误描述（无错误为 None）"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.values.values())
+        await self.ws.send(message.SerializeToString())
+        # 按钮的触发状态只随一次重跑发送
+        self.values = {wid: state for wid, state in self.values.items() if state.WhichOneof("value") != "trigger_value"}
+        # 整页重跑时组件 id 可能随语言变化，全部重新收集；片段重跑只更新片段内的组件
+        for role, (_, widget_fragment, _) in list(self.widgets.items()):
+            if not fragment_id or widget_fragment == fragment_id:
+                del self.widgets[role]
+
+        error = None
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.ws.recv())
+            kind = reply.WhichOneof("type")
+            if kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                element = reply.delta.new_element
+                if element.WhichOneof("type") == "exception":
+                    error = element.exception.message or element.exception.type
+                self._collect(element, reply.delta.fragment_id)
+            elif kind == "page_info_changed":
+                self.query_string = reply.page_info_changed.query_string
+            elif kind == "script_finished":
+                if reply.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    error = "脚本编译失败"
+                if reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return error
+
+    def _set(self, role, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, fragment_id, _ = self.widgets[role]
+        self.values[widget_id] = WidgetState(id=widget_id, **value)
+        return fragment_id
+
+    async def random_action(self, rng):
+        """随机一种用户操作：切换国家、切换语言、或修改金额后提交；返回错误描述"""
+        if not {"language", "country", "income", "wealth", "submit"} <= self.widgets.keys():
+            return "页面缺少输入组件（可能进入了锁定界面）"
+        action = rng.random()
+        if action < 0.25:
+            return await self.rerun(self._set("country", string_value=rng.choice(self.widgets["country"][2])))
+        if action < 0.4:
+            self._set("language", string_value=rng.choice(LANGUAGES))
+            return await self.rerun()
+        self._set("income", double_value=float(int(rng.lognormvariate(11, 1))))
+        self._set("wealth", double_value=float(int(rng.lognormvariate(12, 1.5))))
+        return await self.rerun(self._set("submit", trigger_value=True))
+
+
+class _Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.errors = []
+        self.sessions = 0
+
+
+async def _visitor(url, seed, reruns_per_session, deadline, recorder, max_sessions=None):
+    import websockets
+
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline and recorder.sessions != max_sessions:
+        async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+            session = _Session(ws)
+            for i in range(reruns_per_session):
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                error = await (session.rerun() if i == 0 else session.random_action(rng))
+                recorder.latencies.append(time.perf_counter() - start)
+                if error:
+                    recorder.errors.append(error)
+                    break
+        recorder.sessions += 1
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url, timeout=60):
+    import websockets
+
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with websockets.connect(url, subprotocols=["streamlit"]):
+                return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise SystemExit("等待 Streamlit 服务启动超时")
+            await asyncio.sleep(0.3)
+
+
+def run_load(app_file, sessions, duration, reruns_per_session, warmup_reruns):
+    port = _free_port()
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    server = context.Process(target=_serve, args=(app_file, port, child_conn), daemon=True)
+    server.start()
+    try:
+        asyncio.run(_wait_ready(url))
+        # 预热：导入模块、填满模板与排名等进程级缓存，之后的增长才反映会话本身
+        warm = _Recorder()
+        asyncio.run(_visitor(url, -1, warmup_reruns, time.perf_counter() + 120, warm, max_sessions=1))
+        if warm.errors:
+            raise SystemExit(f"预热失败: {warm.errors[0]}")
+        parent_conn.send("baseline")
+        parent_conn.recv()
+
+        recorder = _Recorder()
+
+        async def run_all():
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(_visitor(url, seed, reruns_per_session, deadline, recorder) for seed in range(sessions)))
+
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+        parent_conn.send("report")
+        server_stats = parent_conn.recv()
+    finally:
+        server.terminate()
+        server.join()
+
+    latencies = sorted(recorder.latencies)
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3 if latencies else 0.0
+    per_session = max(recorder.sessions, 1)
+    open_figures, live_figures, cached_figures = server_stats["figures_end"]
+    _, baseline_live, baseline_cached = server_stats["figures_baseline"]
+    leaks = []
+    if open_figures:
+        leaks.append(f"pyplot 中有 {open_figures} 张图未关闭")
+    if live_figures - cached_figures > baseline_live - baseline_cached:
+        leaks.append(f"存活 Figure {live_figures} 个，其中缓存持有 {cached_figures} 个")
+    if server_stats["state_growth"]:
+        leaks.append(f"{len(server_stats['state_growth'])} 个会话的 session_state 键数在重跑中增长"
+                     f"（最多 +{max(server_stats['state_growth'])}）")
+
+    return {
+        "sessions_concurrent": sessions,
+        "sessions_completed": recorder.sessions,
+        "reruns": len(latencies),
+        "errors": len(recorder.errors),
+        "first_errors": recorder.errors[:3],
+        "elapsed_s": elapsed,
+        "reruns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": quantile(0.5),
+        "p95_ms": quantile(0.95),
+        "p99_ms": quantile(0.99),
+        "server_rss_mb": {"baseline": server_stats["rss_baseline"] / 2**20, "end": server_stats["rss_end"] / 2**20},
+        "rss_growth_kb_per_session": (server_stats["rss_end"] - server_stats["rss_baseline"]) / 1024 / per_session,
+        "traced_growth_kb": server_stats["traced_growth"] / 1024,
+        "traced_growth_kb_per_session": server_stats["traced_growth"] / 1024 / per_session,
+        "top_growth": server_stats["top_growth"],
+        "figures": {"pyplot_open": open_figures, "live": live_figures, "cached": cached_figures},
+        "leaks": leaks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit 应用并发会话压测（延迟、吞吐、内存与泄漏）")
+    parser.add_argument("--app", default=os.path.join(ROOT, "streamlit_app.py"), help="要压测的 streamlit_app.py 路径")
+    parser.add_argument("--sessions", type=int, default=8, help="并发会话数 (默认: 8)")
+    parser.add_argument("--duration", type=float, default=60.0, help="压测时长，秒 (默认: 60)")
+    parser.add_argument("--reruns-per-session", type=int, default=10, help="每个会话重跑多少次后断开 (默认: 10)")
+    parser.add_argument("--warmup-reruns", type=int, default=20, help="开始计量前单会话预热的重跑次数 (默认: 20)")
+    parser.add_argument("--max-growth-kb", type=float, default=None, help="每个会话的 tracemalloc 增长超过该值时退出码为 1")
+    args = parser.parse_args(argv)
+
+    # 压测不能污染线上的访问统计与权限记录；服务子进程继承环境变量
+    tmp = tempfile.mkdtemp(prefix="wealthrank-load-")
+    os.environ.setdefault("WEALTHRANK_VISIT_DB", os.path.join(tmp, "visits.sqlite3"))
+    os.environ.setdefault("WEALTHRANK_ENTITLEMENT_DB", os.path.join(tmp, "entitlements.sqlite3"))
+    report = run_load(os.path.abspath(args.app), args.sessions, args.duration, args.reruns_per_session, args.warmup_reruns)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report["leaks"]:
+        print("检测到泄漏:\n  " + "\n  ".join(report["leaks"]), file=sys.stderr)
+    if args.max_growth_kb is not None and report["traced_growth_kb_per_session"] > args.max_growth_kb:
+        print(f"每个会话内存增长 {report['traced_growth_kb_per_session']:.1f} KB 超过 {args.max_growth_kb:.1f} KB", file=sys.stderr)
+        return 1
+    return 1 if report["errors"] or report["leaks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+测量每次重跑发送给浏览器的元素数据量（各元素 protobuf 的字节数之和）
+
+    python benchmarks/payload_size.py                          # 当前代码
+    python benchmarks/payload_size.py --app /path/to/old/streamlit_app.py   # 对比旧版本
+
+分别报告首次运行与一次普通重跑（点击"重新计算"）的字节数，以及占比最大的几个元素
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 基准测试不能污染线上的访问统计与权限记录
+_tmp = tempfile.mkdtemp(prefix="wealthrank-payload-")
+os.environ.setdefault("WEALTHRANK_VISIT_DB", os.path.join(_tmp, "visits.sqlite3"))
+os.environ.setdefault("WEALTHRANK_ENTITLEMENT_DB", os.path.join(_tmp, "entitlements.sqlite3"))
+
+
+def _leaf_sizes(node, path="root"):
+    """遍历元素树，返回 [(路径, 元素类型, 字节数), ...]；容器本身的开销很小，只统计叶子元素"""
+    children = getattr(node, "children", None) or {}
+    if not children:
+        proto = getattr(node, "proto", None)
+        return [(path, getattr(node, "type", type(node).__name__), proto.ByteSize())] if proto is not None else []
+    sizes = []
+    for key, child in children.items():
+        sizes.extend(_leaf_sizes(child, f"{path}/{key}"))
+    return sizes
+
+
+def measure(app_file, top=5):
+    from streamlit.testing.v1 import AppTest
+
+    app_dir = os.path.dirname(os.path.abspath(app_file))
+    sys.path.insert(0, app_dir)
+    at = AppTest.from_file(os.path.abspath(app_file), default_timeout=60)
+    report = {}
+    for phase in ("first_run", "rerun"):
+        if phase == "first_run":
+            at.run()
+        else:
+            at.button[0].click().run()
+        if at.exception:
+            raise RuntimeError(f"AppTest 运行失败: {at.exception}")
+        sizes = _leaf_sizes(at._tree)
+        report[phase] = {
+            "bytes": sum(size for _, _, size in sizes),
+            "elements": len(sizes),
+            "largest": [{"path": p, "type": t, "bytes": size} for p, t, size in sorted(sizes, key=lambda s: -s[2])[:top]],
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量每次重跑发送的元素字节数")
+    parser.add_argument("--app", default=os.path.join(ROOT, "streamlit_app.py"), help="要测量的 streamlit_app.py 路径")
+    parser.add_argument("--top", type=int, default=5, help="列出最大的前 N 个元素 (默认: 5)")
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.app, args.top), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+离线预计算静态排名表：按国家 × 指标 × 语言输出紧凑的 JSON 分片，放在 CDN 后面直接提供给前端查表，
+常见的整数金额查询不再进入 Python 进程
+
+    python build_rank_tables.py                          # 增量构建到 dist/rank-tables
+    python build_rank_tables.py -j 8 --force             # 8 个进程全部重建
+
+分片路径: <输出目录>/<语言>/<国家>/<指标>.json（语言为 zh / en），另有 manifest.json 记录每个分片的输入摘要
+分片内容（列式，按数组下标一一对应）:
+    {"country": "CN", "metric": "income", "lang": "zh", "currency": "¥", "population": ...,
+     "decades": [lo, hi], "mantissas": 90,
+     "percentile": [...], "rank": [...], "top_percent": [...], "amount_text": [...], "rank_text": [...]}
+金额网格为两位有效数字的整数金额 m × 10^k（m = 1.0, 1.1, ..., 9.9，k = lo .. hi-1），
+对金额 v 取两位有效数字后，下标为 (k - lo) × 90 + round(m × 10) - 10；网格外的金额仍走 Python 服务
+
+计算与页面相同：get_country_percentile（对数正态，或该国配置的分位数表）、get_absolute_rank、format_compact_localized
+分片的输入摘要包含国家参数、分位数表、网格参数以及 wealth_model.py / quantile_tables.py 的源码，
+只有摘要变化或文件缺失的分片才重新计算；数据中已删除的国家的分片会被清理
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from country_dataset import DATASET_FILE, builtin_dataset, load_dataset
+from quantile_tables import QUANTILE_TABLE_FILE, get_quantile_tables
+from wealth_model import METRIC_FIELDS, format_compact_localized, get_absolute_rank, get_country_percentile
+
+OUTPUT_DIR = "dist/rank-tables"
+MANIFEST_FILE = "manifest.json"
+# 页面语言 -> 分片路径中的语言代码
+LANGUAGES = {"中文": "zh", "English": "en"}
+# 网格覆盖中位数以下 DECADES_BELOW、以上 DECADES_ABOVE 个数量级
+DECADES_BELOW, DECADES_ABOVE = 3, 5
+MANTISSAS = [m / 10 for m in range(10, 100)]
+# 分片格式或网格规则变化时递增，使全部分片重建
+FORMAT_VERSION = 1
+_SOURCE_FILES = ("wealth_model.py", "quantile_tables.py")
+
+
+# -------------------------- 1. 分片计算 --------------------------
+def decade_range(median):
+    k = math.floor(math.log10(median))
+    return max(k - DECADES_BELOW, 0), k + DECADES_ABOVE
+
+
+def build_shard(code, country, metric, lang, table=None):
+    """计算一个分片的内容（字典）"""
+    lo, hi = decade_range(country[METRIC_FIELDS[metric][0]])
+    amounts = [round(m * 10 ** k, 2) for k in range(lo, hi) for m in MANTISSAS]
+    percentiles = [get_country_percentile(country, metric, amount, table) for amount in amounts]
+    ranks = [get_absolute_rank(country["population"], p) for p in percentiles]
+    return {
+        "country": code,
+        "metric": metric,
+        "lang": LANGUAGES[lang],
+        "currency": country["currency"],
+        "population": country["population"],
+        "decades": [lo, hi],
+        "mantissas": len(MANTISSAS),
+        "percentile": [round(p, 6) for p in percentiles],
+        "rank": ranks,
+        "top_percent": [f"{(1 - p) * 100:.1f}%" for p in percentiles],
+        "amount_text": [country["currency"] + format_compact_localized(amount, lang) for amount in amounts],
+        "rank_text": [format_compact_localized(rank, lang) for rank in ranks],
+    }
+
+
+def _write_shard(task):
+    """进程池任务：计算并原子写入一个分片；返回 (相对路径, 摘要, 字节数)"""
+    path, digest, output_dir, args = task
+    data = json.dumps(build_shard(*args), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    target = os.path.join(output_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, target)
+    return path, digest, len(data)
+
+
+# -------------------------- 2. 增量构建 --------------------------
+def _source_digest():
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for name in _SOURCE_FILES:
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def plan_shards(countries, tables):
+    """全部分片的 (相对路径, 输入摘要, 计算参数)"""
+    source = _source_digest()
+    shards = []
+    for code, country in sorted(countries.items()):
+        # 数据快照中的记录是只读映射，转成普通字典才能传给子进程
+        country = dict(country)
+        for metric in METRIC_FIELDS:
+            table = tables.get((code, metric))
+            inputs = json.dumps([source, code, country, metric, table.fingerprint if table is not None else None,
+                                 DECADES_BELOW, DECADES_ABOVE], sort_keys=True, ensure_ascii=False, default=str)
+            for lang, slug in LANGUAGES.items():
+                digest = hashlib.sha1(f"{inputs}|{lang}".encode("utf-8")).hexdigest()[:16]
+                shards.append((f"{slug}/{code}/{metric}.json", digest, (code, country, metric, lang, table)))
+    return shards
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("shards", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def build_rank_tables(countries, tables, output_dir=OUTPUT_DIR, jobs=None, force=False):
+    """
+    增量构建全部分片并更新 manifest.json
+    :return: {"built": 重建数, "skipped": 未变化数, "removed": 清理数, "bytes": 本次写入字节数}
+    """
+    previous = {} if force else _load_manifest(output_dir)
+    shards = plan_shards(countries, tables)
+    stale = [(path, digest, output_dir, args) for path, digest, args in shards
+             if previous.get(path) != digest or not os.path.exists(os.path.join(output_dir, path))]
+
+    written = 0
+    if stale:
+        # 分片很少时不必启动多个进程；分片很多时按块分发，减少进程间通信
+        workers = min(jobs or os.cpu_count() or 1, len(stale))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _, _, size in pool.map(_write_shard, stale, chunksize=max(len(stale) // (4 * workers), 1)):
+                written += size
+
+    current = {path: digest for path, digest, _ in shards}
+    removed = 0
+    for path in set(previous) - set(current):
+        try:
+            os.remove(os.path.join(output_dir, path))
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"format": FORMAT_VERSION, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "languages": sorted(LANGUAGES.values()), "shards": current}
+    tmp = os.path.join(output_dir, f"{MANIFEST_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(output_dir, MANIFEST_FILE))
+    return {"built": len(stale), "skipped": len(shards) - len(stale), "removed": removed, "bytes": written}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线预计算各国收入/资产的静态排名表（CDN 分片）")
+    parser.add_argument("-o", "--output", default=OUTPUT_DIR, help=f"输出目录 (默认: {OUTPUT_DIR})")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="国家数据文件，不存在时使用内置数据")
+    parser.add_argument("--quantile-file", default=QUANTILE_TABLE_FILE, help="经验分位数表，不存在时全部使用对数正态模型")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认: CPU 核数)")
+    parser.add_argument("--force", action="store_true", help="忽略 manifest，全部重建")
+    args = parser.parse_args(argv)
+
+    snapshot = load_dataset(args.dataset) if args.dataset and os.path.exists(args.dataset) else builtin_dataset()
+    start = time.perf_counter()
+    result = build_rank_tables(snapshot.records, get_quantile_tables(args.quantile_file), args.output, args.jobs, args.force)
+    print(f"{args.output}: 重建 {result['built']} 个分片（{result['bytes'] / 1024:.0f} KB），未变化 {result['skipped']} 个，"
+          f"清理 {result['removed']} 个，耗时 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+构建并发布多进程共享的只读查找表（格式与挂载方式见 shared_store.py）
+
+用法:
+    python build_shared_store.py                       # 按当前数据文件构建并发布到默认路径
+    python build_shared_store.py --renderer all        # 同时预渲染 SVG 与 PNG 矩阵
+    python build_shared_store.py --info                # 查看已发布数据的版本与大小
+
+数据文件或分位数表更新后重新运行即可：新文件原子替换旧文件，服务进程在几秒内自动切换；
+版本与服务进程当前数据不一致时，服务进程会忽略共享数据并在本进程内计算
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from country_dataset import DATASET_FILE, builtin_dataset, load_dataset
+from global_rank import GlobalCDF, dataset_version
+from joint_rank import GRID_POINTS, Z_LIMIT, BivariateNormalGrid, country_correlation, joint_store_key
+from quantile_tables import QUANTILE_TABLE_FILE, get_quantile_tables
+from shared_store import SHARED_STORE_FILE, SharedStore, StoreWriter
+from wealth_matrix import (
+    MATRIX_RENDERER, RENDERER_MATPLOTLIB, RENDERER_SVG, TOTAL_CELLS, _draw_matrix_png, _draw_matrix_svg, matrix_store_key,
+)
+from wealth_model import METRIC_FIELDS
+
+
+def build_store(snapshot, tables, renderers, color_pairs):
+    """计算全部查找表并返回 StoreWriter；数据版本与服务进程的计算方式一致"""
+    countries = snapshot.records
+    version = dataset_version(countries, tables, base_version=snapshot.version)
+    global_cdf = GlobalCDF(countries, tables, version)
+    rhos = sorted({country_correlation(country) for country in countries.values()})
+
+    writer = StoreWriter({
+        "data_version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total_population": global_cdf.total_population,
+        "joint_grid": [Z_LIMIT, GRID_POINTS],
+        "correlations": rhos,
+        "renderers": list(renderers),
+    })
+    writer.add_array("global/log_grid", global_cdf.log_grid)
+    for metric in METRIC_FIELDS:
+        writer.add_array(f"global/cdf/{metric}", global_cdf.cdf[metric])
+    for rho in rhos:
+        writer.add_array(joint_store_key(rho), BivariateNormalGrid(rho).log_cdf)
+
+    draw = {RENDERER_SVG: _draw_matrix_svg, RENDERER_MATPLOTLIB: _draw_matrix_png}
+    for renderer in renderers:
+        for color_high, color_low in color_pairs:
+            for high_cells in range(1, TOTAL_CELLS + 1):
+                writer.add_blob(matrix_store_key(renderer, high_cells, color_high, color_low),
+                                draw[renderer](high_cells, color_high, color_low))
+    return writer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="构建多进程共享的只读查找表并原子发布")
+    parser.add_argument("-o", "--output", default=SHARED_STORE_FILE, help=f"发布路径 (默认: {SHARED_STORE_FILE})")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="国家数据文件，不存在时使用内置数据")
+    parser.add_argument("--quantile-file", default=QUANTILE_TABLE_FILE, help="经验分位数表，不存在时全部使用对数正态模型")
+    parser.add_argument("--renderer", choices=[RENDERER_SVG, RENDERER_MATPLOTLIB, "all"], default=MATRIX_RENDERER,
+                        help="预渲染矩阵的后端 (默认与服务进程相同)")
+    parser.add_argument("--info", action="store_true", help="只显示已发布数据的信息")
+    args = parser.parse_args(argv)
+
+    if args.info:
+        if not os.path.exists(args.output):
+            raise SystemExit(f"{args.output} 不存在")
+        json.dump(SharedStore(args.output).stats(), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+
+    # 配色随页面组件定义，按需导入（会引入 streamlit）
+    from ui_components import CARD_COLOR_PAIRS
+
+    snapshot = load_dataset(args.dataset) if args.dataset and os.path.exists(args.dataset) else builtin_dataset()
+    tables = get_quantile_tables(args.quantile_file)
+    renderers = [RENDERER_SVG, RENDERER_MATPLOTLIB] if args.renderer == "all" else [args.renderer]
+
+    start = time.perf_counter()
+    writer = build_store(snapshot, tables, renderers, CARD_COLOR_PAIRS)
+    size = writer.publish(args.output)
+    print(f"已发布 {args.output}: 版本 {writer.meta['data_version']}，{size / 1024:.0f} KB，"
+          f"耗时 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
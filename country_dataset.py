@@ -0,0 +1,242 @@
+"""
+国家数据集：从外部文件（JSON / CSV / Parquet）加载国家参数，校验后生成按国家代码索引的只读快照
+
+文件修改后由后台线程重新解析，解析完成后整体替换当前快照（双缓冲）：
+正在运行的重跑继续使用自己拿到的旧快照，任何重跑都不会看到半加载的数据，也不会因解析而阻塞
+未配置数据文件或文件不存在时，使用 wealth_model.COUNTRY_DATA 中的内置数据
+incomeGini / wealthGini 为真实的基尼系数，对数正态 sigma 由其换算；
+distribution_fit.py 预先拟合的参数文件存在时，在加载时覆盖对应国家的 sigma（及按分位点拟合的中位数）
+
+JSON 格式: {"CN": {"name_en": ..., ...}, ...} 或 [{"code": "CN", ...}, ...]
+CSV / Parquet 格式: 每行一个国家，包含 code 列及下方 REQUIRED_FIELDS 中的各列
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from types import MappingProxyType
+
+from distribution_fit import FITTED_PARAMS_FILE, apply_fitted_params, get_fitted_params
+from wealth_model import COUNTRY_DATA, GINI_FIELDS, with_sigma
+
+logger = logging.getLogger(__name__)
+
+DATASET_FILE = os.environ.get("WEALTHRANK_DATASET_FILE", "data/countries.json")
+RELOAD_CHECK_SECONDS = 2.0
+
+# 字段名 -> 类型；数值字段必须为正数，基尼系数还必须小于 1
+REQUIRED_FIELDS = {
+    "name_en": str, "name_zh": str, "currency": str,
+    "population": int, "medianIncome": float, "medianWealth": float,
+    "incomeGini": float, "wealthGini": float, "usdRate": float,
+}
+# 可选字段：收入-资产相关系数（联合排名使用），取值 (-1, 1)，缺省为 joint_rank.DEFAULT_CORRELATION
+CORRELATION_FIELD = "incomeWealthCorr"
+MODEL_CHOICES = ("auto", "lognormal")
+_CODE_PATTERN = re.compile(r"^[A-Z]{2,3}$")
+_GINI_FIELD_NAMES = frozenset(GINI_FIELDS.values())
+
+
+class DatasetSnapshot:
+    """不可变的数据集快照：records 为 {国家代码: 只读记录}，version 为内容摘要"""
+
+    __slots__ = ("records", "version", "source", "mtime")
+
+    def __init__(self, records, source=None, mtime=None):
+        canonical = json.dumps(records, sort_keys=True, ensure_ascii=False)
+        self.version = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+        self.records = MappingProxyType({code: MappingProxyType(dict(r)) for code, r in records.items()})
+        self.source = source
+        self.mtime = mtime
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, code):
+        return code in self.records
+
+    def get(self, code):
+        return self.records.get(code)
+
+
+# -------------------------- 解析与校验 --------------------------
+def _read_raw_records(path):
+    """读取原始记录，返回 [(code, dict), ...]"""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if isinstance(raw, dict):
+            return list(raw.items())
+        return [(r.get("code"), r) for r in raw]
+    if path.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ValueError("读取 Parquet 数据集需要安装 pandas 和 pyarrow") from None
+        rows = pd.read_parquet(path).to_dict(orient="records")
+        return [(r.get("code"), r) for r in rows]
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return [(r.get("code"), r) for r in csv.DictReader(f)]
+
+
+def validate_records(raw_records):
+    """
+    校验并规范化国家记录
+    :return: {国家代码: 记录}，字段已转换为正确类型
+    :raises ValueError: 汇总所有问题后一次性抛出
+    """
+    errors = []
+    records = {}
+    for code, raw in raw_records:
+        code = str(code or "").strip().upper()
+        if not _CODE_PATTERN.match(code):
+            errors.append(f"无效的国家代码: {code!r}")
+            continue
+        if code in records:
+            errors.append(f"{code}: 重复的国家代码")
+            continue
+        record = {}
+        for field, kind in REQUIRED_FIELDS.items():
+            value = raw.get(field)
+            if value is None or value == "":
+                errors.append(f"{code}.{field}: 缺失")
+                continue
+            try:
+                value = str(value).strip() if kind is str else kind(float(value))
+            except (TypeError, ValueError, OverflowError):
+                errors.append(f"{code}.{field}: 无法解析 {value!r}")
+                continue
+            if kind is str and not value:
+                errors.append(f"{code}.{field}: 不能为空")
+            elif kind is not str and not value > 0:
+                errors.append(f"{code}.{field}: 必须为正数")
+            elif field in _GINI_FIELD_NAMES and not value < 1:
+                errors.append(f"{code}.{field}: 基尼系数必须小于 1（对数正态 sigma 由基尼系数换算，不能直接填写）")
+            record[field] = value
+        corr = raw.get(CORRELATION_FIELD)
+        # 缺失（含 Parquet 中的 NaN）时使用默认相关系数
+        if corr is not None and corr != "" and corr == corr:
+            try:
+                corr = float(corr)
+            except (TypeError, ValueError):
+                errors.append(f"{code}.{CORRELATION_FIELD}: 无法解析 {corr!r}")
+            else:
+                if -1 < corr < 1:
+                    record[CORRELATION_FIELD] = corr
+                else:
+                    errors.append(f"{code}.{CORRELATION_FIELD}: 必须在 (-1, 1) 区间内")
+        model = str(raw.get("model") or "auto").strip().lower()
+        if model not in MODEL_CHOICES:
+            errors.append(f"{code}.model: 未知模型 {model!r}（可选 {', '.join(MODEL_CHOICES)}）")
+        elif model != "auto":
+            record["model"] = model
+        if all(0 < record.get(field, 0) < 1 for field in _GINI_FIELD_NAMES):
+            record = with_sigma(record)
+        records[code] = record
+    if not records and not errors:
+        errors.append("数据集为空")
+    if errors:
+        raise ValueError("数据集校验失败:\n  " + "\n  ".join(errors))
+    return records
+
+
+def _apply_fitted(records):
+    """用预先拟合的参数覆盖换算值；参数文件缺失或无法读取时保持按基尼系数换算"""
+    try:
+        fitted = get_fitted_params()
+    except (OSError, ValueError) as e:
+        logger.error("拟合参数文件 %s 无法读取，sigma 按基尼系数换算: %s", FITTED_PARAMS_FILE, e)
+        return records
+    return apply_fitted_params(records, fitted) if fitted else records
+
+
+def load_dataset(path, use_fitted=True):
+    """
+    加载并校验数据文件，返回新的快照
+    :param use_fitted: 是否应用拟合参数文件；拟合本身需要未经覆盖的原始记录
+    """
+    mtime = os.path.getmtime(path)
+    records = validate_records(_read_raw_records(path))
+    return DatasetSnapshot(_apply_fitted(records) if use_fitted else records, source=path, mtime=mtime)
+
+
+def builtin_dataset(use_fitted=True):
+    # 内置数据同样经过校验和类型规范化，与内容相同的数据文件得到相同的版本号
+    records = validate_records(COUNTRY_DATA.items())
+    return DatasetSnapshot(_apply_fitted(records) if use_fitted else records, source=None)
+
+
+# -------------------------- 热加载 --------------------------
+class DatasetStore:
+    """持有当前快照；后台线程按 mtime 检查文件变化，重新解析后原子替换"""
+
+    def __init__(self, path=DATASET_FILE, check_interval=RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self._failed_mtime = None
+        self._snapshot = self._initial_snapshot()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="dataset-reload", daemon=True)
+        self._thread.start()
+
+    def _initial_snapshot(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                return load_dataset(self.path)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                self._failed_mtime = os.path.getmtime(self.path)
+                logger.error("数据集 %s 加载失败，改用内置数据: %s", self.path, e)
+        return builtin_dataset()
+
+    def current(self):
+        """当前快照；读取只是一次引用获取，调用方应在一次重跑内只取一次并一直使用它"""
+        return self._snapshot
+
+    def reload_if_changed(self):
+        """文件 mtime 变化时重新加载；返回是否切换了快照。失败时保留旧快照"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path)
+            # 未变化或同一个已知有问题的版本都不再重复解析
+            if mtime in (self._snapshot.mtime, self._failed_mtime):
+                return False
+            snapshot = load_dataset(self.path)
+        except (OSError, ValueError) as e:
+            logger.error("数据集 %s 重新加载失败，继续使用旧数据: %s", self.path, e)
+            self.last_error = str(e)
+            self._failed_mtime = mtime
+            return False
+        self.last_error = None
+        self._failed_mtime = None
+        if snapshot.version != self._snapshot.version:
+            logger.info("数据集已更新: %d 个国家, 版本 %s", len(snapshot), snapshot.version)
+        # 新快照完整构建后才替换引用
+        self._snapshot = snapshot
+        return True
+
+    def close(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            self.reload_if_changed()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    """进程内共享的数据集；首次调用时同步加载一次，之后的更新都在后台完成"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
@@ -0,0 +1,203 @@
+"""
+分布密度曲线：对数坐标下的收入/资产密度，标出用户位置并为前 X% 区域着色
+
+静态部分（曲线、基线、刻度文字）按 (国家, 指标, 语言, 数据版本, 颜色) 只渲染一次并缓存，
+每次重跑只在缓存的背景上叠加阴影与标记：
+- svg：背景拆成前后两段字符串，中间插入阴影多边形与标记，叠加只是一次切片拼接
+- matplotlib：Agg 画布绘制一次后用 copy_from_bbox 保存像素，重跑时 restore_region 再只绘制两个图元（blit）
+"""
+import io
+import math
+import threading
+
+import numpy as np
+
+from lru_cache import LRUCache
+from wealth_matrix import RENDERER_SVG
+from wealth_model import METRIC_FIELDS, format_compact_localized, get_log_normal_percentile_batch, uses_quantile_table
+
+# 曲线采样：先在很宽的对数网格上求 CDF，再截取 [CURVE_LOW, CURVE_HIGH] 之间的部分作图
+CURVE_POINTS = 120
+_SCAN_LOG_MIN, _SCAN_LOG_MAX, _SCAN_POINTS = math.log(10), math.log(1e13), 4000
+CURVE_LOW, CURVE_HIGH = 0.002, 0.998
+
+# SVG 坐标：宽 300，曲线区域 y ∈ [PLOT_TOP, PLOT_BOTTOM]，下方留出刻度文字
+SVG_WIDTH, SVG_HEIGHT = 300, 108
+PLOT_TOP, PLOT_BOTTOM = 6, 88
+
+# matplotlib 图尺寸，与 SVG 宽高比一致
+PNG_FIGSIZE = (4.0, 1.44)
+PNG_DPI = 150
+_PNG_AXES = (0.02, 0.2, 0.96, 0.78)
+# 曲线区域的像素宽度，标记位置按像素列量化
+PNG_COLUMNS = round(_PNG_AXES[2] * PNG_FIGSIZE[0] * PNG_DPI)
+
+BACKGROUND_CACHE_SIZE = 128
+OVERLAY_CACHE_SIZE = 1024
+
+
+# -------------------------- 1. 曲线数据 --------------------------
+class DensityCurve:
+    """对数坐标下的密度曲线：log_x 等距，density 为对 log x 的密度（即 CDF 对 log x 的导数）"""
+
+    __slots__ = ("log_x", "density")
+
+    def __init__(self, log_x, density):
+        self.log_x = log_x
+        self.density = density
+
+
+def build_density_curve(country, metric, table=None, points=CURVE_POINTS):
+    """按国家模型（对数正态或分位数表）计算曲线，截取 CDF 在 [CURVE_LOW, CURVE_HIGH] 的区间"""
+    scan = np.linspace(_SCAN_LOG_MIN, _SCAN_LOG_MAX, _SCAN_POINTS)
+    if uses_quantile_table(country, table):
+        cdf = table.percentile_batch(np.exp(scan))
+    else:
+        median_field, shape_field = METRIC_FIELDS[metric]
+        cdf = get_log_normal_percentile_batch(np.exp(scan), country[median_field], country[shape_field])
+    lo = scan[max(np.searchsorted(cdf, CURVE_LOW) - 1, 0)]
+    hi = scan[min(np.searchsorted(cdf, CURVE_HIGH), len(scan) - 1)]
+
+    log_x = np.linspace(lo, hi, points)
+    cdf = np.interp(log_x, scan, cdf)
+    return DensityCurve(log_x, np.maximum(np.gradient(cdf, log_x), 0.0))
+
+
+def _decade_ticks(curve):
+    """曲线范围内的整数量级刻度（10^k）；范围太窄时取两端"""
+    lo, hi = curve.log_x[0] / math.log(10), curve.log_x[-1] / math.log(10)
+    ticks = [10.0 ** k for k in range(math.ceil(lo), math.floor(hi) + 1)]
+    if len(ticks) < 2:
+        ticks = [math.exp(curve.log_x[0]), math.exp(curve.log_x[-1])]
+    # 刻度太多时隔一个取一个
+    while len(ticks) > 5:
+        ticks = ticks[::2]
+    return ticks
+
+
+# -------------------------- 2. SVG 渲染 --------------------------
+class _SvgBackground:
+    """缓存的 SVG 背景：head + 叠加层 + tail 即完整图形；coords 为曲线各点的 SVG 坐标文本"""
+
+    def __init__(self, curve, color_high, color_low, currency, lang_key):
+        self.curve = curve
+        self.color = color_high
+        span = curve.log_x[-1] - curve.log_x[0]
+        peak = float(curve.density.max()) or 1.0
+        self.xs = (curve.log_x - curve.log_x[0]) / span * SVG_WIDTH
+        self.ys = PLOT_BOTTOM - curve.density / peak * (PLOT_BOTTOM - PLOT_TOP)
+        self.coords = [f"{x:.1f} {y:.1f}" for x, y in zip(self.xs, self.ys)]
+        line = "L".join(self.coords)
+
+        ticks = "".join(
+            f'<text x="{min(max((math.log(t) - curve.log_x[0]) / span * SVG_WIDTH, 14), SVG_WIDTH - 14):.1f}" y="{SVG_HEIGHT - 4}" '
+            f'font-size="8" fill="#94a3b8" text-anchor="middle">{currency}{format_compact_localized(t, lang_key)}</text>'
+            for t in _decade_ticks(curve)
+        )
+        self.head = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+            f'style="width:100%;height:auto;display:block;margin-top:8px">'
+            f'<path d="M0 {PLOT_BOTTOM}L{line}L{SVG_WIDTH} {PLOT_BOTTOM}Z" fill="{color_low}" fill-opacity=".25"/>'
+            f'<path d="M0 {PLOT_BOTTOM}H{SVG_WIDTH}" stroke="#e2e8f0" stroke-width="1"/>{ticks}'
+        )
+        self.tail = f'<path d="M{line}" fill="none" stroke="{color_high}" stroke-width="1.5"/></svg>'
+
+    def compose(self, fraction):
+        """fraction 为用户位置在横轴上的比例 (0-1)：阴影为其右侧曲线下的区域"""
+        x = fraction * SVG_WIDTH
+        k = int(np.searchsorted(self.xs, x))
+        y = float(np.interp(x, self.xs, self.ys))
+        shade = "L".join([f"{x:.1f} {y:.1f}"] + self.coords[k:])
+        overlay = (
+            f'<path d="M{x:.1f} {PLOT_BOTTOM}L{shade}L{SVG_WIDTH} {PLOT_BOTTOM}Z" fill="{self.color}" fill-opacity=".45"/>'
+            f'<path d="M{x:.1f} {PLOT_BOTTOM}V{y:.1f}" stroke="{self.color}" stroke-width="1.2" stroke-dasharray="2 2"/>'
+            f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{self.color}" stroke="#fff" stroke-width="1.2"/>'
+        )
+        return self.head + overlay + self.tail
+
+
+# -------------------------- 3. matplotlib 渲染 --------------------------
+class _PngBackground:
+    """缓存的 Agg 画布与背景像素；blit 会修改画布，同一背景的叠加需加锁串行"""
+
+    def __init__(self, curve, color_high, color_low, currency, lang_key):
+        # 使用面向对象的 Figure 接口而不经过 pyplot，不依赖全局状态，可在后台线程中安全渲染
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.curve = curve
+        self.color = color_high
+        self.lock = threading.Lock()
+        self.fig = Figure(figsize=PNG_FIGSIZE, dpi=PNG_DPI)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_axes(_PNG_AXES)
+        self.fig.patch.set_alpha(0)
+        self.ax.patch.set_alpha(0)
+
+        ax = self.ax
+        ax.fill_between(curve.log_x, curve.density, color=color_low, alpha=0.25, linewidth=0)
+        ax.plot(curve.log_x, curve.density, color=color_high, linewidth=1.5)
+        ax.set_xlim(curve.log_x[0], curve.log_x[-1])
+        ax.set_ylim(0, float(curve.density.max()) * 1.05 or 1.0)
+        ticks = _decade_ticks(curve)
+        ax.set_xticks([math.log(t) for t in ticks])
+        ax.set_xticklabels([f"{currency}{format_compact_localized(t, lang_key)}" for t in ticks], fontsize=7, color="#94a3b8")
+        ax.set_yticks([])
+        for side in ("top", "right", "left"):
+            ax.spines[side].set_visible(False)
+        ax.spines["bottom"].set_color("#e2e8f0")
+        ax.tick_params(axis="x", length=0)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def compose(self, fraction):
+        from matplotlib.image import imsave
+
+        curve = self.curve
+        x = curve.log_x[0] + fraction * (curve.log_x[-1] - curve.log_x[0])
+        y = float(np.interp(x, curve.log_x, curve.density))
+        mask = curve.log_x >= x
+        xs = np.concatenate([[x], curve.log_x[mask]])
+        ys = np.concatenate([[y], curve.density[mask]])
+
+        with self.lock:
+            self.canvas.restore_region(self.background)
+            shade = self.ax.fill_between(xs, ys, color=self.color, alpha=0.45, linewidth=0)
+            marker, = self.ax.plot([x, x], [0, y], color=self.color, linewidth=1.2, linestyle=(0, (2, 2)))
+            dot, = self.ax.plot([x], [y], "o", color=self.color, markersize=5, markeredgecolor="white", markeredgewidth=1.2)
+            for artist in (shade, marker, dot):
+                self.ax.draw_artist(artist)
+                artist.remove()
+            pixels = np.asarray(self.canvas.buffer_rgba()).copy()
+
+        buf = io.BytesIO()
+        # 快速压缩级别：体积略大，编码耗时显著降低
+        imsave(buf, pixels, format="png", pil_kwargs={"compress_level": 1})
+        return buf.getvalue()
+
+
+# -------------------------- 4. 缓存与入口 --------------------------
+BACKGROUND_CACHE = LRUCache(BACKGROUND_CACHE_SIZE)
+OVERLAY_CACHE = LRUCache(OVERLAY_CACHE_SIZE)
+
+
+def render_density(renderer, country_code, country, metric, value, color_high, color_low, lang_key, data_version, table=None):
+    """
+    返回带用户标记的密度曲线（SVG 字符串或 PNG 字节）
+    :param data_version: 数据版本，国家参数或分位数表变化时背景自动重建
+    """
+    key = (renderer, country_code, metric, lang_key, data_version, color_high, color_low)
+    factory = _SvgBackground if renderer == RENDERER_SVG else _PngBackground
+    background = BACKGROUND_CACHE.get_or_create(
+        key, lambda: factory(build_density_curve(country, metric, table), color_high, color_low, country["currency"], lang_key))
+
+    log_x = background.curve.log_x
+    position = math.log(value) if value > 0 else log_x[0]
+    fraction = min(max((position - log_x[0]) / (log_x[-1] - log_x[0]), 0.0), 1.0)
+
+    if renderer == RENDERER_SVG:
+        return background.compose(fraction)
+    # PNG 编码较慢：按像素列量化位置后缓存，同一列的位置得到完全相同的图
+    column = round(fraction * PNG_COLUMNS)
+    return OVERLAY_CACHE.get_or_create(key + (column,), lambda: background.compose(column / PNG_COLUMNS))
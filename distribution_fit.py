@@ -0,0 +1,245 @@
+"""
+对数正态参数拟合：离线求出各国收入/资产的中位数与 sigma，写成带版本的参数文件，应用启动加载数据集时直接读取
+
+    python distribution_fit.py                                    # 按当前数据集与分位数表拟合，写出 data/fitted_params.json
+    python distribution_fit.py --quantile-file points.csv         # 另给一组分位点（如 P10/P50/P90/P99）只用于拟合
+    python distribution_fit.py --max-percentile-error 0.02        # 任一拟合的最大百分位误差超过 2% 时退出码为 1
+
+两种方式，逐项选择：
+- 有分位点时，对 ln(数值) = ln(中位数) + σ·Φ⁻¹(p) 做最小二乘，同时拟合中位数与 sigma（method="quantiles"）；
+  全部国家 × 指标的回归用 np.bincount 一次完成
+- 否则由数据集中的基尼系数换算：对数正态分布的 G = 2Φ(σ/√2) - 1，σ = √2·Φ⁻¹((1 + G) / 2)（method="gini"）
+
+参数文件结构:
+    {"format": 1, "version": 参数摘要, "fitted_at": ..., "inputs": {...},
+     "params": {"CN": {"income": {"method": ..., "median": ..., "sigma": ..., "inputs": 输入摘要,
+                                  "diagnostics": {...}}, ...}, ...}}
+diagnostics 包含数据集中的基尼系数；按分位点拟合的条目另有点数、ln(数值) 残差的均方根 rmse_log、决定系数 r2、
+拟合曲线在各分位点上的最大百分位误差、拟合 sigma 对应的基尼系数 implied_gini 以及拟合中位数与数据集中位数之比
+
+每个条目记录所用中位数与基尼系数的摘要；数据集修改后摘要不一致的条目在加载时被跳过（改按基尼系数换算），
+需重新运行本脚本。参数文件只在加载数据集时读取，更新后需重启服务或等数据文件下一次热加载
+"""
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from wealth_model import GINI_FIELDS, METRIC_FIELDS, gini_to_sigma_batch, norm_cdf_batch, norm_ppf_batch, sigma_to_gini
+
+logger = logging.getLogger(__name__)
+
+FITTED_PARAMS_FILE = os.environ.get("WEALTHRANK_FITTED_PARAMS_FILE", "data/fitted_params.json")
+# 参数文件结构变化时递增；格式不符的文件不会被加载
+FORMAT_VERSION = 1
+METHOD_GINI = "gini"
+METHOD_QUANTILES = "quantiles"
+
+
+# -------------------------- 1. 拟合 --------------------------
+def fit_quantile_points(groups):
+    """
+    多组分位点同时做最小二乘：ln(数值) = μ + σ·Φ⁻¹(p)，中位数为 e^μ
+    每组是一元线性回归，各组所需的求和量用 np.bincount 一次算出，不逐组循环
+    :param groups: [(累计概率数组, 数值数组), ...]，每组至少 2 个不同的概率
+    :return: dict，各值为与 groups 等长的数组: median, sigma, points, rmse_log, r2, max_percentile_error
+    """
+    sizes = np.array([len(p) for p, _ in groups])
+    group = np.repeat(np.arange(len(groups)), sizes)
+    p = np.concatenate([np.asarray(p, dtype=np.float64) for p, _ in groups])
+    y = np.log(np.concatenate([np.asarray(v, dtype=np.float64) for _, v in groups]))
+    z = norm_ppf_batch(p)
+
+    def total(weights=None):
+        return np.bincount(group, weights, minlength=len(groups))
+
+    n, sz, sy = total(), total(z), total(y)
+    with np.errstate(all="ignore"):
+        sigma = (n * total(z * y) - sz * sy) / (n * total(z * z) - sz * sz)
+        mu = (sy - sigma * sz) / n
+        residual = y - mu[group] - sigma[group] * z
+        ss_res = total(residual ** 2)
+        ss_tot = total((y - (sy / n)[group]) ** 2)
+        error = np.abs(norm_cdf_batch((y - mu[group]) / sigma[group]) - p)
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, 1.0)
+    max_error = np.zeros(len(groups))
+    np.maximum.at(max_error, group, error)
+    return {"median": np.exp(mu), "sigma": sigma, "points": sizes, "rmse_log": np.sqrt(ss_res / n),
+            "r2": r2, "max_percentile_error": max_error}
+
+
+def fit_inputs(record, metric):
+    """决定该指标参数的原始字段（中位数、基尼系数）的摘要；加载时据此判断参数文件是否过期"""
+    payload = json.dumps([record[METRIC_FIELDS[metric][0]], record[GINI_FIELDS[metric]]])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def fit_parameters(records, tables=None):
+    """
+    拟合全部国家 × 指标的对数正态参数
+    :param records: {国家代码: 记录}，须为未经参数文件覆盖的原始记录
+    :param tables: 可选的 {(国家代码, 指标): QuantileTable}，有分位点的条目按最小二乘拟合
+    :return: {国家代码: {指标: {"method", "median", "sigma", "inputs", "diagnostics"}}}
+    """
+    keys = [(code, metric) for code in sorted(records) for metric in METRIC_FIELDS]
+    gini = np.array([records[code][GINI_FIELDS[metric]] for code, metric in keys], dtype=np.float64)
+    params = {}
+    for (code, metric), g, sigma in zip(keys, gini.tolist(), gini_to_sigma_batch(gini).tolist()):
+        record = records[code]
+        params.setdefault(code, {})[metric] = {
+            "method": METHOD_GINI, "median": record[METRIC_FIELDS[metric][0]], "sigma": sigma,
+            "inputs": fit_inputs(record, metric), "diagnostics": {"gini": g},
+        }
+
+    keyed = [key for key in keys if (tables or {}).get(key) is not None]
+    if not keyed:
+        return params
+    result = fit_quantile_points([(tables[key].probabilities, np.exp(tables[key].log_values)) for key in keyed])
+    for i, (code, metric) in enumerate(keyed):
+        entry = params[code][metric]
+        median, sigma = float(result["median"][i]), float(result["sigma"][i])
+        if not (sigma > 0 and math.isfinite(sigma) and median > 0 and math.isfinite(median)):
+            # 分位点与对数正态完全不符（如数值随概率递减）时保留基尼系数换算的结果
+            logger.warning("%s/%s: 分位点拟合失败（sigma=%r），改用基尼系数换算", code, metric, sigma)
+            continue
+        entry.update(method=METHOD_QUANTILES, median=median, sigma=sigma)
+        entry["diagnostics"].update({
+            "points": int(result["points"][i]),
+            "rmse_log": round(float(result["rmse_log"][i]), 6),
+            "r2": round(float(result["r2"][i]), 6),
+            "max_percentile_error": round(float(result["max_percentile_error"][i]), 6),
+            "implied_gini": round(sigma_to_gini(sigma), 6),
+            "median_ratio": round(median / records[code][METRIC_FIELDS[metric][0]], 6),
+        })
+    return params
+
+
+# -------------------------- 2. 参数文件 --------------------------
+def build_artifact(params, inputs=None):
+    """带格式版本与内容摘要的参数文件内容"""
+    canonical = json.dumps(params, sort_keys=True)
+    return {"format": FORMAT_VERSION, "version": hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16],
+            "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "inputs": inputs or {}, "params": params}
+
+
+def write_artifact(artifact, path=FITTED_PARAMS_FILE):
+    """原子写入：正在启动的服务不会读到写了一半的文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_fitted_params(path):
+    """
+    读取参数文件并校验
+    :raises ValueError: 格式版本不符或参数无效
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    if not isinstance(artifact, dict) or artifact.get("format") != FORMAT_VERSION:
+        raise ValueError(f"不支持的参数文件格式（需要 format={FORMAT_VERSION}）")
+    for code, metrics in artifact.get("params", {}).items():
+        for metric, entry in metrics.items():
+            if metric not in METRIC_FIELDS:
+                raise ValueError(f"{code}: 未知指标 {metric!r}")
+            if not all(isinstance(entry.get(k), (int, float)) and 0 < entry[k] < math.inf for k in ("median", "sigma")):
+                raise ValueError(f"{code}/{metric}: median 与 sigma 必须为正的有限数")
+    return artifact
+
+
+@functools.lru_cache(maxsize=2)
+def _load_cached(path, mtime):
+    return load_fitted_params(path)
+
+
+def get_fitted_params(path=FITTED_PARAMS_FILE):
+    """按文件修改时间缓存的参数文件；文件不存在时返回 None（sigma 全部按基尼系数换算）"""
+    if not path or not os.path.exists(path):
+        return None
+    return _load_cached(path, os.path.getmtime(path))
+
+
+def apply_fitted_params(records, artifact):
+    """
+    用参数文件中的中位数与 sigma 覆盖记录
+    只应用输入摘要与当前记录一致的条目，其余保持原样并记录警告
+    :return: 新的 {国家代码: 记录}
+    """
+    result, stale = {}, []
+    for code, record in records.items():
+        updated = dict(record)
+        for metric, entry in artifact["params"].get(code, {}).items():
+            if entry.get("inputs") != fit_inputs(record, metric):
+                stale.append(f"{code}/{metric}")
+                continue
+            median_field, sigma_field = METRIC_FIELDS[metric]
+            updated[median_field] = float(entry["median"])
+            updated[sigma_field] = float(entry["sigma"])
+        result[code] = updated
+    if stale:
+        logger.warning("拟合参数 %s 中 %d 项与数据集不一致，已改按基尼系数换算（请重新运行 distribution_fit.py）: %s",
+                       artifact.get("version"), len(stale), ", ".join(stale))
+    return result
+
+
+# -------------------------- 3. 命令行 --------------------------
+def _report_line(code, metric, entry):
+    d = entry["diagnostics"]
+    line = (f"{code} {metric:<6} {entry['method']:<9} 中位数 {entry['median']:>14,.0f}  sigma {entry['sigma']:.4f}  "
+            f"基尼 {d['gini']:.3f}")
+    if entry["method"] == METHOD_QUANTILES:
+        line += (f" -> {d['implied_gini']:.3f}  点数 {d['points']}  rmse(ln) {d['rmse_log']:.4f}  "
+                 f"r2 {d['r2']:.4f}  最大百分位误差 {d['max_percentile_error']:.4f}")
+    return line
+
+
+def main(argv=None):
+    import argparse
+
+    from country_dataset import DATASET_FILE, builtin_dataset, load_dataset
+    from quantile_tables import QUANTILE_TABLE_FILE, load_quantile_tables
+
+    parser = argparse.ArgumentParser(description="拟合各国收入/资产的对数正态参数，写出带版本的参数文件")
+    parser.add_argument("-o", "--output", default=FITTED_PARAMS_FILE, help=f"参数文件路径 (默认: {FITTED_PARAMS_FILE})")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="国家数据文件，不存在时使用内置数据")
+    parser.add_argument("--quantile-file", default=QUANTILE_TABLE_FILE, help="用于拟合的分位点（分位数表格式），不存在时全部按基尼系数换算")
+    parser.add_argument("--max-percentile-error", type=float, default=None, help="按分位点拟合的最大百分位误差上限，超过时退出码为 1")
+    args = parser.parse_args(argv)
+
+    try:
+        use_file = bool(args.dataset) and os.path.exists(args.dataset)
+        snapshot = load_dataset(args.dataset, use_fitted=False) if use_file else builtin_dataset(use_fitted=False)
+        use_points = bool(args.quantile_file) and os.path.exists(args.quantile_file)
+        tables = load_quantile_tables(args.quantile_file) if use_points else {}
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+
+    params = fit_parameters(snapshot.records, tables)
+    artifact = build_artifact(params, {"dataset": snapshot.source or "builtin", "dataset_version": snapshot.version,
+                                       "quantile_file": args.quantile_file if use_points else None})
+    write_artifact(artifact, args.output)
+
+    failures = []
+    for code, metrics in params.items():
+        for metric, entry in metrics.items():
+            print(_report_line(code, metric, entry), file=sys.stderr)
+            error = entry["diagnostics"].get("max_percentile_error")
+            if args.max_percentile_error is not None and error is not None and error > args.max_percentile_error:
+                failures.append(f"{code}/{metric}: 最大百分位误差 {error:.4f} 超过 {args.max_percentile_error:.4f}")
+    print(f"已写入 {args.output}（版本 {artifact['version']}）", file=sys.stderr)
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
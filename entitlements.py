@@ -0,0 +1,270 @@
+"""
+服务端访问权限存储：按浏览器令牌记录试用期与解锁期，一次查询即可决定是否放行
+
+- 令牌放在页面地址的查询参数 ?t= 中（首次访问时生成并写回地址栏），刷新、断线重连或在新标签页打开同一地址
+  都能找回同一条记录；地址分享给他人时权限随之共享
+- 记录保存在 SQLite (WAL) 中，与访问统计相同：重启、重新部署后解锁仍然有效，同一台机器上的多个服务进程
+  读写同一个文件，请求落到哪个进程都能查到同一条记录；每次运行只按令牌读一行，只有新令牌或解锁时才写入
+- 配置了可信反向代理时，试用同时按真实客户端 IP 记录（记录键为 ip:<地址>）：同一 IP 换新令牌（如去掉 ?t=）
+  只能继续该 IP 剩余的试用期，不会重新开始；未配置时只能按令牌区分。解锁仍只属于令牌
+- 试用与解锁结束后再保留 LOCKED_TTL_SECONDS（期间重连不会重新获得试用），之后过期删除；
+  记录数超过 MAX_ENTRIES 时先删除最早到期的记录（试用先于解锁）
+- 解锁代码只保存 SHA-256 摘要，可同时有多个有效代码；
+  同一令牌、以及同一真实客户端 IP（来自可信反向代理的 X-Forwarded-For）在 ATTEMPT_WINDOW_SECONDS 内
+  各最多尝试 MAX_ATTEMPTS 次；不按连接的 IP 限流，代理后面所有访客的连接 IP 相同
+
+生成代码摘要:
+    python entitlements.py hash <代码> [<代码> ...]
+"""
+import hashlib
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+# --- 权限配置 ---
+FREE_PERIOD_SECONDS = 60      # 免费试用期 60 秒
+ACCESS_DURATION_HOURS = 24    # 密码解锁后的访问时长 24 小时
+# 解锁代码的 SHA-256 摘要（十六进制，逗号分隔）；也可在 WEALTHRANK_UNLOCK_CODES_FILE 中每行写一个摘要
+# 默认值为原先预设代码的摘要
+UNLOCK_CODE_HASHES = os.environ.get(
+    "WEALTHRANK_UNLOCK_CODE_HASHES", "9c535ae69651d1ea2b2f40366a85f1637dc8106142495442605b14b1f7b57d11")
+UNLOCK_CODES_FILE = os.environ.get("WEALTHRANK_UNLOCK_CODES_FILE", "")
+# 权限记录的存储位置；多个服务进程需指向同一个文件
+ENTITLEMENT_DB_FILE = os.environ.get("WEALTHRANK_ENTITLEMENT_DB", "entitlements.sqlite3")
+# 服务前面可信反向代理的层数：>0 时从 X-Forwarded-For 右数第 N 个地址取真实客户端 IP；0 表示不信任该请求头
+TRUSTED_PROXY_HOPS = int(os.environ.get("WEALTHRANK_TRUSTED_PROXY_HOPS", "0"))
+# --- 配置结束 ---
+
+LOCKED_TTL_SECONDS = 24 * 3600
+MAX_ENTRIES = 100_000
+MAX_ATTEMPTS = 5
+ATTEMPT_WINDOW_SECONDS = 600
+# 每个进程清理过期记录的最短间隔
+PURGE_INTERVAL_SECONDS = 60
+
+TOKEN_PARAM = "t"
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+STATUS_FREE = "free"
+STATUS_UNLOCKED = "unlocked"
+STATUS_LOCKED = "locked"
+
+UNLOCK_OK = "ok"
+UNLOCK_INVALID = "invalid"
+UNLOCK_RATE_LIMITED = "rate_limited"
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+def valid_token(token):
+    """只接受 new_token 生成的格式，避免任意长度的字符串进入存储"""
+    return isinstance(token, str) and _TOKEN_PATTERN.fullmatch(token) is not None
+
+
+def client_ip(forwarded_for, hops=TRUSTED_PROXY_HOPS):
+    """
+    从 X-Forwarded-For 取真实客户端 IP：每层代理在末尾追加它看到的地址，右数第 hops 个由最外层可信代理写入，
+    更靠左的部分可由客户端伪造；未配置可信代理或请求头层数不足时返回 None
+    """
+    if hops <= 0 or not forwarded_for:
+        return None
+    addresses = [part.strip() for part in forwarded_for.split(",") if part.strip()]
+    return addresses[-hops] if len(addresses) >= hops else None
+
+
+def hash_code(code):
+    return hashlib.sha256(code.strip().encode("utf-8")).hexdigest()
+
+
+def load_code_hashes(hashes=UNLOCK_CODE_HASHES, path=UNLOCK_CODES_FILE):
+    """环境变量与文件中的摘要合并为集合；文件中 # 开头的行为注释"""
+    lines = hashes.split(",")
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    return frozenset(line.strip().lower() for line in lines if line.strip() and not line.lstrip().startswith("#"))
+
+
+class Access:
+    """一次查询的结果：status 为 free / unlocked / locked，remaining 为当前状态剩余秒数"""
+
+    __slots__ = ("status", "remaining")
+
+    def __init__(self, status, remaining):
+        self.status = status
+        self.remaining = remaining
+
+    @property
+    def granted(self):
+        return self.status != STATUS_LOCKED
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entitlements (
+    token        TEXT PRIMARY KEY,
+    trial_end    REAL NOT NULL,
+    unlock_until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unlock_attempts (
+    client TEXT NOT NULL,
+    at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS unlock_attempts_client ON unlock_attempts (client, at);
+"""
+
+# 新令牌开始试用；已过期（含保留期）的记录重新开始试用，其余记录保持不变。多个进程同时插入时只有一条生效
+_START_TRIAL = """
+INSERT INTO entitlements (token, trial_end, unlock_until) VALUES (?, ?, 0)
+ON CONFLICT (token) DO UPDATE SET trial_end = excluded.trial_end, unlock_until = 0
+WHERE max(trial_end, unlock_until) + ? <= ?
+"""
+
+
+class EntitlementStore:
+    """线程安全的权限表：令牌 -> (试用结束时间, 解锁到期时间)，保存在 SQLite 中，多个进程共享"""
+
+    def __init__(self, code_hashes, db_path=ENTITLEMENT_DB_FILE, free_period=FREE_PERIOD_SECONDS,
+                 access_duration=ACCESS_DURATION_HOURS * 3600, locked_ttl=LOCKED_TTL_SECONDS, max_entries=MAX_ENTRIES,
+                 max_attempts=MAX_ATTEMPTS, attempt_window=ATTEMPT_WINDOW_SECONDS, clock=time.time):
+        self.code_hashes = frozenset(code_hashes)
+        self.db_path = db_path
+        self.free_period = free_period
+        self.access_duration = access_duration
+        self.locked_ttl = locked_ttl
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        self.attempt_window = attempt_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self._conn = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _purge(self, now):
+        """删除过期记录与过期的尝试记录，超出 max_entries 时删除最早到期的记录（调用方持锁）"""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+        with self._conn:
+            self._conn.execute("DELETE FROM entitlements WHERE max(trial_end, unlock_until) + ? <= ?",
+                               (self.locked_ttl, now))
+            self._conn.execute("DELETE FROM unlock_attempts WHERE at <= ?", (now - self.attempt_window,))
+            self._conn.execute(
+                "DELETE FROM entitlements WHERE token IN (SELECT token FROM entitlements "
+                "ORDER BY max(trial_end, unlock_until) LIMIT max((SELECT count(*) FROM entitlements) - ?, 0))",
+                (self.max_entries,))
+
+    def _entry(self, token, now):
+        """读取记录；没有或已过期时开始新的试用（调用方持锁）"""
+        row = self._conn.execute("SELECT trial_end, unlock_until FROM entitlements WHERE token = ?", (token,)).fetchone()
+        if row is not None and max(row) + self.locked_ttl > now:
+            return row
+        with self._conn:
+            self._conn.execute(_START_TRIAL, (token, now + self.free_period, self.locked_ttl, now))
+        self._purge(now)
+        return self._conn.execute("SELECT trial_end, unlock_until FROM entitlements WHERE token = ?", (token,)).fetchone()
+
+    def check(self, token, client=None):
+        """
+        页面每次运行只调用一次：第一次见到的令牌开始试用
+        :param client: 真实客户端 IP（见 client_ip）；给出时试用期取令牌与该 IP 两者中先结束的一个
+        """
+        now = self._clock()
+        with self._lock:
+            trial_end, unlock_until = self._entry(token, now)
+            if client:
+                trial_end = min(trial_end, self._entry(f"ip:{client}", now)[0])
+        if unlock_until > now:
+            return Access(STATUS_UNLOCKED, unlock_until - now)
+        if trial_end > now:
+            return Access(STATUS_FREE, trial_end - now)
+        return Access(STATUS_LOCKED, 0.0)
+
+    def unlock(self, token, code, client=None):
+        """
+        校验解锁代码
+        :param client: 真实客户端 IP（见 client_ip）；令牌与 IP 各自限流，任一超出即拒绝
+        :return: UNLOCK_OK / UNLOCK_INVALID / UNLOCK_RATE_LIMITED
+        """
+        now = self._clock()
+        keys = [f"token:{token}"] + ([f"ip:{client}"] if client else [])
+        marks = ",".join("?" * len(keys))
+        with self._lock, self._conn:
+            # 计数与记录在同一个写事务中，多个进程并发尝试时不会超出限额
+            self._conn.execute("BEGIN IMMEDIATE")
+            used = self._conn.execute(
+                f"SELECT max(n) FROM (SELECT count(*) AS n FROM unlock_attempts WHERE at > ? AND client IN ({marks}) "
+                f"GROUP BY client)", (now - self.attempt_window, *keys)).fetchone()[0] or 0
+            if used >= self.max_attempts:
+                return UNLOCK_RATE_LIMITED
+            self._conn.executemany("INSERT INTO unlock_attempts (client, at) VALUES (?, ?)", [(k, now) for k in keys])
+        if hash_code(code or "") not in self.code_hashes:
+            return UNLOCK_INVALID
+        with self._lock:
+            self._entry(token, now)
+            with self._conn:
+                self._conn.execute("UPDATE entitlements SET unlock_until = ? WHERE token = ?",
+                                   (now + self.access_duration, token))
+                self._conn.execute(f"DELETE FROM unlock_attempts WHERE client IN ({marks})", keys)
+        return UNLOCK_OK
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            entries = self._conn.execute("SELECT count(*) FROM entitlements").fetchone()[0]
+            limited = self._conn.execute(
+                "SELECT count(*) FROM (SELECT client FROM unlock_attempts WHERE at > ? GROUP BY client "
+                "HAVING count(*) >= ?)", (now - self.attempt_window, self.max_attempts)).fetchone()[0]
+        return {"entries": entries, "max_entries": self.max_entries, "rate_limited_clients": limited}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_entitlement_store():
+    """返回进程内共享的权限表连接；Streamlit 每次重跑脚本都会复用同一个实例"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EntitlementStore(load_code_hashes())
+        return _store
+
+
+def set_entitlement_store(store):
+    """替换进程内共享的权限表（如预热时换成内存库），返回原来的实例（可能为 None）"""
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成解锁代码的摘要，写入 WEALTHRANK_UNLOCK_CODE_HASHES 或代码文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    hash_parser = sub.add_parser("hash", help="输出代码的 SHA-256 摘要，每行一个")
+    hash_parser.add_argument("codes", nargs="+")
+    args = parser.parse_args(argv)
+    for code in args.codes:
+        print(hash_code(code))
+
+
+if __name__ == "__main__":
+    main()
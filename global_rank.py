@@ -0,0 +1,132 @@
+"""
+全球排名：把各国分布按汇率换算成美元后，以人口加权得到混合分布的 CDF
+
+混合 CDF 在对数等距的美元网格上一次性预计算，查询时只做一次插值；
+网格按数据版本（国家参数 + 汇率 + 分位数表）缓存在有界 LRU 中，数据或汇率变化时才重建
+"""
+import hashlib
+import json
+import math
+
+import numpy as np
+
+from lru_cache import LRUCache
+from shared_store import get_shared_store
+from wealth_model import (
+    METRIC_FIELDS, MODEL_VERSION, PERCENTILE_CEIL, PERCENTILE_FLOOR,
+    get_absolute_rank, get_log_normal_percentile_batch, uses_quantile_table,
+)
+
+# 美元网格：0.1 美元 ~ 1000 亿美元，对数等距
+GRID_MIN_USD = 1e-1
+GRID_MAX_USD = 1e11
+GRID_POINTS = 4096
+
+
+def dataset_version(country_data, quantile_tables=None, base_version=None):
+    """
+    由国家参数（含汇率 usdRate）、分位数表内容和分布模型（MODEL_VERSION）计算数据版本号
+    :param base_version: 国家数据快照自带的版本号，提供时不再重新序列化国家参数
+    """
+    if base_version is None:
+        base_version = json.dumps(country_data, sort_keys=True, ensure_ascii=False, default=dict)
+    digest = hashlib.sha1(MODEL_VERSION.encode("utf-8"))
+    digest.update(base_version.encode("utf-8"))
+    for key in sorted(quantile_tables or {}):
+        digest.update(repr(key).encode("utf-8"))
+        digest.update(quantile_tables[key].fingerprint.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+class GlobalCDF:
+    """预计算的全球混合分布，按指标（income / wealth）各存一条 CDF 曲线"""
+
+    def __init__(self, country_data, quantile_tables=None, version=None):
+        self.version = version or dataset_version(country_data, quantile_tables)
+        self.log_grid = np.linspace(math.log(GRID_MIN_USD), math.log(GRID_MAX_USD), GRID_POINTS)
+        self._log_grid_min = float(self.log_grid[0])
+        self._log_grid_step = float(self.log_grid[1] - self.log_grid[0])
+        self.total_population = sum(c["population"] for c in country_data.values())
+        usd_grid = np.exp(self.log_grid)
+
+        self.cdf = {}
+        for metric, (median_field, shape_field) in METRIC_FIELDS.items():
+            mixture = np.zeros(GRID_POINTS)
+            for code, country in country_data.items():
+                # 美元网格换算为当地货币后，按该国模型求百分位
+                local = usd_grid * country["usdRate"]
+                table = (quantile_tables or {}).get((code, metric))
+                if uses_quantile_table(country, table):
+                    pct = table.percentile_batch(local)
+                else:
+                    pct = get_log_normal_percentile_batch(local, country[median_field], country[shape_field])
+                mixture += country["population"] * pct
+            self.cdf[metric] = mixture / self.total_population
+
+    @classmethod
+    def from_arrays(cls, version, log_grid, cdf, total_population):
+        """由已算好的网格构造（如共享内存中的只读数组），不复制数据"""
+        self = cls.__new__(cls)
+        self.version = version
+        self.log_grid = log_grid
+        self._log_grid_min = float(log_grid[0])
+        self._log_grid_step = float(log_grid[1] - log_grid[0])
+        self.total_population = total_population
+        self.cdf = cdf
+        return self
+
+    def percentile(self, metric, usd_value):
+        """全球百分位：在对数网格上线性插值，网格等距因此无需二分查找（NaN 得到 NaN，与批量版本一致）"""
+        if math.isnan(usd_value):
+            return math.nan
+        if not usd_value > 1:
+            return PERCENTILE_FLOOR
+        cdf = self.cdf[metric]
+        pos = (math.log(usd_value) - self._log_grid_min) / self._log_grid_step
+        k = min(max(int(pos), 0), GRID_POINTS - 2)
+        t = min(max(pos - k, 0.0), 1.0)
+        p = cdf[k] + (cdf[k + 1] - cdf[k]) * t
+        return min(max(float(p), PERCENTILE_FLOOR), PERCENTILE_CEIL)
+
+    def percentile_batch(self, metric, usd_values):
+        usd_values = np.asarray(usd_values, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            p = np.interp(np.log(usd_values), self.log_grid, self.cdf[metric])
+        p = np.clip(p, PERCENTILE_FLOOR, PERCENTILE_CEIL)
+        p = np.where(usd_values <= 1, PERCENTILE_FLOOR, p)
+        return np.where(np.isnan(usd_values), np.nan, p)
+
+    def rank(self, metric, usd_value):
+        """返回 (全球百分位, 全球绝对排名)"""
+        pct = self.percentile(metric, usd_value)
+        return pct, get_absolute_rank(self.total_population, pct)
+
+
+# -------------------------- 按数据版本缓存 --------------------------
+# 每个数据版本一份网格（约 100 KB）：查看不同历史年份的会话各自命中，不会互相淘汰后反复重建
+GLOBAL_CDF_CACHE_SIZE = 32
+GLOBAL_CDF_CACHE = LRUCache(GLOBAL_CDF_CACHE_SIZE)
+
+
+def get_global_cdf(country_data, quantile_tables=None, version=None):
+    """返回当前数据版本的全球 CDF；只有未缓存的版本才构建网格"""
+    version = version or dataset_version(country_data, quantile_tables)
+    return GLOBAL_CDF_CACHE.get_or_create(
+        version, lambda: _shared_global_cdf(version) or GlobalCDF(country_data, quantile_tables, version))
+
+
+def _shared_global_cdf(version):
+    """共享数据的版本与当前数据一致时直接挂载其中的网格，否则返回 None 由本进程计算"""
+    store = get_shared_store()
+    if store is None or store.meta.get("data_version") != version:
+        return None
+    log_grid = store.array("global/log_grid")
+    if log_grid is None or len(log_grid) != GRID_POINTS:
+        return None
+    cdf = {metric: store.array(f"global/cdf/{metric}") for metric in METRIC_FIELDS}
+    return GlobalCDF.from_arrays(version, log_grid, cdf, store.meta["total_population"])
+
+
+def to_usd(amount, country):
+    """当地货币金额换算为美元（usdRate 为每 1 美元对应的当地货币数）"""
+    return amount / country["usdRate"]
@@ -0,0 +1,75 @@
+"""
+历年排名变化：用户当前的收入/资产放到每一年的分布中（金额按最新价格比较），画成一张 SVG 小图
+
+纵轴为「前 x%」的对数刻度，排名越靠前越高；只有一个年份时只画点
+"""
+import math
+
+from wealth_model import METRIC_FIELDS, PERCENTILE_FLOOR, get_country_percentile
+
+SVG_WIDTH, SVG_HEIGHT = 300, 96
+PLOT_LEFT, PLOT_RIGHT = 14, 286
+PLOT_TOP, PLOT_BOTTOM = 10, 78
+
+
+def rank_over_time(history, code, base_record, amounts):
+    """
+    :param history: HistoryStore
+    :param base_record: 当前数据集中该国的记录
+    :param amounts: {"income": 金额, "wealth": 金额}（当前价格）
+    :return: {"years": [...], "income": [百分位...], "wealth": [...], "median_income": [...], "median_wealth": [...]}
+    """
+    result = {"years": []}
+    for metric in amounts:
+        result[metric], result[f"median_{metric}"] = [], []
+    for year in history.years_for(code):
+        record = history.record(code, year, base_record)
+        if record is None:
+            continue
+        result["years"].append(year)
+        for metric, amount in amounts.items():
+            table = history.quantile_table(code, year, metric)
+            result[metric].append(get_country_percentile(record, metric, amount, table))
+            result[f"median_{metric}"].append(record[METRIC_FIELDS[metric][0]])
+    return result
+
+
+def rank_history_svg(years, series):
+    """
+    :param years: 年份列表（升序）
+    :param series: [(百分位列表, 颜色), ...]
+    """
+    shares = [max(1 - p, PERCENTILE_FLOOR) for values, _ in series for p in values]
+    # 纵轴范围取数据的对数范围，上下各留出余量，至少覆盖一个数量级
+    lo, hi = math.log10(min(shares)), math.log10(max(shares))
+    if hi - lo < 1:
+        mid = (hi + lo) / 2
+        lo, hi = mid - 0.5, mid + 0.5
+    span_years = (years[-1] - years[0]) or 1
+
+    def x_of(year):
+        if len(years) == 1:
+            return (PLOT_LEFT + PLOT_RIGHT) / 2
+        return PLOT_LEFT + (year - years[0]) / span_years * (PLOT_RIGHT - PLOT_LEFT)
+
+    def y_of(pct):
+        share = math.log10(max(1 - pct, PERCENTILE_FLOOR))
+        return PLOT_TOP + (share - lo) / (hi - lo) * (PLOT_BOTTOM - PLOT_TOP)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+        f'style="width:100%;height:auto;display:block">',
+        f'<path d="M{PLOT_LEFT} {PLOT_BOTTOM}H{PLOT_RIGHT}" stroke="#e2e8f0" stroke-width="1"/>',
+    ]
+    for values, color in series:
+        points = [f"{x_of(year):.1f} {y_of(p):.1f}" for year, p in zip(years, values)]
+        if len(points) > 1:
+            parts.append(f'<path d="M{"L".join(points)}" fill="none" stroke="{color}" stroke-width="1.5"/>')
+        last_x, last_y = points[-1].split()
+        parts.append(f'<circle cx="{last_x}" cy="{last_y}" r="2.5" fill="{color}"/>')
+    for year in {years[0], years[-1]}:
+        anchor = "start" if year == years[0] and len(years) > 1 else "end" if len(years) > 1 else "middle"
+        parts.append(f'<text x="{x_of(year):.1f}" y="{SVG_HEIGHT - 4}" font-size="8" fill="#94a3b8" '
+                     f'text-anchor="{anchor}">{year}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
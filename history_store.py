@@ -0,0 +1,248 @@
+"""
+多年份历史数据：按 (国家, 年份) 索引的国家参数与分位数表，存为紧凑的列式二进制文件
+
+文件沿用 shared_store 的容器格式（JSON 头部 + 对齐的 float64 数组），每个字段一列，
+形状为 (国家数, 年份数)，缺失为 NaN；分位数表的点集中存放在一个数组里，另有索引数组记录偏移与点数
+打开文件只解析很小的头部，数据通过 mmap 按需读取：选中某个 (国家, 年份) 时才触及对应的几页，
+启动耗时与内存不随年份数增长
+
+金额按价格指数 cpi 换算为该国最新年份的价格（cpi 缺失时不调整），
+因此用户输入的当前金额可以直接与历史分布比较
+
+构建:
+    python history_store.py history.csv --quantile-file history_quantiles.csv -o data/history.store
+history.csv 列: country,year,population,medianIncome,medianWealth,incomeGini,wealthGini[,cpi]
+（incomeGini / wealthGini 为基尼系数，每年的对数正态 sigma 由当年的基尼系数换算）
+history_quantiles.csv 列: country,year,metric,percentile,value
+"""
+import csv
+import functools
+import hashlib
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+from quantile_tables import METRICS, QuantileTable
+from shared_store import SharedStore, StoreWriter
+from wealth_model import GINI_FIELDS, with_sigma
+
+HISTORY_FILE = os.environ.get("WEALTHRANK_HISTORY_FILE", "data/history.store")
+# 历史数据中按年变化的字段；名称、货币、汇率等取自当前数据集
+HISTORY_FIELDS = ("population", "medianIncome", "medianWealth", "incomeGini", "wealthGini")
+PRICE_INDEX_FIELD = "cpi"
+# 需要按价格指数换算的金额字段
+_MONEY_FIELDS = ("medianIncome", "medianWealth")
+
+
+# -------------------------- 1. 读取 --------------------------
+class HistoryStore:
+    """mmap 挂载的历史数据；所有查询按 (国家, 年份) 懒读取并缓存结果"""
+
+    def __init__(self, path):
+        self._store = SharedStore(path)
+        meta = self._store.meta
+        self.path = path
+        self.version = meta["version"]
+        self.years = meta["years"]
+        self._rows = {code: i for i, code in enumerate(meta["countries"])}
+        self._cols = {year: j for j, year in enumerate(self.years)}
+        self._lock = threading.Lock()
+        self._datasets = {}
+
+    def _cell(self, field, code, year):
+        row, col = self._rows.get(code), self._cols.get(year)
+        if row is None or col is None:
+            return math.nan
+        return float(self._store.array(f"field/{field}")[row, col])
+
+    def years_for(self, code):
+        """该国有数据的年份（升序）"""
+        row = self._rows.get(code)
+        if row is None:
+            return []
+        present = self._store.array("field/medianIncome")[row]
+        return [year for year, value in zip(self.years, present.tolist()) if value == value]
+
+    def price_factor(self, code, year):
+        """year 年的本币金额换算为该国最新价格的倍数；缺少价格指数时为 1"""
+        row = self._rows.get(code)
+        if row is None:
+            return 1.0
+        cpi = self._store.array(f"field/{PRICE_INDEX_FIELD}")[row]
+        known = np.flatnonzero(~np.isnan(cpi))
+        current = self._cell(PRICE_INDEX_FIELD, code, year)
+        if not len(known) or not current > 0:
+            return 1.0
+        return float(cpi[known[-1]]) / current
+
+    def record(self, code, year, base_record):
+        """
+        (国家, 年份) 的国家记录，金额已换算为最新价格
+        :param base_record: 当前数据集中该国的记录，提供名称、货币、汇率等不随年份存储的字段
+        :return: 记录字典；该年无数据时返回 None
+        """
+        values = {field: self._cell(field, code, year) for field in HISTORY_FIELDS}
+        if any(math.isnan(v) for v in values.values()):
+            return None
+        factor = self.price_factor(code, year)
+        record = dict(base_record)
+        record.update(values)
+        record["population"] = int(values["population"])
+        for field in _MONEY_FIELDS:
+            record[field] = values[field] * factor
+        # 当前数据集中的 sigma（可能是拟合值）不适用于历史年份
+        return with_sigma(record)
+
+    def quantile_table(self, code, year, metric):
+        """(国家, 年份, 指标) 的分位数表（数值已换算为最新价格）；没有时返回 None"""
+        row, col = self._rows.get(code), self._cols.get(year)
+        if row is None or col is None:
+            return None
+        offset, count = self._store.array("quantile/index")[row, col, METRICS.index(metric)].tolist()
+        if not count:
+            return None
+        points = self._store.array("quantile/points")[offset:offset + count]
+        return QuantileTable(points[:, 1] * self.price_factor(code, year), points[:, 0])
+
+    def year_dataset(self, year, base_records):
+        """
+        某一年的完整数据集，供排名、全球网格等直接使用
+        :param base_records: 当前数据集；只包含当前数据集中存在且该年有数据的国家
+        :return: (records, quantile_tables)
+        """
+        key = (year, id(base_records))
+        with self._lock:
+            cached = self._datasets.get(key)
+            if cached is not None and cached[0] is base_records:
+                return cached[1]
+        records, tables = {}, {}
+        for code, base in base_records.items():
+            record = self.record(code, year, base)
+            if record is None:
+                continue
+            records[code] = record
+            for metric in METRICS:
+                table = self.quantile_table(code, year, metric)
+                if table is not None:
+                    tables[(code, metric)] = table
+        with self._lock:
+            # 数据集热加载后旧快照的结果不再需要
+            self._datasets = {k: v for k, v in self._datasets.items() if v[0] is base_records}
+            self._datasets[key] = (base_records, (records, tables))
+        return records, tables
+
+
+@functools.lru_cache(maxsize=2)
+def _open_cached(path, mtime):
+    return HistoryStore(path)
+
+
+def get_history_store(path=HISTORY_FILE):
+    """按文件修改时间缓存的历史数据；文件不存在时返回 None（界面不显示年份选择）"""
+    if not path or not os.path.exists(path):
+        return None
+    return _open_cached(path, os.path.getmtime(path))
+
+
+# -------------------------- 2. 构建 --------------------------
+def _read_history_rows(path):
+    rows, errors = {}, []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for line, raw in enumerate(csv.DictReader(f), start=2):
+            code = (raw.get("country") or raw.get("code") or "").strip().upper()
+            try:
+                year = int(raw["year"])
+                values = {field: float(raw[field]) for field in HISTORY_FIELDS}
+                cpi = raw.get(PRICE_INDEX_FIELD)
+                values[PRICE_INDEX_FIELD] = float(cpi) if cpi not in (None, "") else math.nan
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append(f"第 {line} 行: 无法解析 ({e})")
+                continue
+            if not code:
+                errors.append(f"第 {line} 行: 缺少国家代码")
+            elif (code, year) in rows:
+                errors.append(f"第 {line} 行: {code} {year} 重复")
+            elif not all(v > 0 for k, v in values.items() if k != PRICE_INDEX_FIELD) or values[PRICE_INDEX_FIELD] <= 0:
+                errors.append(f"第 {line} 行: 数值必须为正数")
+            elif not all(values[field] < 1 for field in GINI_FIELDS.values()):
+                errors.append(f"第 {line} 行: 基尼系数必须小于 1")
+            else:
+                rows[(code, year)] = values
+    if errors:
+        raise ValueError("历史数据校验失败:\n  " + "\n  ".join(errors))
+    return rows
+
+
+def _read_history_quantiles(path):
+    points = {}
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = (row["country"].strip().upper(), int(row["year"]), row["metric"].strip().lower())
+            points.setdefault(key, []).append((float(row["percentile"]), float(row["value"])))
+    return points
+
+
+def build_history(history_csv, output, quantile_csv=None):
+    """读取 CSV、校验后写出列式文件（原子替换）；返回 (国家数, 年份数, 文件字节数)"""
+    rows = _read_history_rows(history_csv)
+    countries = sorted({code for code, _ in rows})
+    years = sorted({year for _, year in rows})
+    row_of = {code: i for i, code in enumerate(countries)}
+    col_of = {year: j for j, year in enumerate(years)}
+
+    columns = {field: np.full((len(countries), len(years)), np.nan) for field in HISTORY_FIELDS + (PRICE_INDEX_FIELD,)}
+    for (code, year), values in rows.items():
+        for field, value in values.items():
+            columns[field][row_of[code], col_of[year]] = value
+
+    index = np.zeros((len(countries), len(years), len(METRICS), 2), dtype=np.int64)
+    chunks, offset = [], 0
+    for (code, year, metric), pts in sorted((_read_history_quantiles(quantile_csv) if quantile_csv else {}).items()):
+        if (code, year) not in rows:
+            raise ValueError(f"{code} {year}: 分位数表没有对应的国家参数")
+        if metric not in METRICS:
+            raise ValueError(f"{code} {year}: 未知指标 {metric!r}（可选 {', '.join(METRICS)}）")
+        pts = np.array(sorted(pts, key=lambda p: p[1]), dtype=np.float64)
+        # 与 quantile_tables 相同：同时接受 0-1 与 0-100 两种写法
+        if pts[:, 0].max() > 1:
+            pts[:, 0] /= 100
+        try:
+            QuantileTable(pts[:, 1], pts[:, 0])
+        except ValueError as e:
+            raise ValueError(f"{code} {year}/{metric}: {e}") from None
+        index[row_of[code], col_of[year], METRICS.index(metric)] = (offset, len(pts))
+        chunks.append(pts)
+        offset += len(pts)
+    points = np.concatenate(chunks) if chunks else np.zeros((0, 2))
+
+    digest = hashlib.sha1()
+    for array in [*columns.values(), index, points]:
+        digest.update(array.tobytes())
+    writer = StoreWriter({"version": digest.hexdigest()[:16], "countries": countries, "years": years})
+    for field, array in columns.items():
+        writer.add_array(f"field/{field}", array)
+    writer.add_array("quantile/index", index)
+    writer.add_array("quantile/points", points)
+    return len(countries), len(years), writer.publish(output)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把多年份国家参数（及分位数表）转换为 mmap 读取的列式文件")
+    parser.add_argument("input", help="历史国家参数 CSV")
+    parser.add_argument("--quantile-file", default=None, help="历史分位数表 CSV（可选）")
+    parser.add_argument("-o", "--output", default=HISTORY_FILE, help=f"输出路径 (默认: {HISTORY_FILE})")
+    args = parser.parse_args(argv)
+    try:
+        n_countries, n_years, size = build_history(args.input, args.output, args.quantile_file)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    print(f"已写入 {args.output}: {n_countries} 个国家 × {n_years} 个年份，{size / 1024:.0f} KB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+预编译的 HTML 片段：页面 CSS 与各语言的静态 HTML 在导入时压缩、生成一次，
+重跑时只用 str.format 填入动态数值，减少每次重跑的字符串拼接和发送给浏览器的字节数
+"""
+import re
+
+# -------------------------- 1. 压缩 --------------------------
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_AROUND = re.compile(r"\s*([{};:,>])\s*")
+_HTML_BETWEEN_TAGS = re.compile(r">\s+<")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def minify_css(css):
+    """去掉注释与多余空白；不处理字符串中的特殊字符（本页 CSS 中没有）"""
+    css = _CSS_COMMENT.sub("", css)
+    css = _WHITESPACE.sub(" ", css)
+    css = _CSS_SPACE_AROUND.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_html(html):
+    """折叠标签之间及连续的空白，结果为单行，也避免 Markdown 把缩进的 HTML 当作代码块"""
+    return _WHITESPACE.sub(" ", _HTML_BETWEEN_TAGS.sub("><", html)).strip()
+
+
+def _literal(value):
+    # 文案中的花括号在 str.format 模板里需要转义
+    return str(value).replace("{", "{{").replace("}", "}}")
+
+
+# -------------------------- 2. 页面样式 --------------------------
+_PAGE_CSS = """
+    /* 1. 彻底隐藏Streamlit默认干扰元素 */
+    header, [data-testid="stSidebar"], footer, .stDeployButton, [data-testid="stToolbar"] {
+        display: none !important;
+    }
+    
+    /* 2. 全局样式重置 - 关键：给最外层加基础留白 */
+    .stApp {
+        background-color: #f8fafc !important;
+        font-family: 'Inter', -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif !important;
+        padding-bottom: 80px !important;
+        padding-left: 1rem !important;  /* 全局左留白 */
+        padding-right: 1rem !important; /* 全局右留白 */
+        margin: 0 !important;
+    }
+    
+    /* 3. 底部导航核心样式 - 纯文字现代风 */
+    .bottom-nav {
+        position: fixed !important;
+        bottom: 0 !important;
+        left: 0 !important;
+        width: 100% !important;
+        height: 60px !important;
+        background-color: rgba(255, 255, 255, 0.90) !important;
+        backdrop-filter: blur(16px) !important;
+        border-top: 1px solid rgba(226, 232, 240, 0.8) !important;
+        display: flex !important;
+        align-items: center !important;
+        justify-content: space-between !important;
+        padding: 0 10px !important;
+        box-shadow: 0 -4px 20px rgba(0, 0, 0, 0.03) !important;
+        z-index: 9999 !important;
+        box-sizing: border-box !important;
+    }
+    
+    /* 4. 导航项样式 */
+    .nav-item {
+        display: flex !important;
+        align-items: center !important;
+        justify-content: center !important;
+        width: 100% !important;
+        height: 40px !important;
+        color: #94a3b8 !important;
+        text-decoration: none !important;
+        font-size: 0.70rem !important; /* 缩小适配8个项 */
+        font-weight: 600 !important;
+        letter-spacing: -0.01em !important;
+        border-radius: 8px !important;
+        transition: all 0.2s ease !important;
+        margin: 0 2px !important;
+        white-space: nowrap !important; /* 禁止换行 */
+        overflow: hidden !important; /* 超出隐藏 */
+        text-overflow: ellipsis !important; /* 超长显示省略号 */
+    }
+    
+    .nav-item:hover {
+        background-color: rgba(241, 245, 249, 0.8) !important;
+        color: #64748b !important;
+    }
+    
+    .nav-item.active {
+        color: #2563eb !important;
+        background-color: rgba(59, 130, 246, 0.1) !important;
+    }
+    
+    .nav-item.active::before {
+        display: none !important;
+    }
+
+    /* --------------------------------------------------- */
+    /* 核心：主内容容器 - 强制居中 + 限制宽度 + 留白 */
+    /* --------------------------------------------------- */
+    .main-content {
+        max-width: 900px !important; /* 内容最大宽度（可调整：800/1000px） */
+        margin: 0 auto !important;     /* 左右自动居中 */
+        padding: 2rem 1.5rem 1rem 1.5rem !important; /* 内部留白 */
+        box-sizing: border-box !important; /* 内边距计入宽度 */
+        width: 100% !important; /* 确保容器占满可用宽度 */
+    }
+
+    /* 标题样式 */
+    .page-title {
+        font-size: 2rem !important;
+        font-weight: 800 !important;
+        color: #1e293b !important;
+        letter-spacing: -0.02em !important;
+        margin-bottom: 0.5rem !important;
+    }
+    .page-subtitle {
+        color: #64748b !important;
+        font-size: 1rem !important;
+        margin-bottom: 2rem !important;
+        font-weight: 400 !important;
+    }
+
+    /* 修复卡片样式 - 适配居中容器 */
+    [data-testid="stVerticalBlockBorderWrapper"] {
+        background-color: #ffffff !important;
+        border-radius: 16px !important;
+        padding: 24px !important;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.02), 0 2px 4px -1px rgba(0, 0, 0, 0.02) !important;
+        border: 1px solid #f1f5f9 !important;
+        width: 100% !important; /* 强制卡片宽度适配容器 */
+        box-sizing: border-box !important;
+    }
+    [data-testid="stVerticalBlockBorderWrapper"] > div {
+        padding: 0 !important;
+    }
+    
+    /* 结果指标卡片 - 适配居中布局 */
+    .metric-card {
+        background: white !important; 
+        border: 1px solid #eef2f7 !important; 
+        border-radius: 16px !important; 
+        padding: 16px !important; 
+        text-align: center !important;
+        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.03), 0 4px 6px -2px rgba(0, 0, 0, 0.02) !important;
+        box-sizing: border-box !important;
+        width: 100% !important; /* 适配容器宽度 */
+        transition: transform 0.2s ease !important;
+        height: auto !important; /* 取消固定高度，自适应内容 */
+    }
+    .metric-card:hover {
+        transform: translateY(-2px) !important;
+    }
+
+    /* 按钮样式 - 适配居中容器 */
+    div.stButton > button, div.stFormSubmitButton > button {
+        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%) !important;
+        color: white !important; 
+        border-radius: 10px !important; 
+        padding: 0.7rem 1.5rem !important;
+        font-weight: 600 !important;
+        border: none !important;
+        width: 100% !important;
+        box-shadow: 0 4px 6px -1px rgba(37, 99, 235, 0.2) !important;
+        transition: all 0.2s !important;
+        box-sizing: border-box !important;
+    }
+    div.stButton > button:hover, div.stFormSubmitButton > button:hover {
+        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.3) !important;
+        transform: translateY(-1px) !important;
+    }
+    
+    /* 输入框样式 - 适配居中布局 */
+    .stSelectbox, .stNumberInput {
+        width: 100% !important;
+        box-sizing: border-box !important;
+    }
+    .stSelectbox label, .stNumberInput label {
+        color: #475569 !important;
+        font-weight: 500 !important;
+        font-size: 0.9rem !important;
+    }
+
+    /* 修复列布局溢出问题 */
+    [data-testid="stHorizontalBlock"] {
+        width: 100% !important;
+        box-sizing: border-box !important;
+        gap: 1rem !important; /* 列之间的间距 */
+    }
+
+    /* 人群矩阵样式 */
+    .matrix-legend {
+        display: flex;
+        justify-content: center;
+        gap: 20px;
+        margin-top: 10px;
+        font-size: 0.75rem;
+        color: #64748b;
+    }
+    .legend-item {
+        display: flex;
+        align-items: center;
+        gap: 5px;
+    }
+    .legend-color {
+        width: 12px;
+        height: 12px;
+        border-radius: 3px;
+    }"""
+PAGE_STYLE_HTML = f"<style>{minify_css(_PAGE_CSS)}</style>"
+
+
+# -------------------------- 3. 各语言的 HTML 模板 --------------------------
+# 底部导航：(链接, 文案键, 是否当前页)
+NAV_LINKS = (
+    ("https://youqian.streamlit.app/", "nav_1", True),
+    ("https://fangchan.streamlit.app/", "nav_2", False),
+    ("https://fangjia.streamlit.app/", "nav_3", False),
+    ("https://chuhai.streamlit.app/", "nav_4", False),
+    ("https://chuhai.streamlit.app/", "nav_5", False),
+    ("https://chuhai.streamlit.app/", "nav_6", False),
+    ("https://qfschina.streamlit.app/", "nav_7", False),
+    ("https://fangjia.streamlit.app/", "nav_8", False),
+)
+
+_METRIC_CARD = """
+<div style="margin-top: 15px; padding: 0 10px;">
+    <div style="font-size: 2rem; font-weight: 700; color: #0f172a; line-height: 1.1; margin-bottom: 12px;">
+        <span style="font-size: 1.2rem; color: #64748b; font-weight: 600; margin-right: 4px;">{currency}</span>{amount}
+    </div>
+    <div style="background-color: #f8fafc; border-radius: 8px; padding: 12px; margin-top: 10px;">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 4px;">
+            <span style="font-size: 0.85rem; color: #64748b;">排名百分比</span>
+            <span style="color: {color_high}; font-weight: 700; font-size: 1.1rem;">[rank_prefix] {top_percent:.1f}%</span>
+        </div>
+        <div style="width: 100%; height: 6px; background: #e2e8f0; border-radius: 3px; overflow: hidden;">
+            <div style="width: {width}%; height: 100%; background: {color_high}; border-radius: 3px;"></div>
+        </div>
+        <div style="font-size: 0.75rem; color: #94a3b8; margin-top: 8px; text-align: right;">
+            [rank_approx] {rank}
+        </div>
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 10px; padding-top: 8px; border-top: 1px dashed #e2e8f0;">
+            <span style="font-size: 0.85rem; color: #64748b;">[global_rank]</span>
+            <span style="color: #0f172a; font-weight: 600; font-size: 0.95rem;">[rank_prefix] {global_top_percent:.1f}%</span>
+        </div>
+        <div style="font-size: 0.75rem; color: #94a3b8; margin-top: 4px; text-align: right;">
+            [rank_approx] {global_rank}
+        </div>
+    </div>
+</div>
+"""
+
+_JOINT_CARD = """
+<div style="margin-top: 15px; padding: 0 10px;">
+    <div style="font-size: 0.85rem; color: #64748b; margin-bottom: 12px;">[joint_note]</div>
+    <div style="background-color: #f8fafc; border-radius: 8px; padding: 12px; margin-top: 10px;">
+        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 4px;">
+            <span style="font-size: 0.85rem; color: #64748b;">排名百分比</span>
+            <span style="color: {color_high}; font-weight: 700; font-size: 1.1rem;">[rank_prefix] {top_percent:.1f}%</span>
+        </div>
+        <div style="width: 100%; height: 6px; background: #e2e8f0; border-radius: 3px; overflow: hidden;">
+            <div style="width: {width}%; height: 100%; background: {color_high}; border-radius: 3px;"></div>
+        </div>
+        <div style="font-size: 0.75rem; color: #94a3b8; margin-top: 8px; text-align: right;">
+            [rank_approx] {rank}
+        </div>
+    </div>
+</div>
+"""
+
+_THRESHOLD_TABLE = """
+<table style="width: 100%; border-collapse: collapse; font-size: 0.85rem; color: #334155;">
+    <thead>
+        <tr style="color: #64748b; text-align: right; border-bottom: 1px solid #e2e8f0;">
+            <th style="text-align: left; padding: 6px 8px; font-weight: 600;">[threshold_rank]</th>
+            <th style="padding: 6px 8px; font-weight: 600;">[income]</th>
+            <th style="padding: 6px 8px; font-weight: 600;">[wealth]</th>
+        </tr>
+    </thead>
+    <tbody>{rows}</tbody>
+</table>
+"""
+
+_THRESHOLD_ROW = """
+<tr style="text-align: right; border-bottom: 1px solid #f1f5f9;">
+    <td style="text-align: left; padding: 6px 8px; font-weight: 600;">[rank_prefix] {top}</td>
+    <td style="padding: 6px 8px;">{currency}{income}</td>
+    <td style="padding: 6px 8px;">{currency}{wealth}</td>
+</tr>
+"""
+
+_HISTORY_ROW = """
+<div style="display: flex; align-items: center; gap: 6px; font-size: 0.8rem; color: #475569; margin-top: 6px;">
+    <span style="width: 10px; height: 10px; border-radius: 2px; background-color: {color};"></span>
+    <span><b>{label}</b> [rank_prefix] {first_top} → {last_top} · [history_median] {currency}{first_median} → {currency}{last_median}</span>
+</div>
+"""
+
+_LEGEND = """
+<div class="matrix-legend">
+    <div class="legend-item">
+        <div class="legend-color" style="background-color: {color_high};"></div>
+        <span>[matrix_legend_high]</span>
+    </div>
+    <div class="legend-item">
+        <div class="legend-color" style="background-color: {color_low};"></div>
+        <span>[matrix_legend_low]</span>
+    </div>
+</div>
+"""
+
+_CARD_HEADER = """
+<div class="metric-card" style="border-top: 4px solid {color} !important;">
+    <div style="color: #64748b; font-size: 0.8rem; font-weight: 700; text-transform: uppercase; letter-spacing: 0.05em; margin-bottom: 15px;">
+        {title}
+    </div>
+"""
+
+_FOOTER = """
+<div style='text-align:center; color:#94a3b8; font-size:0.75rem; margin-top:40px; line-height: 1.5;'>
+    [disclaimer]<br>
+    <span style="opacity: 0.7">{visit_text}</span>
+</div>
+"""
+
+_TEXT_KEY = re.compile(r"\[(\w+)\]")
+
+
+def _fill_text(template, text):
+    """把 [键] 替换为该语言的文案（已转义花括号），保留 {字段} 供重跑时填入"""
+    return _TEXT_KEY.sub(lambda m: _literal(text[m.group(1)]), minify_html(template))
+
+
+def compile_language_templates(text):
+    """
+    为一种语言生成全部 HTML 模板
+    :param text: TRANSLATIONS 中该语言的文案
+    :return: dict；值为完整的 HTML 字符串，或待 str.format 填充的模板
+    """
+    nav_items = "".join(
+        f'<a href="{href}" class="nav-item{" active" if active else ""}" target="{"_self" if active else "_blank"}">{text[key]}</a>'
+        for href, key, active in NAV_LINKS
+    )
+    # 图例文案中的 {:.1f} 是占位符，改名为 {top_percent:.1f} 后不做转义
+    legend_high = text["matrix_legend_high"].replace("{:.1f}", "\0")
+    legend = _fill_text(_LEGEND, dict(text, matrix_legend_high=legend_high)).replace("\0", "{top_percent:.1f}")
+    return {
+        "nav": f'<div class="bottom-nav">{nav_items}</div>',
+        "header": f"<div class='page-title'>{text['title']}</div><div class='page-subtitle'>{text['subtitle']}</div>",
+        "card_header": {
+            metric: minify_html(_CARD_HEADER).replace("{title}", _literal(text[f"card_{metric}"]))
+            for metric in ("income", "wealth", "joint")
+        },
+        "section_input": f"<div style='font-weight:600; color:#334155; margin-bottom:12px; font-size:0.95rem;'>1. {text['section_input']}</div>",
+        "section_result": f"<div style='font-weight:600; color:#334155; margin-bottom:12px; margin-top: 10px; font-size:0.95rem;'>2. {text['section_result']}</div>",
+        "legend": legend,
+        "metric_card": _fill_text(_METRIC_CARD, text),
+        "joint_card": _fill_text(_JOINT_CARD, text),
+        "threshold_table": _fill_text(_THRESHOLD_TABLE, text),
+        "threshold_row": _fill_text(_THRESHOLD_ROW, text),
+        "history_row": _fill_text(_HISTORY_ROW, text),
+        "footer": _fill_text(_FOOTER, text),
+    }
@@ -0,0 +1,161 @@
+"""
+收入与资产的联合排名：收入和资产都高于用户的人群占比
+
+两个边际分布沿用各自的模型（对数正态或分位数表），相关性用高斯 copula 描述：
+    z1 = Φ⁻¹(收入百分位), z2 = Φ⁻¹(资产百分位)
+    P(收入和资产都更高) = Φ2(-z1, -z2; ρ)
+二元正态 CDF 按 ρ 在等距 z 网格上一次性数值积分，之后每次查询只做一次双线性插值
+网格存储 log Φ2，尾部（顶尖用户）的小概率也能保持相对精度
+"""
+import functools
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from shared_store import get_shared_store
+from wealth_model import (
+    PERCENTILE_CEIL, PERCENTILE_FLOOR, get_absolute_rank, get_absolute_rank_batch, norm_cdf_batch, norm_ppf_batch,
+)
+
+# 国家记录未提供 incomeWealthCorr 时使用的收入-资产相关系数
+DEFAULT_CORRELATION = 0.6
+# z 网格范围与点数：百分位上下限 0.0001/0.9999 对应 |z| ≈ 3.72，网格需覆盖它
+Z_LIMIT = 4.0
+GRID_POINTS = 321
+# 积分步长为网格步长的 1/INTEGRATION_SUBSTEPS，积分下限取足够远的尾部
+INTEGRATION_SUBSTEPS = 5
+INTEGRATION_LOWER = -9.0
+# log Φ2 的下限，避免 log(0)
+_LOG_FLOOR = -700.0
+
+_STANDARD_NORMAL = NormalDist()
+
+
+class BivariateNormalGrid:
+    """相关系数为 rho 的标准二元正态 CDF，存为等距 z 网格上的 log 值"""
+
+    __slots__ = ("rho", "z", "log_cdf", "_z0", "_step", "_last")
+
+    def __init__(self, rho, limit=Z_LIMIT, points=GRID_POINTS):
+        self.rho = rho
+        self.z = np.linspace(-limit, limit, points)
+        self._z0 = float(self.z[0])
+        self._step = float(self.z[1] - self.z[0])
+        self._last = points - 1
+        self.log_cdf = self._build()
+
+    @classmethod
+    def from_array(cls, rho, log_cdf, limit=Z_LIMIT):
+        """由已算好的 log Φ2 网格构造（如共享内存中的只读数组），跳过数值积分"""
+        self = cls.__new__(cls)
+        points = log_cdf.shape[0]
+        self.rho = rho
+        self.z = np.linspace(-limit, limit, points)
+        self._z0 = float(self.z[0])
+        self._step = float(self.z[1] - self.z[0])
+        self._last = points - 1
+        self.log_cdf = log_cdf
+        return self
+
+    def _build(self):
+        """
+        Φ2(a, b; ρ) = ∫_{-∞}^{a} φ(s) Φ((b - ρs) / √(1-ρ²)) ds
+        对每个 b 沿 s 做累积梯形积分，一次得到所有 a 上的值
+        """
+        h = self._step / INTEGRATION_SUBSTEPS
+        n_tail = int(round((self._z0 - INTEGRATION_LOWER) / h))
+        s = self._z0 - h * np.arange(n_tail, -1, -1)                       # 积分下限 .. 网格起点
+        s = np.concatenate([s, self._z0 + h * np.arange(1, self._last * INTEGRATION_SUBSTEPS + 1)])
+        sigma = math.sqrt(1 - self.rho * self.rho)
+        density = np.exp(-0.5 * s * s) / math.sqrt(2 * math.pi)
+        integrand = density[:, None] * norm_cdf_batch((self.z[None, :] - self.rho * s[:, None]) / sigma)
+        cumulative = np.concatenate([np.zeros((1, len(self.z))), np.cumsum((integrand[1:] + integrand[:-1]) * (h / 2), axis=0)])
+        cdf = cumulative[n_tail::INTEGRATION_SUBSTEPS]                         # 取网格点 a = z[i] 所在的行
+        with np.errstate(divide="ignore"):
+            return np.ascontiguousarray(np.maximum(np.log(np.clip(cdf, 0.0, 1.0)), _LOG_FLOOR))
+
+    def cdf(self, a, b):
+        """Φ2(a, b; ρ)：在 log 网格上双线性插值，超出网格的坐标截断到边界"""
+        x = min(max((a - self._z0) / self._step, 0.0), float(self._last))
+        y = min(max((b - self._z0) / self._step, 0.0), float(self._last))
+        i, j = min(int(x), self._last - 1), min(int(y), self._last - 1)
+        tx, ty = x - i, y - j
+        g = self.log_cdf
+        top = g[i, j] + (g[i, j + 1] - g[i, j]) * ty
+        bottom = g[i + 1, j] + (g[i + 1, j + 1] - g[i + 1, j]) * ty
+        return math.exp(top + (bottom - top) * tx)
+
+    def cdf_batch(self, a, b):
+        """cdf 的向量化版本，a / b 为同长度数组（不含 NaN）"""
+        x = np.clip((np.asarray(a, dtype=np.float64) - self._z0) / self._step, 0.0, self._last)
+        y = np.clip((np.asarray(b, dtype=np.float64) - self._z0) / self._step, 0.0, self._last)
+        i = np.minimum(x.astype(np.intp), self._last - 1)
+        j = np.minimum(y.astype(np.intp), self._last - 1)
+        tx, ty = x - i, y - j
+        g = self.log_cdf
+        top = g[i, j] + (g[i, j + 1] - g[i, j]) * ty
+        bottom = g[i + 1, j] + (g[i + 1, j + 1] - g[i + 1, j]) * ty
+        return np.exp(top + (bottom - top) * tx)
+
+
+@functools.lru_cache(maxsize=16)
+def get_bivariate_grid(rho):
+    """按相关系数懒加载网格；相关系数相同的国家共用同一张网格，共享数据中已有时直接挂载"""
+    store = get_shared_store()
+    if store is not None and store.meta.get("joint_grid") == [Z_LIMIT, GRID_POINTS]:
+        log_cdf = store.array(joint_store_key(rho))
+        if log_cdf is not None:
+            return BivariateNormalGrid.from_array(rho, log_cdf)
+    return BivariateNormalGrid(rho)
+
+
+def joint_store_key(rho):
+    return f"joint/{rho:.4f}"
+
+
+def country_correlation(country):
+    return round(float(country.get("incomeWealthCorr", DEFAULT_CORRELATION)), 4)
+
+
+def get_joint_rank(country, income_percentile, wealth_percentile):
+    """
+    联合百分位与绝对排名
+    :param country: 国家记录（可选字段 incomeWealthCorr 为收入-资产相关系数）
+    :param income_percentile: 收入在本国的百分位（0-1）
+    :param wealth_percentile: 资产在本国的百分位（0-1）
+    :return: (联合百分位, 绝对排名)；1 - 联合百分位 即收入和资产都高于用户的人群占比
+    """
+    grid = get_bivariate_grid(country_correlation(country))
+    z_income = _STANDARD_NORMAL.inv_cdf(min(max(income_percentile, PERCENTILE_FLOOR), PERCENTILE_CEIL))
+    z_wealth = _STANDARD_NORMAL.inv_cdf(min(max(wealth_percentile, PERCENTILE_FLOOR), PERCENTILE_CEIL))
+    # 两项都更高的概率 P(Z1 > z1, Z2 > z2) = Φ2(-z1, -z2; ρ)
+    both_higher = grid.cdf(-z_income, -z_wealth)
+    pct = min(max(1 - both_higher, PERCENTILE_FLOOR), PERCENTILE_CEIL)
+    return pct, get_absolute_rank(country["population"], pct)
+
+
+def get_joint_rank_batch(country_data, country_codes, income_percentiles, wealth_percentiles):
+    """
+    get_joint_rank 的向量化版本：相关系数相同的行共用一张网格，一次插值
+    :param country_data: 国家代码 -> 国家记录
+    :param country_codes: 国家代码数组，未知代码对应结果为 NaN
+    :param income_percentiles: 收入百分位数组（NaN 表示缺失）
+    :param wealth_percentiles: 资产百分位数组（NaN 表示缺失）
+    :return: (联合百分位数组, 绝对排名数组)，任一百分位缺失的行为 NaN
+    """
+    codes = list(country_codes)
+    income = np.asarray(income_percentiles, dtype=np.float64)
+    wealth = np.asarray(wealth_percentiles, dtype=np.float64)
+    known = [c in country_data for c in codes]
+    rhos = np.array([country_correlation(country_data[c]) if k else np.nan for c, k in zip(codes, known)], dtype=np.float64)
+    populations = np.array([country_data[c]["population"] if k else np.nan for c, k in zip(codes, known)], dtype=np.float64)
+    z_income = norm_ppf_batch(np.clip(income, PERCENTILE_FLOOR, PERCENTILE_CEIL))
+    z_wealth = norm_ppf_batch(np.clip(wealth, PERCENTILE_FLOOR, PERCENTILE_CEIL))
+    valid = ~(np.isnan(rhos) | np.isnan(z_income) | np.isnan(z_wealth))
+    pct = np.full(len(codes), np.nan)
+    for rho in np.unique(rhos[valid]).tolist():
+        rows = valid & (rhos == rho)
+        both_higher = get_bivariate_grid(rho).cdf_batch(-z_income[rows], -z_wealth[rows])
+        pct[rows] = np.clip(1 - both_higher, PERCENTILE_FLOOR, PERCENTILE_CEIL)
+    return pct, get_absolute_rank_batch(populations, pct)
@@ -0,0 +1,63 @@
+"""
+进程级的有界 LRU 缓存，供渲染（人群矩阵、密度曲线）与数据层（全球 CDF、跨国比较、推演）共用
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """线程安全的有界 LRU 缓存，带命中/未命中计数"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # 在锁外创建，避免一次慢的渲染/计算阻塞其他会话的缓存命中
+        value = factory()
+        self.put(key, value)
+        return value
+
+    def get(self, key, default=None):
+        """只查询不创建；结果需要分步生成（如逐块计算的推演）时，由调用方完成后再 put"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,170 @@
+"""
+每次脚本运行的分阶段计时与按需性能剖析
+
+- WEALTHRANK_TRACE=1 时记录每次运行各阶段的耗时，内存中保留滚动窗口并计算 p50/p95/p99，
+  定期写入 WEALTHRANK_TRACE_DIR 下的 metrics.prom（Prometheus 文本格式）和 runs.jsonl
+- 设置 WEALTHRANK_PROFILE_TOKEN 后，运维在页面地址后加 ?profile=<token> 即可对该会话的运行做 cProfile，
+  结果保存为 .pstats 文件
+- 关闭时 begin_run 返回空实现，每个计时点只是一次空方法调用
+"""
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TRACE_ENABLED = os.environ.get("WEALTHRANK_TRACE", "0") == "1"
+TRACE_DIR = os.environ.get("WEALTHRANK_TRACE_DIR", "perf")
+PROFILE_TOKEN = os.environ.get("WEALTHRANK_PROFILE_TOKEN", "")
+WINDOW_SIZE = 2000          # 每个阶段保留的最近样本数
+DUMP_INTERVAL_SECONDS = 10.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# -------------------------- 滚动统计 --------------------------
+class PhaseStats:
+    """每个阶段一个定长窗口；分位数在导出时才计算，记录时只是一次 append"""
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}     # phase -> [count, sum]，累计值，用于 Prometheus 的 _count/_sum
+        self._pending_lines = []
+        self._last_dump = time.monotonic()
+
+    def record(self, kind, phases, total):
+        line = {"ts": round(time.time(), 3), "kind": kind, "total_ms": round(total * 1e3, 3),
+                "phases": {name: round(seconds * 1e3, 3) for name, seconds in phases}}
+        with self._lock:
+            for name, seconds in list(phases) + [(f"{kind}_total", total)]:
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+                totals = self._totals.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+            self._pending_lines.append(line)
+            due = time.monotonic() - self._last_dump >= DUMP_INTERVAL_SECONDS
+        if due:
+            self.dump()
+
+    def summary(self):
+        """{阶段: {"count": 累计次数, "p50": 秒, "p95": 秒, "p99": 秒}}"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            totals = {name: tuple(t) for name, t in self._totals.items()}
+        result = {}
+        for name, samples in snapshot.items():
+            stats = {"count": totals[name][0], "sum": totals[name][1]}
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}"] = samples[min(len(samples) - 1, int(q * len(samples)))]
+            result[name] = stats
+        return result
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP wealthrank_phase_seconds Wall time of each script-run phase (rolling window quantiles).",
+            "# TYPE wealthrank_phase_seconds summary",
+        ]
+        for name, stats in sorted(self.summary().items()):
+            for q in QUANTILES:
+                lines.append(f'wealthrank_phase_seconds{{phase="{name}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'wealthrank_phase_seconds_count{{phase="{name}"}} {stats["count"]}')
+            lines.append(f'wealthrank_phase_seconds_sum{{phase="{name}"}} {stats["sum"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory=None):
+        """写出 metrics.prom（原子替换）并追加 runs.jsonl"""
+        directory = directory or TRACE_DIR
+        with self._lock:
+            lines, self._pending_lines = self._pending_lines, []
+            self._last_dump = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        if lines:
+            with open(os.path.join(directory, "runs.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+        target = os.path.join(directory, "metrics.prom")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, target)
+
+
+PHASE_STATS = PhaseStats()
+
+
+# -------------------------- 单次运行 --------------------------
+_local = threading.local()
+_profile_seq = itertools.count(1)
+
+
+class RunTrace:
+    """一次脚本运行（或片段重跑）的计时：lap(name) 记录距上一个计时点的耗时"""
+
+    __slots__ = ("kind", "record", "_start", "_last", "_phases", "_profiler")
+
+    def __init__(self, kind, record=True, profile=False):
+        self.kind = kind
+        self.record = record
+        self._phases = []
+        self._profiler = None
+        if profile:
+            # 只有运维开启剖析的会话才需要 cProfile，不在启动时导入
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = self._last = time.perf_counter()
+        _local.trace = self
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._phases.append((name, now - self._last))
+        self._last = now
+
+    def finish(self):
+        total = time.perf_counter() - self._start
+        if getattr(_local, "trace", None) is self:
+            _local.trace = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            name = f"profile-{self.kind}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_seq)}.pstats"
+            self._profiler.dump_stats(os.path.join(TRACE_DIR, name))
+            self._profiler = None
+        if self.record:
+            PHASE_STATS.record(self.kind, self._phases, total)
+
+
+class _NullTrace:
+    kind = None
+
+    def lap(self, name):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def profile_requested(query_value):
+    """?profile=<token> 与服务器配置的令牌一致时才开启剖析；未配置令牌则永不开启"""
+    return bool(PROFILE_TOKEN) and bool(query_value) and hmac.compare_digest(str(query_value), PROFILE_TOKEN)
+
+
+def begin_run(kind="app", profile=False):
+    """开始一次运行的计时；既不记录也不剖析时返回空实现"""
+    if not TRACE_ENABLED and not profile:
+        return NULL_TRACE
+    return RunTrace(kind, record=TRACE_ENABLED, profile=profile)
+
+
+def current_trace(kind="fragment", profile=False):
+    """返回本线程正在进行的计时；片段单独重跑时没有外层计时，新开一个"""
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        return trace
+    return begin_run(kind, profile)
@@ -0,0 +1,169 @@
+"""
+经验分位数表：用真实的收入/资产分位数据代替单一的对数正态模型
+
+分位点按数值排序后存为紧凑的 float64 数组，查询时二分查找所在区间，
+再在 (log 数值, 累计概率) 空间做单调三次 Hermite (PCHIP) 插值，保证百分位随数值单调不减
+表最高点以上的百分位取最高点的百分位；门槛表在那里接 Pareto 尾部，指数 tail_alpha 由最高的两个分位点估计
+"""
+import bisect
+import csv
+import functools
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+from wealth_model import PERCENTILE_CEIL, PERCENTILE_FLOOR
+
+QUANTILE_TABLE_FILE = os.environ.get("WEALTHRANK_QUANTILE_FILE", "data/quantile_tables.csv")
+METRICS = ("income", "wealth")
+
+
+def _pchip_slopes(x, y):
+    """Fritsch-Carlson 单调斜率；y 严格递增时插值结果保持单调"""
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    d = np.empty_like(y)
+    if len(x) == 2:
+        d[:] = delta[0]
+        return d
+    # 内部节点：加权调和平均
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    d[1:-1] = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    # 端点：三点公式，并限制在保持单调的范围内
+    for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], delta[0], delta[1])), (-1, (h[-1], h[-2], delta[-1], delta[-2]))):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if slope <= 0:
+            slope = 0.0
+        elif d0 * d1 <= 0 and slope > 3 * d0:
+            slope = 3 * d0
+        d[end] = slope
+    return d
+
+
+class QuantileTable:
+    """单个国家单个指标（收入或资产）的分位数表"""
+
+    __slots__ = ("log_values", "probabilities", "slopes", "tail_alpha", "fingerprint", "_log_list")
+
+    def __init__(self, values, probabilities):
+        values = np.asarray(values, dtype=np.float64)
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if values.ndim != 1 or values.shape != probabilities.shape or len(values) < 2:
+            raise ValueError("分位数表至少需要 2 个 (百分位, 数值) 点，且两列长度一致")
+        if not (np.all(np.isfinite(values)) and np.all(values > 0)):
+            raise ValueError("分位数表的数值必须为正的有限数")
+        if not np.all((probabilities > 0) & (probabilities < 1)):
+            raise ValueError("分位数表的百分位必须在 (0, 1) 区间内")
+
+        order = np.argsort(values, kind="stable")
+        values, probabilities = values[order], probabilities[order]
+        if np.any(np.diff(values) <= 0) or np.any(np.diff(probabilities) <= 0):
+            raise ValueError("分位数表的数值与百分位必须同时严格递增")
+
+        self.log_values = np.ascontiguousarray(np.log(values))
+        self.probabilities = np.ascontiguousarray(probabilities)
+        self.slopes = _pchip_slopes(self.log_values, self.probabilities)
+        # 门槛表在表最高点以上使用的 Pareto 指数：过最高两个分位点的 log S - log x 直线斜率
+        (p1, p2), (x1, x2) = self.probabilities[-2:], self.log_values[-2:]
+        self.tail_alpha = math.log((1 - p1) / (1 - p2)) / (x2 - x1)
+        # 表内容的摘要，供依赖分位数表的预计算结果（如全球 CDF 网格）判断是否需要重建
+        self.fingerprint = hashlib.sha1(self.log_values.tobytes() + self.probabilities.tobytes()).hexdigest()[:16]
+        # 单值查询走 bisect，比对 0 维数组调用 searchsorted 开销更小
+        self._log_list = self.log_values.tolist()
+
+    def __len__(self):
+        return len(self.log_values)
+
+    def _interpolate(self, k, x):
+        x0, x1 = self.log_values[k], self.log_values[k + 1]
+        h = x1 - x0
+        t = (x - x0) / h
+        t2, t3 = t * t, t * t * t
+        return ((2 * t3 - 3 * t2 + 1) * self.probabilities[k]
+                + (t3 - 2 * t2 + t) * h * self.slopes[k]
+                + (-2 * t3 + 3 * t2) * self.probabilities[k + 1]
+                + (t3 - t2) * h * self.slopes[k + 1])
+
+    def percentile(self, value):
+        """单值查询，规则与 get_log_normal_percentile 一致：value <= 1 及结果均按上下限截断，NaN 得到 NaN"""
+        if math.isnan(value):
+            return math.nan
+        if value <= 1:
+            return PERCENTILE_FLOOR
+        x = math.log(value)
+        k = bisect.bisect_right(self._log_list, x) - 1
+        if k < 0:
+            p = self.probabilities[0]
+        elif k >= len(self._log_list) - 1:
+            p = self.probabilities[-1]
+        else:
+            p = self._interpolate(k, x)
+        return min(max(float(p), PERCENTILE_FLOOR), PERCENTILE_CEIL)
+
+    def percentile_batch(self, values):
+        """向量化查询，返回与 values 同形的 float64 数组（NaN 输入得到 NaN）"""
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            x = np.log(values)
+            k = np.clip(np.searchsorted(self.log_values, x, side="right") - 1, 0, len(self.log_values) - 2)
+            p = self._interpolate(k, x)
+        p = np.where(x < self.log_values[0], self.probabilities[0], p)
+        p = np.where(x >= self.log_values[-1], self.probabilities[-1], p)
+        p = np.clip(p, PERCENTILE_FLOOR, PERCENTILE_CEIL)
+        p = np.where(values <= 1, PERCENTILE_FLOOR, p)
+        return np.where(np.isnan(values), np.nan, p)
+
+
+# -------------------------- 加载 --------------------------
+def _build_tables(points):
+    tables = {}
+    for (code, metric), rows in points.items():
+        if metric not in METRICS:
+            raise ValueError(f"{code}: 未知指标 {metric!r}（可选 {', '.join(METRICS)}）")
+        probabilities = np.array([p for p, _ in rows], dtype=np.float64)
+        # 同时接受 0-1 与 0-100 两种写法，按整张表判断
+        if probabilities.max() > 1:
+            probabilities /= 100
+        try:
+            tables[(code, metric)] = QuantileTable([v for _, v in rows], probabilities)
+        except ValueError as e:
+            raise ValueError(f"{code}/{metric}: {e}") from None
+    return tables
+
+
+def load_quantile_tables(path):
+    """
+    从 CSV 或 JSON 文件加载分位数表
+    CSV 列: country,metric,percentile,value
+    JSON 结构: {"CN": {"income": {"percentiles": [...], "values": [...]}, "wealth": {...}}}
+    :return: dict，键为 (国家代码, 指标)，值为 QuantileTable
+    """
+    points = {}
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        for code, metrics in raw.items():
+            for metric, table in metrics.items():
+                points[(code.upper(), metric)] = list(zip(map(float, table["percentiles"]), map(float, table["values"])))
+    else:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                key = (row["country"].strip().upper(), row["metric"].strip().lower())
+                points.setdefault(key, []).append((float(row["percentile"]), float(row["value"])))
+    return _build_tables(points)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    return load_quantile_tables(path)
+
+
+def get_quantile_tables(path=QUANTILE_TABLE_FILE):
+    """返回按文件修改时间缓存的分位数表；文件不存在时返回空字典（全部国家使用对数正态模型）"""
+    if not path or not os.path.exists(path):
+        return {}
+    return _load_cached(path, os.path.getmtime(path))
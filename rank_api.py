@@ -0,0 +1,265 @@
+"""
+无界面的异步 HTTP 排名服务：不经过 Streamlit 会话，直接以 JSON 提供与页面相同的百分位/排名计算
+
+    python rank_api.py --port 8600
+
+    GET  /v1/rank?country=CN&income=90000&wealth=180000     单条查询（income / wealth 至少提供一个）
+    POST /v1/rank/batch  {"items": [{"country": "CN", "income": 90000, "wealth": 180000}, ...]}
+                                                            批量查询；与单条相同，两项都提供时附带 joint 联合排名
+    GET  /v1/thresholds?country=CN                          进入前 50% ... 0.001% 所需的收入/资产门槛
+    GET  /v1/countries                                      当前数据集的国家列表与数据版本
+    GET  /healthz
+
+国家数据、分位数表与全球 CDF 与页面共用同一套模块（含数据文件热加载）
+依赖 starlette 与 uvicorn（见 requirements.txt）
+"""
+import argparse
+import json
+import math
+import threading
+
+import numpy as np
+
+from country_dataset import get_dataset_store
+from global_rank import dataset_version, get_global_cdf, to_usd
+from joint_rank import get_joint_rank, get_joint_rank_batch
+from wealth_thresholds import country_thresholds
+from quantile_tables import get_quantile_tables
+from wealth_model import (
+    METRIC_FIELDS, get_absolute_rank, get_absolute_rank_batch, get_country_percentile, score_batch,
+)
+
+try:
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+except ImportError:
+    raise SystemExit("rank_api 需要 starlette 与 uvicorn: pip install starlette uvicorn") from None
+
+try:
+    # orjson 为可选依赖：序列化快数倍，缺失时退回标准库 json
+    import orjson
+
+    def _dumps(data):
+        return orjson.dumps(data)
+except ImportError:
+    def _dumps(data):
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+MAX_BATCH_SIZE = 10000
+METRICS = tuple(METRIC_FIELDS)
+
+
+class JSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return _dumps(content)
+
+
+def _error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+# -------------------------- 数据与计算 --------------------------
+_engine_lock = threading.Lock()
+_engine = (None, None, None, None)   # (数据快照, 分位数表, 数据版本, 全球 CDF)
+
+
+def _current_engine():
+    """
+    返回 (国家数据, 分位数表, 数据版本, 全球 CDF)
+    快照与分位数表对象未变化时直接复用，避免每个请求重新计算版本摘要
+    """
+    global _engine
+    snapshot = get_dataset_store().current()
+    tables = get_quantile_tables()
+    cached = _engine
+    if cached[0] is snapshot and cached[1] is tables:
+        return snapshot.records, tables, cached[2], cached[3]
+    version = dataset_version(snapshot.records, tables, base_version=snapshot.version)
+    global_cdf = get_global_cdf(snapshot.records, tables, version)
+    with _engine_lock:
+        _engine = (snapshot, tables, version, global_cdf)
+    return snapshot.records, tables, version, global_cdf
+
+
+def _parse_amount(raw, name):
+    """金额参数：缺省为 None；必须是有限的非负数"""
+    if raw is None or raw == "":
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 不是数字: {raw!r}") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{name} 必须是非负的有限数")
+    return value
+
+
+def rank_one(countries, tables, global_cdf, code, amounts):
+    """
+    单条查询，与页面 compute_ranks 的计算相同
+    :param amounts: {"income": 金额或 None, "wealth": ...}
+    """
+    country = countries[code]
+    result = {"country": code}
+    for metric in METRICS:
+        amount = amounts.get(metric)
+        if amount is None:
+            continue
+        pct = get_country_percentile(country, metric, amount, tables.get((code, metric)))
+        global_pct, global_rank = global_cdf.rank(metric, to_usd(amount, country))
+        result[metric] = {
+            "amount": amount,
+            "percentile": pct,
+            "rank": get_absolute_rank(country["population"], pct),
+            "global_percentile": global_pct,
+            "global_rank": global_rank,
+        }
+    # 收入与资产都提供时附带联合排名
+    if "income" in result and "wealth" in result:
+        joint_pct, joint_rank = get_joint_rank(country, result["income"]["percentile"], result["wealth"]["percentile"])
+        result["joint"] = {"percentile": joint_pct, "rank": joint_rank}
+    return result
+
+
+def rank_batch(countries, tables, global_cdf, codes, incomes, wealths):
+    """
+    批量查询：国家内排名走 score_batch，全球排名按行换算美元后一次插值，收入与资产都提供的行附带联合排名
+    未知国家或缺失金额为 NaN
+    """
+    scored = score_batch(codes, incomes, wealths, country_data=countries, quantile_tables=tables)
+    rates = np.array([countries[c]["usdRate"] if c in countries else np.nan for c in codes], dtype=np.float64)
+    result = {}
+    for metric, values in (("income", incomes), ("wealth", wealths)):
+        global_pct = global_cdf.percentile_batch(metric, np.asarray(values, dtype=np.float64) / rates)
+        result[metric] = (
+            scored[f"{metric}_percentile"],
+            scored[f"{metric}_rank"],
+            global_pct,
+            get_absolute_rank_batch(global_cdf.total_population, global_pct),
+        )
+    result["joint"] = get_joint_rank_batch(countries, codes, scored["income_percentile"], scored["wealth_percentile"])
+    return result
+
+
+def _clean(values, cast):
+    # NaN 在 JSON 中输出为 null
+    return [None if v != v else cast(v) for v in values.tolist()]
+
+
+# -------------------------- 路由 --------------------------
+async def rank_endpoint(request):
+    params = request.query_params
+    code = (params.get("country") or "").strip().upper()
+    try:
+        amounts = {metric: _parse_amount(params.get(metric), metric) for metric in METRICS}
+    except ValueError as e:
+        return _error(400, str(e))
+    if all(v is None for v in amounts.values()):
+        return _error(400, "需要提供 income 或 wealth 参数")
+    countries, tables, version, global_cdf = _current_engine()
+    if code not in countries:
+        return _error(404, f"未知的国家代码: {code!r}")
+    result = rank_one(countries, tables, global_cdf, code, amounts)
+    result["data_version"] = version
+    return JSONResponse(result)
+
+
+async def rank_batch_endpoint(request):
+    try:
+        payload = json.loads(await request.body())
+        items = payload["items"]
+        if not isinstance(items, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return _error(400, '请求体应为 {"items": [{"country": ..., "income": ..., "wealth": ...}, ...]}')
+    if len(items) > MAX_BATCH_SIZE:
+        return _error(413, f"单次最多 {MAX_BATCH_SIZE} 条")
+
+    codes, incomes, wealths = [], [], []
+    try:
+        for i, item in enumerate(items):
+            codes.append(str(item.get("country") or "").strip().upper())
+            income = _parse_amount(item.get("income"), f"items[{i}].income")
+            wealth = _parse_amount(item.get("wealth"), f"items[{i}].wealth")
+            incomes.append(math.nan if income is None else income)
+            wealths.append(math.nan if wealth is None else wealth)
+    except AttributeError:
+        return _error(400, "items 中的每一项都应为对象")
+    except ValueError as e:
+        return _error(400, str(e))
+
+    countries, tables, version, global_cdf = _current_engine()
+    results = [{"country": code} for code in codes]
+    if items:
+        ranked = rank_batch(countries, tables, global_cdf, codes, incomes, wealths)
+        joint_pct, joint_rank = ranked.pop("joint")
+        for metric, (pct, rank, global_pct, global_rank) in ranked.items():
+            columns = zip(_clean(pct, float), _clean(rank, int), _clean(global_pct, float), _clean(global_rank, int))
+            for row, (p, r, gp, gr) in zip(results, columns):
+                row[metric] = None if p is None else {"percentile": p, "rank": r, "global_percentile": gp, "global_rank": gr}
+        for row, p, r in zip(results, _clean(joint_pct, float), _clean(joint_rank, int)):
+            if p is not None:
+                row["joint"] = {"percentile": p, "rank": r}
+    return JSONResponse({"data_version": version, "results": results})
+
+
+async def thresholds_endpoint(request):
+    code = (request.query_params.get("country") or "").strip().upper()
+    countries, tables, version, _ = _current_engine()
+    if code not in countries:
+        return _error(404, f"未知的国家代码: {code!r}")
+    thresholds = country_thresholds(countries[code], code, tables)
+    return JSONResponse({
+        "country": code,
+        "data_version": version,
+        "thresholds": [
+            {"top_share": share, "income": income, "wealth": wealth}
+            for share, income, wealth in zip(*(thresholds[k].tolist() for k in ("top_shares", "income", "wealth")))
+        ],
+    })
+
+
+async def countries_endpoint(request):
+    countries, _, version, _ = _current_engine()
+    return JSONResponse({
+        "data_version": version,
+        "countries": [
+            {"code": code, "name_en": c["name_en"], "name_zh": c["name_zh"], "currency": c["currency"], "population": c["population"]}
+            for code, c in countries.items()
+        ],
+    })
+
+
+async def health_endpoint(request):
+    return JSONResponse({"status": "ok"})
+
+
+app = Starlette(routes=[
+    Route("/v1/rank", rank_endpoint, methods=["GET"]),
+    Route("/v1/rank/batch", rank_batch_endpoint, methods=["POST"]),
+    Route("/v1/thresholds", thresholds_endpoint, methods=["GET"]),
+    Route("/v1/countries", countries_endpoint, methods=["GET"]),
+    Route("/healthz", health_endpoint, methods=["GET"]),
+])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WealthRank 排名 HTTP 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8600, help="监听端口 (默认: 8600)")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数 (默认: 1)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    # 启动前预热：加载数据并构建全球 CDF，首个请求不承担这部分开销
+    _current_engine()
+    uvicorn.run("rank_api:app" if args.workers > 1 else app, host=args.host, port=args.port,
+                workers=args.workers, access_log=False, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+生产环境启动入口：先预热进程级缓存（见 warmup.py），再在同一进程内启动 Streamlit 服务
+
+    python serve.py --port 8501
+    python serve.py --port 8501 --no-warmup      # 跳过预热，与 streamlit run 相同
+
+HTTP 服务（包括健康检查 /_stcore/health）在预热完成后才开始监听，
+编排系统的就绪检查通过时缓存已经填好，扩容出来的新节点不会让第一个访客等待冷启动
+默认关闭源码文件监视（server.fileWatcherType=none）：开启时每个新会话都要遍历 sys.modules 中全部模块的路径，
+线上源码不会变化，这部分开销没有意义；本地调试需要保存即重载时加 --watch-source
+其余 Streamlit 配置照常读取 .streamlit/config.toml 与 STREAMLIT_* 环境变量
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(ROOT, "streamlit_app.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="预热缓存后启动 WealthRank Streamlit 服务")
+    parser.add_argument("--port", type=int, default=8501, help="监听端口 (默认: 8501)")
+    parser.add_argument("--address", default=None, help="监听地址 (默认沿用 Streamlit 配置)")
+    parser.add_argument("--app", default=APP_FILE, help="Streamlit 脚本路径")
+    parser.add_argument("--no-warmup", action="store_true", help="跳过启动预热")
+    parser.add_argument("--watch-source", action="store_true", help="保留 Streamlit 的源码文件监视")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if not args.no_warmup:
+        from warmup import warm_up
+
+        stages = warm_up(app_file=args.app)
+        detail = "，".join(f"{name} {seconds * 1e3:.0f}ms" for name, seconds in stages)
+        print(f"预热完成，耗时 {time.perf_counter() - start:.2f}s（{detail}）", file=sys.stderr)
+
+    from streamlit.web import bootstrap
+
+    flags = {"server_port": args.port, "server_headless": True}
+    if not args.watch_source:
+        flags["server_fileWatcherType"] = "none"
+    if args.address:
+        flags["server_address"] = args.address
+    bootstrap.load_config_options(flags)
+    bootstrap.run(os.path.abspath(args.app), False, [], flags)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+多进程共享的只读查找表：一个构建进程把预计算结果写入单个文件（默认放在 /dev/shm），
+各 Streamlit 服务进程以 mmap 方式零拷贝挂载，数组直接是映射内存上的只读视图，
+增加工作进程时这部分内存不会成倍增长
+
+文件格式：
+    8 字节魔数 | 8 字节小端头部长度 | JSON 头部 | 按 64 字节对齐的数组与二进制块
+头部记录 meta（数据版本等）以及每个数组 / 块的偏移、类型与形状
+
+发布新版本：先写入同目录下的临时文件再 os.replace 到正式路径，替换是原子的；
+读取方按 inode 发现新文件后重新挂载，已挂载的旧映射在引用释放前仍然有效
+构建命令见 build_shared_store.py
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_STORE_FILE = os.environ.get("WEALTHRANK_SHARED_STORE", os.path.join(_DEFAULT_DIR, "wealthrank.store"))
+RECHECK_SECONDS = 2.0
+
+MAGIC = b"WRSTORE1"
+_ALIGN = 64
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# -------------------------- 1. 写入 --------------------------
+class StoreWriter:
+    """收集数组与二进制块，一次性写出并原子发布"""
+
+    def __init__(self, meta=None):
+        self.meta = dict(meta or {})
+        self._arrays = {}
+        self._blobs = {}
+
+    def add_array(self, name, array):
+        self._arrays[name] = np.ascontiguousarray(array)
+
+    def add_blob(self, name, data):
+        self._blobs[name] = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+    def publish(self, path=SHARED_STORE_FILE):
+        """写入临时文件、fsync 后 os.replace 到 path；返回写入的字节数"""
+        # 先用占位偏移估算头部长度，再据此计算真实偏移
+        entries = [("array", name, a.nbytes) for name, a in self._arrays.items()]
+        entries += [("blob", name, len(b)) for name, b in self._blobs.items()]
+
+        def layout(data_start):
+            offsets, offset = {}, data_start
+            for kind, name, size in entries:
+                offset = _aligned(offset)
+                offsets[(kind, name)] = offset
+                offset += size
+            return offsets
+
+        def header_for(offsets):
+            return json.dumps({
+                "meta": self.meta,
+                "arrays": {name: {"offset": offsets[("array", name)], "dtype": a.dtype.str, "shape": a.shape}
+                           for name, a in self._arrays.items()},
+                "blobs": {name: {"offset": offsets[("blob", name)], "length": len(b)} for name, b in self._blobs.items()},
+            }, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+        data_start = 0
+        while True:
+            header = header_for(layout(data_start))
+            needed = _aligned(len(MAGIC) + _HEADER_LEN.size + len(header))
+            if needed <= data_start:
+                break
+            # 偏移位数增加可能让头部变长，留出余量后重新计算
+            data_start = needed + _ALIGN
+        offsets = layout(data_start)
+        header = header_for(offsets)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".wealthrank-store-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + _HEADER_LEN.pack(len(header)) + header)
+                for kind, name, _ in entries:
+                    f.seek(offsets[(kind, name)])
+                    f.write(self._arrays[name].tobytes() if kind == "array" else self._blobs[name])
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return os.path.getsize(path)
+
+
+# -------------------------- 2. 读取 --------------------------
+class SharedStore:
+    """挂载后的只读视图；array() 返回映射内存上的 numpy 数组，不复制数据"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} 不是有效的共享数据文件")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(self._mmap[start:start + header_len].decode("utf-8"))
+        self.path = path
+        self.meta = header["meta"]
+        self._arrays = header["arrays"]
+        self._blobs = header["blobs"]
+
+    def __contains__(self, name):
+        return name in self._arrays or name in self._blobs
+
+    def array(self, name):
+        """只读数组视图；不存在时返回 None"""
+        info = self._arrays.get(name)
+        if info is None:
+            return None
+        dtype = np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"], dtype=np.int64))
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=info["offset"]).reshape(info["shape"])
+
+    def blob(self, name):
+        """二进制块（复制为 bytes，供 st.image 等直接使用）；不存在时返回 None"""
+        info = self._blobs.get(name)
+        if info is None:
+            return None
+        return self._mmap[info["offset"]:info["offset"] + info["length"]]
+
+    def text(self, name):
+        data = self.blob(name)
+        return None if data is None else data.decode("utf-8")
+
+    def stats(self):
+        return {"path": self.path, "bytes": len(self._mmap), "arrays": len(self._arrays), "blobs": len(self._blobs), "meta": self.meta}
+
+
+_store = None
+# 上次检查的路径与时间；文件不存在或挂载失败时也记录，RECHECK_SECONDS 内不再重复 stat
+_store_checked_path = None
+_store_checked = 0.0
+_store_lock = threading.Lock()
+
+
+def get_shared_store(path=None):
+    """
+    返回当前挂载的共享数据；文件不存在时返回 None（各模块照常在进程内计算）
+    每隔 RECHECK_SECONDS 检查一次文件 inode（文件不存在时同样按此间隔重新检查），发现已发布新版本时重新挂载
+    """
+    global _store, _store_checked, _store_checked_path
+    path = path or SHARED_STORE_FILE
+    now = time.monotonic()
+    if _store_checked_path == path and now - _store_checked < RECHECK_SECONDS:
+        return _store
+    with _store_lock:
+        _store_checked_path = path
+        _store_checked = now
+        try:
+            inode = os.stat(path).st_ino
+        except OSError:
+            _store = None
+            return None
+        if _store is None or _store.path != path or _store.inode != inode:
+            try:
+                _store = SharedStore(path)
+                logger.info("已挂载共享数据 %s (版本 %s)", path, _store.meta.get("data_version"))
+            except (OSError, ValueError) as e:
+                logger.error("共享数据 %s 挂载失败: %s", path, e)
+                _store = None
+        return _store
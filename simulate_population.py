@@ -0,0 +1,201 @@
+"""
+蒙特卡洛校验：按各国人口生成完整的合成人口，统计探针金额的精确排名，与页面使用的解析排名对比
+
+    python simulate_population.py                         # 全部国家按实际人口模拟（中国约 14 亿人），使用全部 CPU
+    python simulate_population.py --scale 0.01 -j 4       # 只模拟 1% 的人口，排名按比例放大，快速检查
+    python simulate_population.py --tail lognormal        # 合成人口与页面模型相同，只衡量截断与排名公式本身的误差
+    python simulate_population.py --max-body-error 0.05   # 未被截断的探针误差超过 5% 时退出码为 1
+
+合成人口（每个国家 × 指标）:
+- 使用分位数表的国家：按分位数表的反函数抽样（表最高点以上为 Pareto 尾部，同门槛表）
+- 其余国家：--tail pareto（默认）为对数正态主体 + 前 1% 的光滑拼接 Pareto 尾部，比页面的纯对数正态更接近真实的顶端分布，
+  衡量页面模型在顶端的偏差；--tail lognormal 与页面模型相同，只衡量截断与排名公式本身
+探针金额取合成分布在 PROBE_TOP_SHARES（前 50% … 前 0.00001%）处的分位数；
+解析排名与页面相同：get_country_percentile（含 0.0001 / 0.9999 截断）后 get_absolute_rank
+
+人口按固定大小分块，每块由 (种子, 国家, 指标, 块号) 派生独立的随机数流，在进程池中并行生成并计数：
+每个进程同时只持有一块样本，内存与人口规模无关；各块互不依赖、结果只是几个整数，耗时随核数近似线性下降，
+并且结果与进程数、调度顺序无关
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from country_dataset import DATASET_FILE, builtin_dataset, load_dataset
+from quantile_tables import QUANTILE_TABLE_FILE, get_quantile_tables
+from wealth_model import (
+    METRIC_FIELDS, PERCENTILE_FLOOR, get_absolute_rank, get_country_percentile, norm_ppf_batch, uses_quantile_table,
+)
+from wealth_thresholds import TAIL_START, lognormal_pareto_threshold, pareto_alpha, table_pareto_threshold
+
+# 探针位置（前 x，占人口的比例）；小于 PERCENTILE_FLOOR 的部分在页面上会被截断
+PROBE_TOP_SHARES = (0.5, 0.25, 0.1, 0.01, 0.001, 0.0001, 0.00001, 0.000001, 0.0000001)
+# 每块样本数：生成与计数时每个进程约占用 50 MB
+CHUNK_SIZE = 2_000_000
+TAIL_LOGNORMAL = "lognormal"
+TAIL_PARETO = "pareto"
+_SAMPLER_TABLE = "table"
+
+
+# -------------------------- 1. 合成分布 --------------------------
+def sampler_spec(country, metric, table=None, tail=TAIL_PARETO):
+    """合成人口的分布描述，可传给子进程: ("table", QuantileTable) 或 (tail, 中位数, sigma)"""
+    if uses_quantile_table(country, table):
+        return (_SAMPLER_TABLE, table)
+    median_field, shape_field = METRIC_FIELDS[metric]
+    return (tail, country[median_field], country[shape_field])
+
+
+def sample_values(rng, spec, n):
+    """按 spec 抽取 n 个样本"""
+    if spec[0] == _SAMPLER_TABLE:
+        # 上尾概率取 (0, 1]，避免反函数在 0 处发散
+        return table_pareto_threshold(spec[1], 1 - rng.random(n))
+    kind, median, sigma = spec
+    z = rng.standard_normal(n)
+    values = median * np.exp(sigma * z)
+    if kind == TAIL_PARETO:
+        # 落在拼接点以上的样本（概率恰为 1 - TAIL_START）改从 Pareto 条件分布抽取: x0 · U^(-1/α)
+        z0 = float(norm_ppf_batch(TAIL_START))
+        tail = z > z0
+        x0 = median * math.exp(sigma * z0)
+        values[tail] = x0 * (1 - rng.random(int(tail.sum()))) ** (-1 / pareto_alpha(sigma))
+    return values
+
+
+def probe_values(spec, top_shares=PROBE_TOP_SHARES):
+    """合成分布在各上尾比例处的分位数，作为探针金额"""
+    top_shares = np.asarray(top_shares, dtype=np.float64)
+    if spec[0] == _SAMPLER_TABLE:
+        return table_pareto_threshold(spec[1], top_shares)
+    kind, median, sigma = spec
+    if kind == TAIL_PARETO:
+        return lognormal_pareto_threshold(top_shares, median, sigma)
+    return median * np.exp(-sigma * norm_ppf_batch(top_shares))
+
+
+# -------------------------- 2. 分块计数 --------------------------
+def count_chunk(task):
+    """
+    进程池任务：生成一块样本，返回严格大于各探针的样本数
+    :param task: (种子, (国家序号, 指标序号, 块号), 样本数, 分布描述, 升序的探针数组)
+    """
+    seed, key, n, spec, probes = task
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+    values = sample_values(rng, spec, n)
+    # 每个样本大于几个探针；按此分箱后累加即得各探针以上的样本数
+    hist = np.bincount(np.searchsorted(probes, values, side="left"), minlength=len(probes) + 1)
+    return n - np.cumsum(hist)[:-1]
+
+
+def _chunk_sizes(total, chunk_size):
+    full, rest = divmod(total, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def simulate(countries, tables=None, tail=TAIL_PARETO, scale=1.0, seed=0, jobs=None, chunk_size=CHUNK_SIZE,
+             top_shares=PROBE_TOP_SHARES):
+    """
+    模拟全部国家 × 指标的合成人口
+    :param scale: 模拟人口占实际人口的比例；小于 1 时排名按比例放大
+    :return: (结果行列表, 总样本数)；每行含探针金额、模拟排名、页面的解析排名与相对误差
+    """
+    groups, tasks = [], []
+    for ci, code in enumerate(sorted(countries)):
+        country = dict(countries[code])
+        for mi, metric in enumerate(METRIC_FIELDS):
+            table = (tables or {}).get((code, metric))
+            spec = sampler_spec(country, metric, table, tail)
+            shares = np.sort(np.asarray(top_shares, dtype=np.float64))[::-1]
+            probes = probe_values(spec, shares)
+            size = max(int(round(country["population"] * scale)), 1)
+            groups.append((code, country, metric, table, shares, probes, size))
+            for k, n in enumerate(_chunk_sizes(size, chunk_size)):
+                tasks.append((len(groups) - 1, (seed, (ci, mi, k), n, spec, probes)))
+
+    counts = [np.zeros(len(top_shares), dtype=np.int64) for _ in groups]
+    workers = min(jobs or os.cpu_count() or 1, len(tasks))
+    if workers == 1:
+        results = map(count_chunk, (task for _, task in tasks))
+        for (g, _), above in zip(tasks, results):
+            counts[g] += above
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (g, _), above in zip(tasks, pool.map(count_chunk, [task for _, task in tasks])):
+                counts[g] += above
+
+    rows = []
+    for (code, country, metric, table, shares, probes, size), above in zip(groups, counts):
+        for share, value, count in zip(shares.tolist(), probes.tolist(), above.tolist()):
+            empirical = count / scale + 1
+            analytic = get_absolute_rank(country["population"], get_country_percentile(country, metric, value, table))
+            rows.append({
+                "country": code, "metric": metric, "top_share": share, "value": value,
+                "simulated_rank": empirical, "analytic_rank": analytic,
+                "rel_error": analytic / empirical - 1,
+                # 计数的泊松标准误差（相对值）
+                "sampling_error": 1 / math.sqrt(count) if count else None,
+                "clamped": share < PERCENTILE_FLOOR,
+            })
+    return rows, sum(n for _, (_, _, n, _, _) in tasks)
+
+
+# -------------------------- 3. 命令行 --------------------------
+def _report_line(row):
+    noise = f"±{row['sampling_error'] * 100:.2f}%" if row["sampling_error"] is not None else "   -"
+    mark = "  (截断)" if row["clamped"] else ""
+    return (f"{row['country']} {row['metric']:<6} 前 {row['top_share'] * 100:<9g}% 金额 {row['value']:>16,.0f}  "
+            f"模拟排名 {row['simulated_rank']:>14,.0f}  页面排名 {row['analytic_rank']:>14,}  "
+            f"误差 {row['rel_error'] * 100:+9.2f}%  抽样 {noise}{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按实际人口生成合成人口，校验页面解析排名的误差")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="国家数据文件，不存在时使用内置数据")
+    parser.add_argument("--quantile-file", default=QUANTILE_TABLE_FILE, help="经验分位数表，不存在时全部使用对数正态模型")
+    parser.add_argument("--tail", choices=(TAIL_PARETO, TAIL_LOGNORMAL), default=TAIL_PARETO,
+                        help="对数正态国家的合成人口上尾 (默认: pareto)")
+    parser.add_argument("--scale", type=float, default=1.0, help="模拟人口占实际人口的比例 (默认: 1，即完整人口)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认: CPU 核数)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"每块样本数 (默认: {CHUNK_SIZE})")
+    parser.add_argument("-o", "--output", default=None, help="结果另存为 JSON 文件")
+    parser.add_argument("--max-body-error", type=float, default=None,
+                        help="未被截断的探针（前 0.01%% 及更靠后的排名）的相对误差上限，扣除 3 倍抽样误差后仍超过时退出码为 1")
+    args = parser.parse_args(argv)
+    if not 0 < args.scale <= 1:
+        parser.error("--scale 必须在 (0, 1] 区间内")
+
+    snapshot = load_dataset(args.dataset) if args.dataset and os.path.exists(args.dataset) else builtin_dataset()
+    start = time.perf_counter()
+    rows, samples = simulate(snapshot.records, get_quantile_tables(args.quantile_file), args.tail, args.scale,
+                             args.seed, args.jobs, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    for row in rows:
+        print(_report_line(row))
+    print(f"共 {samples:,} 个样本，耗时 {elapsed:.1f}s（{samples / elapsed / 1e6:.1f}M 样本/秒）", file=sys.stderr)
+
+    # --scale 较小时计数少、抽样误差大，只把明显超出抽样误差的偏差算作失败
+    failures = [row for row in rows if not row["clamped"] and args.max_body_error is not None
+                and abs(row["rel_error"]) - 3 * (row["sampling_error"] or 0) > args.max_body_error]
+    if args.output:
+        report = {"tail": args.tail, "scale": args.scale, "seed": args.seed, "samples": samples,
+                  "elapsed_s": elapsed, "dataset_version": snapshot.version, "rows": rows}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if failures:
+        print("\n".join(f"{r['country']}/{r['metric']} 前 {r['top_share'] * 100:g}%: 误差 {r['rel_error'] * 100:+.2f}% "
+                        f"超过 {args.max_body_error * 100:g}%" for r in failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,74 +1,102 @@
 import streamlit as st
-import math
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import json
-import datetime
 import os  
-import time 
+import perf_trace
+from entitlements import (
+    ATTEMPT_WINDOW_SECONDS, STATUS_FREE, STATUS_UNLOCKED, TOKEN_PARAM, UNLOCK_INVALID, UNLOCK_OK, UNLOCK_RATE_LIMITED,
+    client_ip, get_entitlement_store, new_token, valid_token,
+)
+from global_rank import dataset_version, get_global_cdf, to_usd
+from country_compare import get_country_comparison
+from joint_rank import get_joint_rank
+from wealth_thresholds import country_thresholds
+from quantile_tables import get_quantile_tables
+from country_dataset import get_dataset_store
+from history_chart import rank_over_time
+from history_store import get_history_store
+from wealth_model import get_country_percentile, get_absolute_rank
+from visit_counter import get_visit_counter
+from html_templates import PAGE_STYLE_HTML
+from ui_components import (
+    CARD_COLOR_PAIRS, INCOME_COLORS, JOINT_COLORS, TRANSLATIONS, WEALTH_COLORS,
+    card_header_html, render_bottom_nav, render_density_chart, render_footer, render_header, render_joint_card,
+    render_country_comparison, render_metric_card, render_rank_history, render_section_title, render_threshold_table,
+    render_what_if,
+)
+from wealth_matrix import MATRIX_RENDERER, start_matrix_prewarm
 
-# --- 权限配置 ---
-FREE_PERIOD_SECONDS = 60      # 免费试用期 60 秒
-ACCESS_DURATION_HOURS = 24    # 密码解锁后的访问时长 24 小时
-UNLOCK_CODE = "vip24"        # 预设的解锁密码
+# --- 渲染配置 ---
+# 设置 WEALTHRANK_PREWARM_MATRIX=1 时，首次运行在后台预渲染全部矩阵状态
+PREWARM_MATRIX_CACHE = os.environ.get("WEALTHRANK_PREWARM_MATRIX", "0") == "1"
 # --- 配置结束 ---
 
-# -------------------------------------------------------------
-# --- 1. 初始化会话状态 ---
-# -------------------------------------------------------------
+# -------------------------- 0. 全局配置 (必须置顶) --------------------------
+st.set_page_config(
+    page_title="WealthRank 财富排行榜",
+    page_icon="💎",
+    layout="wide",  # 保持wide，但通过CSS限制内容宽度
+    initial_sidebar_state="collapsed"
+)
 
-# 'start_time': 首次访问时间，用于计算免费试用期
-if 'start_time' not in st.session_state:
-    st.session_state.start_time = datetime.datetime.now()
-    # 'access_status': 'free' (免费期), 'locked' (需解锁), 'unlocked' (已解锁)
-    st.session_state.access_status = 'free'
-    st.session_state.unlock_time = None # 记录密码解锁的时间点
+# 分阶段计时：WEALTHRANK_TRACE=1 时记录本次运行各阶段耗时；
+# 运维访问 ?profile=<WEALTHRANK_PROFILE_TOKEN> 后，本会话之后的每次运行都做 cProfile
+if perf_trace.profile_requested(st.query_params.get("profile")):
+    st.session_state["profiling"] = True
+run_trace = perf_trace.begin_run("app", profile=st.session_state.get("profiling", False))
 
 # -------------------------------------------------------------
-# --- 2. 检查访问状态和时间逻辑 ---
+# --- 1. 访问权限：试用/解锁状态保存在服务端，按浏览器令牌查询 ---
 # -------------------------------------------------------------
 
-current_time = datetime.datetime.now()
-access_granted = False # 默认无权限
+def browser_token():
+    """地址栏 ?t= 中的令牌；没有或格式不对时生成新令牌写回地址栏（只更新地址，不触发重跑）"""
+    token = st.session_state.get("access_token")
+    if token is None:
+        token = st.query_params.get(TOKEN_PARAM)
+        if not valid_token(token):
+            token = new_token()
+            st.query_params[TOKEN_PARAM] = token
+        st.session_state["access_token"] = token
+    return token
 
-# 检查当前状态并更新
-if st.session_state.access_status == 'free':
-    time_elapsed = (current_time - st.session_state.start_time).total_seconds()
-    
-    if time_elapsed < FREE_PERIOD_SECONDS:
-        # 仍在免费期内
-        access_granted = True
-        time_left = FREE_PERIOD_SECONDS - time_elapsed
-        st.info(f"⏳ **免费试用中... 剩余 {time_left:.1f} 秒。**")
-    else:
-        # 免费期结束，进入锁定状态
-        st.session_state.access_status = 'locked'
-        st.session_state.start_time = None # 清除免费期计时
-        st.rerun() # 强制刷新以立即显示锁定界面
-        
-elif st.session_state.access_status == 'unlocked':
-    unlock_expiry = st.session_state.unlock_time + datetime.timedelta(hours=ACCESS_DURATION_HOURS)
-    
-    if current_time < unlock_expiry:
-        # 在 24 小时有效期内
-        access_granted = True
-        time_left_delta = unlock_expiry - current_time
-        hours = int(time_left_delta.total_seconds() // 3600)
-        minutes = int((time_left_delta.total_seconds() % 3600) // 60)
-        
-        st.info(f"🔓 **付费权限剩余:** {hours} 小时 {minutes} 分钟")
-    else:
-        # 24 小时已过期，进入锁定状态
-        st.session_state.access_status = 'locked'
-        st.session_state.unlock_time = None
-        st.rerun() # 强制刷新
+
+def browser_client():
+    """配置了可信代理时的真实客户端 IP（连接 IP 在代理后面是所有人共用的代理地址），否则为 None"""
+    return client_ip(st.context.headers.get("X-Forwarded-For"))
+
+
+def access_expired():
+    """判断当前会话的试用期/解锁期是否已结束（片段重跑时不会经过下方的顶层检查）"""
+    return not get_entitlement_store().check(browser_token(), client=browser_client()).granted
+
+
+def try_unlock():
+    """解锁表单的回调：在本次运行开始之前执行，下方的权限查询直接看到解锁结果，无需再 st.rerun"""
+    st.session_state["unlock_result"] = get_entitlement_store().unlock(
+        browser_token(), st.session_state.get("password_input_key", ""),
+        # 按令牌限流；配置了可信代理时再按真实客户端 IP 限流
+        client=browser_client())
+
+
+# 本次运行只查询一次，倒计时由查询结果给出；试用同时按令牌与真实客户端 IP 记录，去掉 ?t= 不会重新获得试用
+access = get_entitlement_store().check(browser_token(), client=browser_client())
+unlock_result = st.session_state.pop("unlock_result", None)
+
+if access.status == STATUS_UNLOCKED:
+    if unlock_result == UNLOCK_OK:
+        st.success("🎉 解锁成功！您已获得 1 天访问权限。")
+    hours = int(access.remaining // 3600)
+    minutes = int((access.remaining % 3600) // 60)
+    st.info(f"🔓 **付费权限剩余:** {hours} 小时 {minutes} 分钟")
+elif access.status == STATUS_FREE:
+    st.info(f"⏳ **免费试用中... 剩余 {access.remaining:.1f} 秒。**")
+
+run_trace.lap("access_check")
 
 # -------------------------------------------------------------
-# --- 3. 锁定界面及密码输入 ---
+# --- 2. 锁定界面及密码输入 ---
 # -------------------------------------------------------------
 
-if not access_granted:
+if not access.granted:
     st.error("🔒 **访问受限。免费试用期已结束！**")
     st.markdown(f"""
     <div style="background-color: #fff; padding: 15px; border-radius: 8px; border: 1px solid #e5e7eb; margin-top: 15px;">
@@ -80,591 +108,230 @@ if not access_granted:
     """, unsafe_allow_html=True)
 
     with st.form("access_lock_form"):
-        password_input = st.text_input("解锁代码:", type="password", key="password_input_key")
-        submit_button = st.form_submit_button("验证并解锁")
-        
-        if submit_button:
-            if password_input == UNLOCK_CODE:
-                st.session_state.access_status = 'unlocked'
-                st.session_state.unlock_time = datetime.datetime.now()
-                st.success("🎉 解锁成功！您已获得 1 天访问权限。页面即将刷新...")
-                st.rerun()
-            else:
-                st.error("❌ 代码错误，请重试。")
-                
+        st.text_input("解锁代码:", type="password", key="password_input_key")
+        st.form_submit_button("验证并解锁", on_click=try_unlock)
+
+    if unlock_result == UNLOCK_INVALID:
+        st.error("❌ 代码错误，请重试。")
+    elif unlock_result == UNLOCK_RATE_LIMITED:
+        st.error(f"⛔ 尝试次数过多，请 {ATTEMPT_WINDOW_SECONDS // 60} 分钟后再试。")
+
     # 强制停止脚本，隐藏所有受保护的内容
+    run_trace.lap("lock_screen")
+    run_trace.finish()
     st.stop()
-    
 
-# -------------------------- 0. 全局配置 (必须置顶) --------------------------
-st.set_page_config(
-    page_title="WealthRank 财富排行榜",
-    page_icon="💎",
-    layout="wide",  # 保持wide，但通过CSS限制内容宽度
-    initial_sidebar_state="collapsed"
-)
+# 页面样式在导入 html_templates 时已压缩为单行，不再每次重跑拼接
+st.markdown(PAGE_STYLE_HTML, unsafe_allow_html=True)
+run_trace.lap("page_config_css")
 
-st.markdown("""
-<style>
-    /* 1. 彻底隐藏Streamlit默认干扰元素 */
-    header, [data-testid="stSidebar"], footer, .stDeployButton, [data-testid="stToolbar"] {
-        display: none !important;
-    }
-    
-    /* 2. 全局样式重置 - 关键：给最外层加基础留白 */
-    .stApp {
-        background-color: #f8fafc !important;
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif !important;
-        padding-bottom: 80px !important;
-        padding-left: 1rem !important;  /* 全局左留白 */
-        padding-right: 1rem !important; /* 全局右留白 */
-        margin: 0 !important;
-    }
-    
-    /* 3. 底部导航核心样式 - 纯文字现代风 */
-    .bottom-nav {
-        position: fixed !important;
-        bottom: 0 !important;
-        left: 0 !important;
-        width: 100% !important;
-        height: 60px !important;
-        background-color: rgba(255, 255, 255, 0.90) !important;
-        backdrop-filter: blur(16px) !important;
-        border-top: 1px solid rgba(226, 232, 240, 0.8) !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: space-between !important;
-        padding: 0 10px !important;
-        box-shadow: 0 -4px 20px rgba(0, 0, 0, 0.03) !important;
-        z-index: 9999 !important;
-        box-sizing: border-box !important;
-    }
-    
-    /* 4. 导航项样式 */
-    .nav-item {
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        width: 100% !important;
-        height: 40px !important;
-        color: #94a3b8 !important;
-        text-decoration: none !important;
-        font-size: 0.70rem !important; /* 缩小适配8个项 */
-        font-weight: 600 !important;
-        letter-spacing: -0.01em !important;
-        border-radius: 8px !important;
-        transition: all 0.2s ease !important;
-        margin: 0 2px !important;
-        white-space: nowrap !important; /* 禁止换行 */
-        overflow: hidden !important; /* 超出隐藏 */
-        text-overflow: ellipsis !important; /* 超长显示省略号 */
-    }
-    
-    .nav-item:hover {
-        background-color: rgba(241, 245, 249, 0.8) !important;
-        color: #64748b !important;
-    }
-    
-    .nav-item.active {
-        color: #2563eb !important;
-        background-color: rgba(59, 130, 246, 0.1) !important;
-    }
-    
-    .nav-item.active::before {
-        display: none !important;
-    }
-
-    /* --------------------------------------------------- */
-    /* 核心：主内容容器 - 强制居中 + 限制宽度 + 留白 */
-    /* --------------------------------------------------- */
-    .main-content {
-        max-width: 900px !important; /* 内容最大宽度（可调整：800/1000px） */
-        margin: 0 auto !important;     /* 左右自动居中 */
-        padding: 2rem 1.5rem 1rem 1.5rem !important; /* 内部留白 */
-        box-sizing: border-box !important; /* 内边距计入宽度 */
-        width: 100% !important; /* 确保容器占满可用宽度 */
-    }
-
-    /* 标题样式 */
-    .page-title {
-        font-size: 2rem !important;
-        font-weight: 800 !important;
-        color: #1e293b !important;
-        letter-spacing: -0.02em !important;
-        margin-bottom: 0.5rem !important;
-    }
-    .page-subtitle {
-        color: #64748b !important;
-        font-size: 1rem !important;
-        margin-bottom: 2rem !important;
-        font-weight: 400 !important;
-    }
-
-    /* 修复卡片样式 - 适配居中容器 */
-    [data-testid="stVerticalBlockBorderWrapper"] {
-        background-color: #ffffff !important;
-        border-radius: 16px !important;
-        padding: 24px !important;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.02), 0 2px 4px -1px rgba(0, 0, 0, 0.02) !important;
-        border: 1px solid #f1f5f9 !important;
-        width: 100% !important; /* 强制卡片宽度适配容器 */
-        box-sizing: border-box !important;
-    }
-    [data-testid="stVerticalBlockBorderWrapper"] > div {
-        padding: 0 !important;
-    }
-    
-    /* 结果指标卡片 - 适配居中布局 */
-    .metric-card {
-        background: white !important; 
-        border: 1px solid #eef2f7 !important; 
-        border-radius: 16px !important; 
-        padding: 16px !important; 
-        text-align: center !important;
-        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.03), 0 4px 6px -2px rgba(0, 0, 0, 0.02) !important;
-        box-sizing: border-box !important;
-        width: 100% !important; /* 适配容器宽度 */
-        transition: transform 0.2s ease !important;
-        height: auto !important; /* 取消固定高度，自适应内容 */
-    }
-    .metric-card:hover {
-        transform: translateY(-2px) !important;
-    }
-
-    /* 按钮样式 - 适配居中容器 */
-    div.stButton > button {
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%) !important;
-        color: white !important; 
-        border-radius: 10px !important; 
-        padding: 0.7rem 1.5rem !important;
-        font-weight: 600 !important;
-        border: none !important;
-        width: 100% !important;
-        box-shadow: 0 4px 6px -1px rgba(37, 99, 235, 0.2) !important;
-        transition: all 0.2s !important;
-        box-sizing: border-box !important;
-    }
-    div.stButton > button:hover {
-        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.3) !important;
-        transform: translateY(-1px) !important;
-    }
-    
-    /* 输入框样式 - 适配居中布局 */
-    .stSelectbox, .stNumberInput {
-        width: 100% !important;
-        box-sizing: border-box !important;
-    }
-    .stSelectbox label, .stNumberInput label {
-        color: #475569 !important;
-        font-weight: 500 !important;
-        font-size: 0.9rem !important;
-    }
-
-    /* 修复列布局溢出问题 */
-    [data-testid="stHorizontalBlock"] {
-        width: 100% !important;
-        box-sizing: border-box !important;
-        gap: 1rem !important; /* 列之间的间距 */
-    }
-
-    /* 人群矩阵样式 */
-    .matrix-legend {
-        display: flex;
-        justify-content: center;
-        gap: 20px;
-        margin-top: 10px;
-        font-size: 0.75rem;
-        color: #64748b;
-    }
-    .legend-item {
-        display: flex;
-        align-items: center;
-        gap: 5px;
-    }
-    .legend-color {
-        width: 12px;
-        height: 12px;
-        border-radius: 3px;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-
-# -------------------------- 2. 安全的计数器逻辑 --------------------------
-COUNTER_FILE = "visit_stats.json"
-
-def update_daily_visits():
-    """安全更新访问量，如果出错则返回 0，绝不让程序崩溃"""
-    try:
-        today_str = datetime.date.today().isoformat()
-        
-        if "has_counted" in st.session_state:
-            if os.path.exists(COUNTER_FILE):
-                try:
-                    with open(COUNTER_FILE, "r") as f:
-                        return json.load(f).get("count", 0)
-                except:
-                    return 0
-            return 0
-
-        data = {"date": today_str, "count": 0}
-        
-        if os.path.exists(COUNTER_FILE):
-            try:
-                with open(COUNTER_FILE, "r") as f:
-                    file_data = json.load(f)
-                    if file_data.get("date") == today_str:
-                        data = file_data
-            except:
-                pass
-        
-        data["count"] += 1
-        
-        with open(COUNTER_FILE, "w") as f:
-            json.dump(data, f)
-        
-        st.session_state["has_counted"] = True
-        return data["count"]
-        
-    except Exception as e:
-        return 0
-
-# -------- 每日访问统计 --------
-daily_visits = update_daily_visits()
-visit_text = f"今日访问: {daily_visits}"
-
-
-# -------------------------- 3. 底部导航渲染函数 --------------------------
-def render_bottom_nav(text):
-    nav_html = f"""
-    <div class="bottom-nav">
-        <a href="https://youqian.streamlit.app/" class="nav-item active" target="_self">
-            {text['nav_1']}
-        </a>
-        <a href="https://fangchan.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_2']}
-        </a>
-        <a href="https://fangjia.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_3']}
-        </a>
-        <a href="https://chuhai.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_4']}
-        </a>
-        <a href="https://chuhai.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_5']}
-        </a>
-        <a href="https://chuhai.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_6']}
-        </a>
-        <a href="https://qfschina.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_7']}
-        </a>
-        <a href="https://fangjia.streamlit.app/" class="nav-item" target="_blank">
-            {text['nav_8']}
-        </a>
-    </div>
-    """
-    st.markdown(nav_html, unsafe_allow_html=True)
-    
-# -------------------------- 4. 业务逻辑与数据 --------------------------
-TRANSLATIONS = {
-    "English": {
-        "title": "Wealth Pyramid", "subtitle": "Where do you stand globally?", 
-        "section_input": "Your Profile", "section_result": "Analysis Result",
-        "location": "Location", "income": "Annual Income", "wealth": "Net Worth", 
-        "btn_calc": "Update Analysis", "card_income": "Income Level", "card_wealth": "Wealth Status", 
-        "rank_prefix": "Top", "rank_approx": "Rank #", 
-        "disclaimer": "Estimations based on Log-Normal Distribution Model", 
-        "nav_1": "Wealth Rank",  # 简化文字适配显示
-        "nav_2": "Global Real Estate",  
-        "nav_3": "Urban Housing",  
-        "nav_4": "Global Legal",  
-        "nav_5": "Global Enterprises",  
-        "nav_6": "Contract Review",  
-        "nav_7": "German Tax",  
-        "nav_8": "Shenzhen Property",
-        "matrix_legend_high": "Top {:.1f}% (You)",
-        "matrix_legend_low": "Remaining Population"   
-    },
-    "中文": {
-        "title": "全球财富金字塔", "subtitle": "你的财富在全球处于什么段位？", 
-        "section_input": "基本信息", "section_result": "分析报告",
-        "location": "居住国家", "income": "税前年收入", "wealth": "家庭净资产", 
-        "btn_calc": "重新计算", "card_income": "年收入水平", "card_wealth": "资产水平", 
-        "rank_prefix": "前", "rank_approx": "绝对排名 第", 
-        "disclaimer": "基于对数正态分布模型估算", 
-        "nav_1": "财富排行", 
-        "nav_2": "世界房产", 
-        "nav_3": "城市房价", 
-        "nav_4": "全球法律", 
-        "nav_5": "全球企业", 
-        "nav_6": "合同审查", 
-        "nav_7": "德国财税", 
-        "nav_8": "深圳房市",
-        "matrix_legend_high": "前 {:.1f}% (你)",
-        "matrix_legend_low": "其他人群"
-    }
-}
-
-COUNTRY_DATA = {
-    "CN": {"name_en": "China", "name_zh": "中国", "currency": "¥", "population": 1411750000, "medianIncome": 60000, "medianWealth": 120000, "incomeGini": 0.7, "wealthGini": 1.1},
-    "US": {"name_en": "USA", "name_zh": "美国", "currency": "$", "population": 331900000, "medianIncome": 45000, "medianWealth": 190000, "incomeGini": 0.8, "wealthGini": 1.5},
-    "JP": {"name_en": "Japan", "name_zh": "日本", "currency": "¥", "population": 125100000, "medianIncome": 4000000, "medianWealth": 15000000, "incomeGini": 0.6, "wealthGini": 0.9},
-}
-
-def get_log_normal_percentile(value, median, shape_parameter):
-    if value <= 1: return 0.0001
-    try:
-        mu = math.log(median)
-        sigma = shape_parameter
-        z = (math.log(value) - mu) / sigma
-        percentile = 0.5 * (1 + math.erf(z / math.sqrt(2)))
-        return min(max(percentile, 0.0001), 0.9999)
-    except: return 0.0001
-
-def format_compact_localized(num, lang_key):
-    if lang_key == "中文":
-        if num >= 1e8: return f"{num/1e8:.2f}亿"
-        if num >= 1e4: return f"{num/1e4:.1f}万"
-        return f"{num:,.0f}"
-    else:
-        if num >= 1e9: return f"{num/1e9:.1f}B"
-        if num >= 1e6: return f"{num/1e6:.1f}M"
-        if num >= 1e4: return f"{num/1e3:.0f}k"
-        return f"{num:,.0f}"
-
-def render_wealth_matrix(percentile, color_high, color_low,text, lang_key):
-    """
-    渲染双色人群矩阵图
-    :param percentile: 用户的百分位（0-1）
-    :param color_high: 高段位颜色（用户所在区间）
-    :param color_low: 低段位颜色（其他人群）
-    :param text: 翻译文本
-    :param lang_key: 语言标识
+
+# -------------------------- 1. 安全的计数器逻辑 --------------------------
+def update_daily_visits(country_code, lang):
     """
-    # 矩阵大小（20x10的网格，共200个单元格）
-    matrix_size = (10, 20)
-    total_cells = matrix_size[0] * matrix_size[1]
-    
-    # 计算用户所在的高段位单元格数量
-    top_percent = (1 - percentile) * 100
-    high_cells = int(round(total_cells * (1 - percentile)))
-    high_cells = max(1, min(high_cells, total_cells))  # 确保至少1个单元格
-    low_cells = total_cells - high_cells
-    
-    # 创建矩阵数据
-    matrix = []
-    cell_count = 0
-    for row in range(matrix_size[0]):
-        row_data = []
-        for col in range(matrix_size[1]):
-            if cell_count < high_cells:
-                row_data.append(1)  # 高段位
-            else:
-                row_data.append(0)  # 低段位
-            cell_count += 1
-        matrix.append(row_data)
-    
-    # 反转矩阵，让高段位显示在右上角
-    matrix = np.array(matrix)[::-1, ::-1]
-    
-    # 创建图表
-    fig, ax = plt.subplots(figsize=(8, 4))
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    
-    # 绘制矩阵单元格
-    cell_width = 1 / matrix_size[1]
-    cell_height = 1 / matrix_size[0]
-    
-    for i in range(matrix_size[0]):
-        for j in range(matrix_size[1]):
-            x = j * cell_width
-            y = i * cell_height
-            
-            # 选择单元格颜色
-            if matrix[i, j] == 1:
-                cell_color = color_high
-                alpha = 0.8
-            else:
-                cell_color = color_low
-                alpha = 0.2
-            
-            # 绘制矩形
-            rect = patches.Rectangle(
-                (x, y), cell_width, cell_height,
-                linewidth=0.5, edgecolor='#f1f5f9',
-                facecolor=cell_color, alpha=alpha
-            )
-            ax.add_patch(rect)
-    
-    # 添加用户位置标记（在第一个高段位单元格中心）
-    high_pos = np.argwhere(matrix == 1)[0]
-    marker_x = (high_pos[1] + 0.5) * cell_width
-    marker_y = (high_pos[0] + 0.5) * cell_height
-    
-    ax.scatter(
-        marker_x, marker_y, 
-        color=color_high, s=100, 
-        edgecolor='white', linewidth=2, 
-        zorder=10, alpha=1
-    )
-    ax.text(
-        marker_x, marker_y, '●', 
-        ha='center', va='center', 
-        color='white', fontsize=8, 
-        zorder=11
-    )
-    
-    # 图表样式设置
-    ax.set_xlim(0, 1)
-    ax.set_ylim(0, 1)
-    ax.axis('off')
-    plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-    
-    # 显示图表
-    st.pyplot(fig, use_container_width=True, transparent=True)
-    plt.close(fig)
-    
-    # 显示图例
-    legend_html = f"""
-    <div class="matrix-legend">
-        <div class="legend-item">
-            <div class="legend-color" style="background-color: {color_high};"></div>
-            <span>{text['matrix_legend_high'].format(top_percent)}</span>
-        </div>
-        <div class="legend-item">
-            <div class="legend-color" style="background-color: {color_low};"></div>
-            <span>{text['matrix_legend_low']}</span>
-        </div>
-    </div>
+    新会话计一次访问，会话内首次选择的国家/语言计入细分统计
+    计数只写入进程内存，由后台线程批量落盘；重跑时直接返回内存中的当日总数
     """
-    st.markdown(legend_html, unsafe_allow_html=True)
+    counter = get_visit_counter()
+    seen = st.session_state.setdefault("counted_dimensions", set())
+    dimensions = {d: v for d, v in (("country", country_code), ("lang", lang)) if (d, v) not in seen}
+    new_visit = "has_counted" not in st.session_state
+
+    if new_visit or dimensions:
+        counter.record(dimensions, new_visit=new_visit)
+        seen.update(dimensions.items())
+        st.session_state["has_counted"] = True
+    return counter.today_total()
 
-def render_metric_card(t, amount, currency, percentile, rank, color_high, color_low, lang_key):
-    top_percent = (1 - percentile) * 100
-    rank_str = f"{t['rank_prefix']} {top_percent:.1f}%"
-    
-    # 渲染人群矩阵
-    render_wealth_matrix(percentile, color_high, color_low, t, lang_key)
-
-    # 渲染数值信息
-    html = f"""
-<div style="margin-top: 15px; padding: 0 10px;">
-    <div style="font-size: 2rem; font-weight: 700; color: #0f172a; line-height: 1.1; margin-bottom: 12px;">
-        <span style="font-size: 1.2rem; color: #64748b; font-weight: 600; margin-right: 4px;">{currency}</span>{format_compact_localized(amount, lang_key)}
-    </div>
-    <div style="background-color: #f8fafc; border-radius: 8px; padding: 12px; margin-top: 10px;">
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 4px;">
-            <span style="font-size: 0.85rem; color: #64748b;">排名百分比</span>
-            <span style="color: {color_high}; font-weight: 700; font-size: 1.1rem;">{rank_str}</span>
-        </div>
-        <div style="width: 100%; height: 6px; background: #e2e8f0; border-radius: 3px; overflow: hidden;">
-            <div style="width: {(percentile * 100)}%; height: 100%; background: {color_high}; border-radius: 3px;"></div>
-        </div>
-        <div style="font-size: 0.75rem; color: #94a3b8; margin-top: 8px; text-align: right;">
-                {t['rank_approx']} {format_compact_localized(rank, lang_key)}
-        </div>
-    </div>
-</div>
-"""
-    st.markdown(html, unsafe_allow_html=True)
 
+# -------------------------- 2. 排名计算与结果区域 --------------------------
+@st.cache_data(max_entries=10000, show_spinner=False)
+def compute_ranks(country_code, income, wealth, data_version, _countries, _tables):
+    """
+    按 (国家, 收入, 资产, 数据版本) 缓存国家内与全球的百分位/绝对排名
+    以下划线开头的参数不参与缓存键，其内容由 data_version 唯一确定
+    :return: {"income": (百分位, 排名, 全球百分位, 全球排名), "wealth": (...), "joint": (联合百分位, 联合排名)}
+    """
+    country = _countries[country_code]
+    tables = _tables
+    global_cdf = get_global_cdf(_countries, tables, data_version)
+    ranks = {}
+    for metric, amount in (("income", income), ("wealth", wealth)):
+        pct = get_country_percentile(country, metric, amount, tables.get((country_code, metric)))
+        global_pct, global_rank = global_cdf.rank(metric, to_usd(amount, country))
+        ranks[metric] = (pct, get_absolute_rank(country["population"], pct), global_pct, global_rank)
+    ranks["joint"] = get_joint_rank(country, ranks["income"][0], ranks["wealth"][0])
+    return ranks
+
+
+@st.cache_data(max_entries=1000, show_spinner=False)
+def compute_thresholds(country_code, data_version, _countries, _tables):
+    """反向查询：该国进入前 50% ... 0.001% 所需的收入/资产门槛，一次向量化算出整张表"""
+    thresholds = country_thresholds(_countries[country_code], country_code, _tables)
+    return {key: values.tolist() for key, values in thresholds.items()}
+
+
+@st.cache_data(max_entries=1000, show_spinner=False)
+def compute_rank_history(country_code, income, wealth, history_version, base_version, _history, _base_record):
+    """把当前金额放到每一年的分布中求百分位；历史文件与当前数据集的版本号共同决定缓存"""
+    return rank_over_time(_history, country_code, _base_record, {"income": income, "wealth": wealth})
+
+
+@st.fragment
+def render_analysis_section(text, lang):
+    # 整页运行时沿用外层计时；片段单独重跑时新开一条 kind="fragment" 的计时
+    trace = perf_trace.current_trace("fragment", profile=st.session_state.get("profiling", False))
+    # 片段重跑不经过脚本顶部的权限检查，到期后切回整页重跑以显示锁定界面
+    if access_expired():
+        st.rerun(scope="app")
+
+    # 本次重跑只取一次数据快照，后台热加载替换快照不会影响正在进行的渲染
+    dataset = get_dataset_store().current()
+    countries = dataset.records
+    tables = get_quantile_tables()
+    history = get_history_store()
 
-# -------------------------- 5. 主程序入口 --------------------------
-def main():
-    # 1. 主内容区域容器（核心：所有内容都在这个容器内）
-    st.markdown('<div class="main-content">', unsafe_allow_html=True)
-    
-    # --- 头部区域 ---
-    h_col, l_col = st.columns([3, 1])
-    with l_col:
-        st.markdown("<div style='height: 10px'></div>", unsafe_allow_html=True)
-        lang = st.selectbox("Language", ["中文", "English"], label_visibility="collapsed")
-    
-    text = TRANSLATIONS[lang]
-    
-    with h_col:
-        st.markdown(f"<div class='page-title'>{text['title']}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div class='page-subtitle'>{text['subtitle']}</div>", unsafe_allow_html=True)
-    
     # --- 第一部分：输入区域 ---
-    st.markdown(
-        f"<div style='font-weight:600; color:#334155; margin-bottom:12px; font-size:0.95rem;'>1. {text['section_input']}</div>",
-        unsafe_allow_html=True
-    )
+    render_section_title(lang, "section_input")
 
     with st.container(border=True):
-        c1, c2, c3 = st.columns(3)
+        c1, c_form = st.columns([1, 2])
         with c1:
             country_code = st.selectbox(
                 text['location'], 
-                options=COUNTRY_DATA.keys(), 
-                format_func=lambda x: COUNTRY_DATA[x]["name_zh"] if lang == "中文" else COUNTRY_DATA[x]["name_en"]
+                options=list(countries.keys()), 
+                format_func=lambda x: countries[x]["name_zh"] if lang == "中文" else countries[x]["name_en"]
             )
-            country = COUNTRY_DATA[country_code]
-        with c2:
-            income = st.number_input(text['income'], value=int(country["medianIncome"]*1.5), step=1000)
-        with c3:
-            wealth = st.number_input(text['wealth'], value=int(country["medianWealth"]*1.5), step=5000)
-            
-    
-    # 按钮
-    st.markdown("<div style='height: 15px;'>", unsafe_allow_html=True)
-    st.button(text['btn_calc'], type="primary")
-    st.markdown('</div>', unsafe_allow_html=True)
+            country = countries[country_code]
+            # 有历史数据时可切换年份：金额按最新价格与该年的分布比较
+            years = history.years_for(country_code) if history else []
+            year = None
+            if years:
+                year = st.selectbox(
+                    text['year'], options=[None] + years[::-1],
+                    format_func=lambda y: text['year_latest'] if y is None else str(y),
+                )
+        # 收入/资产放在表单中：编辑时不触发重跑，点击按钮后才重新计算
+        with c_form:
+            with st.form("analysis_form", border=False):
+                c2, c3 = st.columns(2)
+                with c2:
+                    income = st.number_input(text['income'], value=int(country["medianIncome"]*1.5), step=1000)
+                with c3:
+                    wealth = st.number_input(text['wealth'], value=int(country["medianWealth"]*1.5), step=5000)
+                st.form_submit_button(text['btn_calc'], type="primary")
+    trace.lap("inputs")
+
+    # -------- 每日访问统计 --------
+    daily_visits = update_daily_visits(country_code, lang)
+    visit_text = f"今日访问: {daily_visits}"
+    trace.lap("visit_counter")
     
     # --- 第二部分：结果渲染区域 ---
-    inc_pct = get_log_normal_percentile(income, country["medianIncome"], country["incomeGini"])
-    wlh_pct = get_log_normal_percentile(wealth, country["medianWealth"], country["wealthGini"])
-    inc_rank = max(1, math.floor(country["population"] * (1 - inc_pct)))
-    wlh_rank = max(1, math.floor(country["population"] * (1 - wlh_pct)))
-    
-    st.markdown(f"<div style='font-weight:600; color:#334155; margin-bottom:12px; margin-top: 10px; font-size:0.95rem;'>2. {text['section_result']}</div>", unsafe_allow_html=True)
-    
-    # 两列展示结果卡片
-    r1, r2 = st.columns(2)
+    # 选择历史年份时换成该年的数据集（只含该年有数据的国家），后续计算与渲染不需要区分年份
+    base_version = dataset.version
+    if year is not None:
+        countries, tables = history.year_dataset(year, dataset.records)
+        country = countries[country_code]
+        base_version = f"{dataset.version}:{history.version}:{year}"
+    # 数据版本变化（国家参数、汇率或分位数表）时缓存自动失效，全球网格也随之重建
+    data_version = dataset_version(countries, tables, base_version=base_version)
+    ranks = compute_ranks(country_code, income, wealth, data_version, countries, tables)
+    trace.lap("compute_ranks")
+    
+    render_section_title(lang, "section_result")
+    
+    # 三列展示结果卡片：收入、资产、两者综合
+    r1, r2, r3 = st.columns(3)
     
     with r1: 
-        html_header = f"""
-<div class="metric-card" style="border-top: 4px solid #3b82f6 !important;">
-    <div style="color: #64748b; font-size: 0.8rem; font-weight: 700; text-transform: uppercase; letter-spacing: 0.05em; margin-bottom: 15px;">
-        {text['card_income']}
-    </div>
-"""
         with st.container(border=True):
-            st.markdown(html_header, unsafe_allow_html=True)
+            st.markdown(card_header_html(lang, "income", INCOME_COLORS[0]), unsafe_allow_html=True)
             # 收入矩阵：主色 #3b82f6，对比色 #93c5fd
-            render_metric_card(text, income, country["currency"], inc_pct, inc_rank, "#3b82f6", "#93c5fd", lang)
+            render_metric_card(text, income, country["currency"], *ranks["income"], *INCOME_COLORS, lang)
+            render_density_chart(country_code, country, "income", income, *INCOME_COLORS, lang, data_version, tables.get((country_code, "income")))
             st.markdown("</div>", unsafe_allow_html=True)
+    trace.lap("render_income")
 
     with r2: 
-        html_header_w = f"""
-<div class="metric-card" style="border-top: 4px solid #6366f1 !important;">
-    <div style="color: #64748b; font-size: 0.8rem; font-weight: 700; text-transform: uppercase; letter-spacing: 0.05em; margin-bottom: 15px;">
-        {text['card_wealth']}
-    </div>
-"""
         with st.container(border=True):
-            st.markdown(html_header_w, unsafe_allow_html=True)
+            st.markdown(card_header_html(lang, "wealth", WEALTH_COLORS[0]), unsafe_allow_html=True)
             # 资产矩阵：主色 #6366f1，对比色 #a5b4fc
-            render_metric_card(text, wealth, country["currency"], wlh_pct, wlh_rank,  "#6366f1","#a5b4fc", lang)
+            render_metric_card(text, wealth, country["currency"], *ranks["wealth"], *WEALTH_COLORS, lang)
+            render_density_chart(country_code, country, "wealth", wealth, *WEALTH_COLORS, lang, data_version, tables.get((country_code, "wealth")))
+            st.markdown("</div>", unsafe_allow_html=True)
+    trace.lap("render_wealth")
+
+    with r3:
+        with st.container(border=True):
+            st.markdown(card_header_html(lang, "joint", JOINT_COLORS[0]), unsafe_allow_html=True)
+            render_joint_card(text, *ranks["joint"], *JOINT_COLORS, lang)
             st.markdown("</div>", unsafe_allow_html=True)
+    trace.lap("render_joint")
+
+    # --- 反向查询：目标排名对应的门槛 ---
+    with st.expander(text['threshold_title']):
+        render_threshold_table(compute_thresholds(country_code, data_version, countries, tables), country["currency"], lang)
+    trace.lap("thresholds")
+
+    # --- 跨国比较：同样的金额换算到每个国家，一次向量化算出全部排名 ---
+    with st.expander(text['compare_title']):
+        comparison = get_country_comparison(countries, tables, data_version)
+        result = comparison.compare({"income": income, "wealth": wealth}, country["usdRate"])
+        render_country_comparison(comparison, result, countries, lang)
+    trace.lap("compare")
+
+    # --- 收入/资产推演：金额按倍数变化时排名如何变化，逐块计算并实时刷新曲线 ---
+    with st.expander(text['what_if_title']):
+        render_what_if(country_code, country, {"income": income, "wealth": wealth}, data_version, lang, tables)
+    trace.lap("what_if")
+
+    # --- 历年排名变化 ---
+    if years:
+        with st.expander(text['history_title']):
+            history_ranks = compute_rank_history(
+                country_code, income, wealth, history.version, dataset.version, history, dataset.records[country_code])
+            render_rank_history(history_ranks, country["currency"], lang)
+        trace.lap("history")
     
     # --- 底部统计与声明 ---
-    st.markdown(f"""
-    <div style='text-align:center; color:#94a3b8; font-size:0.75rem; margin-top:40px; line-height: 1.5;'>
-        {text['disclaimer']}<br>
-        <span style="opacity: 0.7">{visit_text}</span>
-    </div>
-    """, unsafe_allow_html=True)
+    render_footer(lang, visit_text)
+    trace.lap("footer")
+    if trace.kind == "fragment":
+        trace.finish()
+
+
+# -------------------------- 3. 主程序入口 --------------------------
+def main():
+    if PREWARM_MATRIX_CACHE:
+        start_matrix_prewarm(CARD_COLOR_PAIRS, MATRIX_RENDERER)
+
+    # 1. 主内容区域容器（核心：所有内容都在这个容器内）
+    st.markdown('<div class="main-content">', unsafe_allow_html=True)
+    
+    # --- 头部区域 ---
+    h_col, l_col = st.columns([3, 1])
+    with l_col:
+        st.markdown("<div style='height: 10px'></div>", unsafe_allow_html=True)
+        lang = st.selectbox("Language", ["中文", "English"], label_visibility="collapsed")
+    
+    text = TRANSLATIONS[lang]
+    
+    with h_col:
+        render_header(lang)
+    run_trace.lap("header")
+    
+    # --- 输入与结果区域：作为片段独立重跑，不会重新执行权限检查、CSS 注入等整页逻辑 ---
+    render_analysis_section(text, lang)
     
     # 闭合主内容容器
     st.markdown('</div>', unsafe_allow_html=True)
     
     # 渲染底部导航
-    render_bottom_nav(text)
+    render_bottom_nav(lang)
+    run_trace.lap("bottom_nav")
+    run_trace.finish()
 
-# -------------------------- 6. 执行 --------------------------
+# -------------------------- 4. 执行 --------------------------
 if __name__ == "__main__":
     main()
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 测试不能污染线上的访问统计与权限记录
+_tmp = tempfile.mkdtemp(prefix="wealthrank-test-")
+os.environ.setdefault("WEALTHRANK_VISIT_DB", os.path.join(_tmp, "visits.sqlite3"))
+os.environ.setdefault("WEALTHRANK_ENTITLEMENT_DB", os.path.join(_tmp, "entitlements.sqlite3"))
+
+import wealth_model  # noqa: E402
+
+
+@pytest.fixture(params=["scipy", "numpy"])
+def backend(request, monkeypatch):
+    """分别在 scipy 与纯 numpy 实现下运行；没有安装 scipy 时跳过前者"""
+    if request.param == "scipy":
+        if not wealth_model._scipy():
+            pytest.skip("未安装 scipy")
+    else:
+        monkeypatch.setattr(wealth_model, "_scipy_special", False)
+    return request.param
@@ -0,0 +1,92 @@
+import io
+import math
+
+import numpy as np
+import pytest
+
+import wealth_model
+from batch_score import score_stream
+from wealth_model import (
+    COUNTRY_DATA, PERCENTILE_FLOOR, get_absolute_rank, get_log_normal_percentile, get_log_normal_percentile_batch,
+    norm_cdf_batch, score_batch,
+)
+
+
+# -------------------------- 单值 / 批量一致 --------------------------
+def test_batch_matches_scalar(backend):
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(11, 2, 5000), [0.0, 0.5, 1.0, 1.5, 1e15, math.inf]])
+    for median, sigma in ((60000, 0.9), (190000, 2.5), (4_000_000, 0.6)):
+        batch = get_log_normal_percentile_batch(values, median, sigma)
+        scalar = np.array([get_log_normal_percentile(v, median, sigma) for v in values])
+        np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-14)
+
+
+def test_batch_special_values(backend):
+    batch = get_log_normal_percentile_batch([math.nan, -5.0, 1.0], 60000, 0.9)
+    assert math.isnan(batch[0])
+    assert batch[1:].tolist() == [PERCENTILE_FLOOR, PERCENTILE_FLOOR]
+    assert math.isnan(get_log_normal_percentile(math.nan, 60000, 0.9))
+    # 无效参数按单值函数的兜底规则取下限
+    assert get_log_normal_percentile_batch([50000.0], [0.0], [0.9]).tolist() == [PERCENTILE_FLOOR]
+    assert get_log_normal_percentile_batch([50000.0], [60000.0], [0.0]).tolist() == [PERCENTILE_FLOOR]
+
+
+def test_batch_broadcasts_parameters(backend):
+    values = np.array([30000.0, 60000.0, 120000.0])
+    batch = get_log_normal_percentile_batch(values, [60000.0, 60000.0, 30000.0], [0.9, 1.2, 0.9])
+    scalar = [get_log_normal_percentile(v, m, s) for v, m, s in zip(values, (60000, 60000, 30000), (0.9, 1.2, 0.9))]
+    np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-14)
+
+
+def test_score_batch_matches_scalar(backend):
+    codes = ["CN", "US", "cn", "XX", "JP", "US"]
+    incomes = [90000.0, 50000.0, 90000.0, 1000.0, math.nan, 0.5]
+    wealths = [180000.0, 2e6, 180000.0, 1000.0, 3e7, 1e9]
+    result = score_batch(codes, incomes, wealths)
+    for i, code in enumerate(codes):
+        country = COUNTRY_DATA.get(code)
+        for metric, values in (("income", incomes), ("wealth", wealths)):
+            pct, rank = result[f"{metric}_percentile"][i], result[f"{metric}_rank"][i]
+            if country is None or math.isnan(values[i]):
+                assert math.isnan(pct) and math.isnan(rank)
+                continue
+            median, sigma = (country[f] for f in wealth_model.METRIC_FIELDS[metric])
+            expected = get_log_normal_percentile(values[i], median, sigma)
+            assert pct == pytest.approx(expected, abs=1e-14)
+            assert rank == get_absolute_rank(country["population"], pct)
+    assert result["income_percentile"][5] == PERCENTILE_FLOOR
+
+
+def test_score_stream_chunks_match_one_pass():
+    rows = [("CN", "90000", "180000"), ("US", "", "2000000"), ("ZZ", "1", "1"), ("JP", "abc", "30000000")] * 7
+    text = "country,income,wealth\n" + "".join(",".join(row) + "\n" for row in rows)
+    outputs = []
+    for chunk_size in (3, 1000):
+        out = io.StringIO()
+        assert score_stream(io.StringIO(text), out, chunk_size=chunk_size) == len(rows)
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    lines = outputs[0].splitlines()
+    assert lines[0] == "country,income,wealth,income_percentile,income_rank,wealth_percentile,wealth_rank"
+    # 缺失或无法解析的金额、未知国家输出空值
+    assert lines[2].split(",")[3:5] == ["", ""] and lines[3].split(",")[3:] == ["", "", "", ""]
+
+
+# -------------------------- 无 scipy 时的 erf --------------------------
+def test_erf_fallback_matches_math(monkeypatch):
+    monkeypatch.setattr(wealth_model, "_scipy_special", False)
+    x = np.concatenate([np.linspace(-7, 7, 20001), [0.0, 1e-300, -1e-8, 0.46875, -0.46875, 0.4687501, 4.0, 4.0000001, 30.0]])
+    expected = np.array([math.erf(v) for v in x])
+    np.testing.assert_allclose(wealth_model._erf(x), expected, rtol=1e-14, atol=0)
+    z = np.linspace(-37, 8, 20001)
+    expected = np.array([0.5 * math.erfc(-v / math.sqrt(2)) for v in z])
+    np.testing.assert_allclose(norm_cdf_batch(z), expected, rtol=2e-13, atol=0)
+
+
+def test_erf_fallback_accepts_scalars_and_edges(monkeypatch):
+    monkeypatch.setattr(wealth_model, "_scipy_special", False)
+    assert float(wealth_model._erf(0.3)) == pytest.approx(math.erf(0.3), rel=1e-15)
+    assert float(norm_cdf_batch(-2.0)) == pytest.approx(0.5 * math.erfc(2 / math.sqrt(2)), rel=1e-14)
+    assert wealth_model._erf([math.inf, -math.inf]).tolist() == [1.0, -1.0]
+    assert math.isnan(norm_cdf_batch([math.nan])[0])
@@ -0,0 +1,86 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import wealth_model
+from distribution_fit import (
+    METHOD_GINI, METHOD_QUANTILES, apply_fitted_params, build_artifact, fit_parameters, fit_quantile_points,
+    load_fitted_params, write_artifact,
+)
+from quantile_tables import QuantileTable
+from wealth_model import COUNTRY_DATA, gini_to_sigma, gini_to_sigma_batch, norm_ppf_batch, sigma_to_gini
+
+
+# -------------------------- 基尼系数 <-> sigma --------------------------
+@pytest.mark.parametrize("gini", [1e-6, 0.05, 0.33, 0.47, 0.7, 0.85, 0.95, 0.999])
+def test_gini_sigma_round_trip(gini):
+    assert sigma_to_gini(gini_to_sigma(gini)) == pytest.approx(gini, rel=1e-12)
+
+
+@pytest.mark.parametrize("sigma", [0.1, 0.6, 1.0, 2.0, 4.0])
+def test_sigma_gini_round_trip(sigma):
+    assert gini_to_sigma(sigma_to_gini(sigma)) == pytest.approx(sigma, rel=1e-10)
+
+
+@pytest.mark.parametrize("gini", [0, 1, -0.2, 1.5])
+def test_gini_out_of_range(gini):
+    with pytest.raises(ValueError):
+        gini_to_sigma(gini)
+
+
+@pytest.mark.parametrize("scipy_special", [None, False])
+def test_gini_to_sigma_batch_matches_scalar(monkeypatch, scipy_special):
+    monkeypatch.setattr(wealth_model, "_scipy_special", scipy_special)
+    gini = np.array([1e-6, 0.05, 0.33, 0.47, 0.7, 0.85, 0.95, 0.999])
+    expected = [gini_to_sigma(g) for g in gini]
+    np.testing.assert_allclose(gini_to_sigma_batch(gini), expected, rtol=1e-13, atol=0)
+    assert np.isnan(gini_to_sigma_batch([0, 1, -0.2, math.nan])).all()
+
+
+
+# -------------------------- 分位点拟合 --------------------------
+def test_fit_recovers_exact_lognormal_groups():
+    p = np.array([0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+    groups = [(p, median * np.exp(sigma * norm_ppf_batch(p))) for median, sigma in ((60000, 0.8), (2e6, 1.9))]
+    groups.append((p[:2], [10.0, 20.0]))
+    result = fit_quantile_points(groups)
+    np.testing.assert_allclose(result["median"][:2], [60000, 2e6], rtol=1e-10)
+    np.testing.assert_allclose(result["sigma"][:2], [0.8, 1.9], rtol=1e-10)
+    np.testing.assert_allclose(result["max_percentile_error"][:2], 0, atol=1e-10)
+    assert result["points"].tolist() == [6, 6, 2] and result["r2"][2] == pytest.approx(1.0)
+
+
+def test_fit_parameters_uses_tables_and_falls_back_to_gini():
+    records = {code: COUNTRY_DATA[code] for code in ("CN", "US")}
+    p = [0.1, 0.5, 0.9, 0.99]
+    tables = {("CN", "income"): QuantileTable(60000 * np.exp(0.7 * norm_ppf_batch(p)), p)}
+    params = fit_parameters(records, tables)
+    assert params["CN"]["income"]["method"] == METHOD_QUANTILES
+    assert params["CN"]["income"]["sigma"] == pytest.approx(0.7, rel=1e-10)
+    assert params["CN"]["wealth"]["method"] == METHOD_GINI
+    assert params["US"]["wealth"]["method"] == METHOD_GINI
+    assert params["US"]["wealth"]["sigma"] == pytest.approx(gini_to_sigma(records["US"]["wealthGini"]), rel=1e-12)
+
+
+# -------------------------- 参数文件 --------------------------
+def test_artifact_round_trip_and_stale_entries(tmp_path):
+    records = {"CN": COUNTRY_DATA["CN"]}
+    path = str(tmp_path / "fitted" / "params.json")
+    write_artifact(build_artifact(fit_parameters(records)), path)
+    artifact = load_fitted_params(path)
+    assert apply_fitted_params(records, artifact)["CN"]["incomeSigma"] == pytest.approx(records["CN"]["incomeSigma"])
+    # 原始字段变化后该条目过期，不再覆盖
+    changed = {"CN": dict(records["CN"], medianIncome=1.0, incomeSigma=0.123)}
+    assert apply_fitted_params(changed, artifact)["CN"]["incomeSigma"] == 0.123
+
+
+def test_invalid_artifact_is_rejected(tmp_path):
+    path = tmp_path / "params.json"
+    path.write_text(json.dumps({"format": 1, "params": {"CN": {"income": {"median": 1.0, "sigma": -1}}}}))
+    with pytest.raises(ValueError):
+        load_fitted_params(str(path))
+    path.write_text(json.dumps({"format": 999, "params": {}}))
+    with pytest.raises(ValueError):
+        load_fitted_params(str(path))
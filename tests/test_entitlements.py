@@ -0,0 +1,170 @@
+import pytest
+
+from entitlements import (
+    STATUS_FREE, STATUS_LOCKED, STATUS_UNLOCKED, UNLOCK_INVALID, UNLOCK_OK, UNLOCK_RATE_LIMITED, EntitlementStore,
+    client_ip, get_entitlement_store, hash_code, new_token, set_entitlement_store, valid_token,
+)
+
+CODE = "open-sesame"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = EntitlementStore({hash_code(CODE)}, db_path=str(tmp_path / "entitlements.sqlite3"), free_period=60,
+                             access_duration=3600, locked_ttl=7200, max_attempts=3, attempt_window=600, clock=clock)
+    yield store
+    store.close()
+
+
+def test_trial_then_locked(store, clock):
+    token = new_token()
+    access = store.check(token)
+    assert access.status == STATUS_FREE and access.remaining == 60
+    clock.advance(59)
+    assert store.check(token).status == STATUS_FREE
+    clock.advance(1)
+    access = store.check(token)
+    assert access.status == STATUS_LOCKED and not access.granted
+
+
+def test_unlock_grants_access_until_expiry(store, clock):
+    token = new_token()
+    store.check(token)
+    clock.advance(120)
+    assert store.unlock(token, "wrong") == UNLOCK_INVALID
+    assert store.check(token).status == STATUS_LOCKED
+    assert store.unlock(token, f"  {CODE}\n") == UNLOCK_OK
+    access = store.check(token)
+    assert access.status == STATUS_UNLOCKED and access.remaining == 3600
+    clock.advance(3599)
+    assert store.check(token).status == STATUS_UNLOCKED
+    clock.advance(1)
+    assert store.check(token).status == STATUS_LOCKED
+
+
+def test_expired_record_starts_a_new_trial(store, clock):
+    token = new_token()
+    store.check(token)
+    clock.advance(60 + 7199)
+    assert store.check(token).status == STATUS_LOCKED
+    clock.advance(1)
+    assert store.check(token).status == STATUS_FREE
+
+
+def test_unlock_is_shared_across_stores(store, clock):
+    token = new_token()
+    store.check(token)
+    other = EntitlementStore({hash_code(CODE)}, db_path=store.db_path, free_period=60, access_duration=3600, clock=clock)
+    try:
+        clock.advance(300)
+        assert other.unlock(token, CODE) == UNLOCK_OK
+        assert store.check(token).status == STATUS_UNLOCKED
+    finally:
+        other.close()
+
+
+def test_rate_limit_per_token(store, clock):
+    token = new_token()
+    for _ in range(3):
+        assert store.unlock(token, "wrong") == UNLOCK_INVALID
+    # 超出限额后正确的代码也被拒绝
+    assert store.unlock(token, CODE) == UNLOCK_RATE_LIMITED
+    assert store.stats()["rate_limited_clients"] == 1
+    clock.advance(601)
+    assert store.unlock(token, CODE) == UNLOCK_OK
+
+
+def test_rate_limit_per_client_ip(store):
+    for _ in range(3):
+        assert store.unlock(new_token(), "wrong", client="203.0.113.7") == UNLOCK_INVALID
+    # 换新令牌也绕不过同一 IP 的限额，其他 IP 不受影响
+    assert store.unlock(new_token(), CODE, client="203.0.113.7") == UNLOCK_RATE_LIMITED
+    assert store.unlock(new_token(), CODE, client="198.51.100.2") == UNLOCK_OK
+
+
+def test_successful_unlock_resets_attempts(store):
+    token = new_token()
+    for _ in range(2):
+        store.unlock(token, "wrong")
+    assert store.unlock(token, CODE) == UNLOCK_OK
+    for _ in range(3):
+        assert store.unlock(token, "wrong") == UNLOCK_INVALID
+
+
+def test_in_memory_database(clock):
+    store = EntitlementStore({hash_code(CODE)}, db_path=":memory:", clock=clock)
+    try:
+        token = new_token()
+        assert store.check(token).status == STATUS_FREE
+        assert store.unlock(token, CODE) == UNLOCK_OK
+        assert store.check(token).status == STATUS_UNLOCKED
+        assert store.stats()["entries"] == 1
+    finally:
+        store.close()
+
+
+def test_trial_is_bound_to_client_ip(store, clock):
+    first = new_token()
+    assert store.check(first, client="203.0.113.7").remaining == 60
+    clock.advance(40)
+    # 同一 IP 换新令牌只剩该 IP 的试用期，其他 IP 的新令牌照常试用
+    assert store.check(new_token(), client="203.0.113.7").remaining == 20
+    assert store.check(new_token(), client="198.51.100.2").remaining == 60
+    clock.advance(20)
+    assert store.check(new_token(), client="203.0.113.7").status == STATUS_LOCKED
+    # 没有可信的客户端 IP 时只能按令牌区分
+    assert store.check(new_token()).status == STATUS_FREE
+
+
+def test_unlock_is_not_limited_by_client_trial(store, clock):
+    token = new_token()
+    store.check(token, client="203.0.113.7")
+    clock.advance(120)
+    assert store.check(token, client="203.0.113.7").status == STATUS_LOCKED
+    assert store.unlock(token, CODE, client="203.0.113.7") == UNLOCK_OK
+    assert store.check(token, client="203.0.113.7").status == STATUS_UNLOCKED
+
+
+def test_set_entitlement_store_swaps_shared_instance(clock):
+    memory = EntitlementStore({hash_code(CODE)}, db_path=":memory:", clock=clock)
+    previous = set_entitlement_store(memory)
+    try:
+        assert get_entitlement_store() is memory
+    finally:
+        assert set_entitlement_store(previous) is memory
+        memory.close()
+
+
+@pytest.mark.parametrize("header, hops, expected", [
+    (None, 1, None),
+    ("203.0.113.7", 0, None),
+    ("203.0.113.7", 1, "203.0.113.7"),
+    ("1.2.3.4, 203.0.113.7", 1, "203.0.113.7"),
+    ("1.2.3.4, 203.0.113.7, 10.0.0.2", 2, "203.0.113.7"),
+    ("203.0.113.7", 2, None),
+])
+def test_client_ip(header, hops, expected):
+    assert client_ip(header, hops) == expected
+
+
+def test_valid_token():
+    assert valid_token(new_token())
+    assert not valid_token("short")
+    assert not valid_token("x" * 65)
+    assert not valid_token(None)
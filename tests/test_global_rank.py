@@ -0,0 +1,27 @@
+import math
+
+import numpy as np
+import pytest
+
+from global_rank import GlobalCDF
+from wealth_model import COUNTRY_DATA, PERCENTILE_CEIL, PERCENTILE_FLOOR
+
+
+@pytest.fixture(scope="module")
+def global_cdf():
+    return GlobalCDF(COUNTRY_DATA)
+
+
+def test_scalar_matches_batch(global_cdf):
+    values = [math.nan, -5.0, 0.0, 1.0, 1.5, 320.0, 12000.0, 4.5e6, 1e15]
+    for metric in ("income", "wealth"):
+        batch = global_cdf.percentile_batch(metric, values)
+        scalar = [global_cdf.percentile(metric, v) for v in values]
+        np.testing.assert_allclose(scalar, batch, rtol=0, atol=1e-12)
+
+
+def test_nan_and_bounds(global_cdf):
+    assert math.isnan(global_cdf.percentile("income", math.nan))
+    assert math.isnan(global_cdf.percentile_batch("income", [math.nan])[0])
+    assert global_cdf.percentile("income", 0.5) == PERCENTILE_FLOOR
+    assert global_cdf.percentile("wealth", 1e15) == PERCENTILE_CEIL
@@ -0,0 +1,25 @@
+import math
+
+import numpy as np
+import pytest
+
+from joint_rank import get_joint_rank, get_joint_rank_batch
+from wealth_model import COUNTRY_DATA
+
+
+def test_batch_matches_scalar():
+    codes = ["CN", "US", "JP", "CN", "XX", "US"]
+    income = [0.5, 0.93, 0.0001, 0.999, 0.7, math.nan]
+    wealth = [0.62, 0.4, 0.9999, 0.998, 0.7, 0.5]
+    pct, rank = get_joint_rank_batch(COUNTRY_DATA, codes, income, wealth)
+    for i, code in enumerate(codes[:4]):
+        expected_pct, expected_rank = get_joint_rank(COUNTRY_DATA[code], income[i], wealth[i])
+        assert pct[i] == pytest.approx(expected_pct, rel=1e-12)
+        assert rank[i] == pytest.approx(expected_rank, rel=1e-9, abs=1)
+    # 未知国家或缺失百分位为 NaN
+    assert np.isnan(pct[4:]).all() and np.isnan(rank[4:]).all()
+
+
+def test_batch_accepts_empty_input():
+    pct, rank = get_joint_rank_batch(COUNTRY_DATA, [], [], [])
+    assert pct.shape == (0,) and rank.shape == (0,)
@@ -0,0 +1,112 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from quantile_tables import QuantileTable, _pchip_slopes, get_quantile_tables, load_quantile_tables
+from wealth_model import COUNTRY_DATA, PERCENTILE_CEIL, PERCENTILE_FLOOR, get_country_percentile, get_log_normal_percentile
+
+# 分位点间距很不均匀、斜率变化剧烈，容易让普通三次样条越界
+TABLES = {
+    "smooth": ([8000, 20000, 45000, 90000, 200000, 600000], [0.1, 0.3, 0.5, 0.75, 0.9, 0.99]),
+    "kinked": ([1000, 1100, 50000, 51000, 2e6, 2.1e6], [0.05, 0.4, 0.41, 0.9, 0.91, 0.999]),
+    "two_points": ([10000, 100000], [0.2, 0.8]),
+}
+
+
+@pytest.fixture(params=sorted(TABLES))
+def table(request):
+    return QuantileTable(*TABLES[request.param])
+
+
+def _grid(table):
+    low, high = math.exp(table.log_values[0]), math.exp(table.log_values[-1])
+    return np.concatenate([np.geomspace(low / 100, high * 100, 4001), np.exp(table.log_values), [0.0, 0.5, 1.0, math.inf]])
+
+
+def test_batch_matches_scalar(table):
+    values = _grid(table)
+    batch = table.percentile_batch(values)
+    scalar = np.array([table.percentile(v) for v in values.tolist()])
+    # 标量与批量的求值顺序不同，斜率变化剧烈的表上差异可达 1e-13 量级
+    np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-12)
+
+
+def test_nan_gives_nan(table):
+    assert math.isnan(table.percentile(math.nan))
+    assert math.isnan(table.percentile_batch([math.nan])[0])
+    assert table.percentile(1.0) == PERCENTILE_FLOOR
+
+
+def test_monotone_and_clamped(table):
+    values = np.sort(_grid(table))
+    p = table.percentile_batch(values)
+    assert np.all(np.diff(p) >= 0)
+    assert p.min() >= PERCENTILE_FLOOR and p.max() <= PERCENTILE_CEIL
+
+
+def test_interpolates_through_table_points(table):
+    values = np.exp(table.log_values)
+    np.testing.assert_allclose(table.percentile_batch(values), table.probabilities, rtol=0, atol=1e-12)
+
+
+def test_top_point_caps_forward_lookup(table):
+    top, p_top = math.exp(table.log_values[-1]), table.probabilities[-1]
+    assert table.percentile(top * 10) == p_top
+    assert table.percentile_batch([top * 10]).tolist() == [p_top]
+
+
+def test_pchip_slopes_keep_monotonicity():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        x = np.cumsum(rng.uniform(0.01, 3, 8))
+        y = np.cumsum(rng.exponential(1, 8) ** 3)
+        assert np.all(_pchip_slopes(x, y) >= 0)
+        t = QuantileTable(np.exp(x), y / (y[-1] * 1.01))
+        p = t.percentile_batch(np.exp(np.linspace(x[0], x[-1], 2000)))
+        assert np.all(np.diff(p) >= -1e-15)
+
+
+@pytest.mark.parametrize("values, probabilities", [
+    ([1000], [0.5]),
+    ([1000, 2000], [0.5, 0.4]),
+    ([1000, 1000], [0.4, 0.5]),
+    ([-1, 2000], [0.4, 0.5]),
+    ([1000, 2000], [0.0, 0.5]),
+])
+def test_rejects_invalid_tables(values, probabilities):
+    with pytest.raises(ValueError):
+        QuantileTable(values, probabilities)
+
+
+# -------------------------- 加载与模型选择 --------------------------
+def test_csv_and_json_files_load_the_same_tables(tmp_path):
+    values, probabilities = TABLES["smooth"]
+    csv_path = tmp_path / "tables.csv"
+    # 百分位按 0-100 书写，国家代码与指标大小写不敏感
+    csv_path.write_text("country,metric,percentile,value\n" + "".join(
+        f"cn,Income,{p * 100},{v}\n" for v, p in zip(values, probabilities)), encoding="utf-8")
+    json_path = tmp_path / "tables.json"
+    json_path.write_text(json.dumps({"CN": {"income": {"percentiles": probabilities, "values": values}}}), encoding="utf-8")
+    from_csv, from_json = load_quantile_tables(str(csv_path)), load_quantile_tables(str(json_path))
+    assert list(from_csv) == list(from_json) == [("CN", "income")]
+    np.testing.assert_allclose(from_csv["CN", "income"].probabilities, from_json["CN", "income"].probabilities, rtol=1e-15)
+    assert get_quantile_tables(str(tmp_path / "missing.csv")) == {}
+
+
+def test_load_rejects_bad_rows(tmp_path):
+    path = tmp_path / "tables.csv"
+    path.write_text("country,metric,percentile,value\nCN,assets,0.5,1000\nCN,assets,0.9,5000\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="CN"):
+        load_quantile_tables(str(path))
+
+
+def test_model_is_chosen_per_country():
+    table = QuantileTable(*TABLES["smooth"])
+    cn = COUNTRY_DATA["CN"]
+    lognormal = get_log_normal_percentile(90000, cn["medianIncome"], cn["incomeSigma"])
+    assert get_country_percentile(cn, "income", 90000) == lognormal
+    assert get_country_percentile(cn, "income", 90000, table) == table.percentile(90000)
+    # model 为 lognormal 的国家即使有表也使用对数正态
+    assert get_country_percentile(dict(cn, model="lognormal"), "income", 90000, table) == lognormal
@@ -0,0 +1,28 @@
+import math
+
+import pytest
+
+pytest.importorskip("starlette")
+
+import rank_api
+
+
+def test_batch_matches_single_queries_including_joint():
+    countries, tables, _, global_cdf = rank_api._current_engine()
+    items = [("CN", 90000.0, 180000.0), ("US", 50000.0, math.nan), ("JP", math.nan, 2e7), ("XX", 1.0, 1.0)]
+    codes, incomes, wealths = zip(*items)
+    ranked = rank_api.rank_batch(countries, tables, global_cdf, list(codes), list(incomes), list(wealths))
+    joint_pct, joint_rank = ranked["joint"]
+    for i, (code, income, wealth) in enumerate(items[:3]):
+        amounts = {"income": None if math.isnan(income) else income, "wealth": None if math.isnan(wealth) else wealth}
+        single = rank_api.rank_one(countries, tables, global_cdf, code, amounts)
+        for metric in ("income", "wealth"):
+            if metric in single:
+                assert ranked[metric][0][i] == pytest.approx(single[metric]["percentile"], rel=1e-12)
+                assert ranked[metric][2][i] == pytest.approx(single[metric]["global_percentile"], rel=1e-12)
+        if "joint" in single:
+            assert joint_pct[i] == pytest.approx(single["joint"]["percentile"], rel=1e-12)
+            assert joint_rank[i] == single["joint"]["rank"]
+        else:
+            assert math.isnan(joint_pct[i])
+    assert math.isnan(joint_pct[3])
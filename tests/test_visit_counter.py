@@ -0,0 +1,123 @@
+import sqlite3
+
+import pytest
+
+from visit_counter import VisitCounter
+
+
+@pytest.fixture
+def counter(tmp_path, monkeypatch):
+    # 旧计数文件按当前目录查找，在临时目录中运行避免导入仓库里的文件
+    monkeypatch.chdir(tmp_path)
+    counter = VisitCounter(db_path=str(tmp_path / "visits.sqlite3"), flush_interval=3600)
+    yield counter
+    counter.close()
+
+
+def _lock_database(counter):
+    """另开连接持有写锁，并让计数器的连接不等待，写入立即失败"""
+    counter._conn.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(counter.db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    return other
+
+
+def test_counts_stay_in_memory_until_flush(counter):
+    counter.record({"country": "CN"})
+    counter.record({"country": "US"}, new_visit=False)
+    assert counter.today_total() == 1
+    assert counter.stats() == {}
+    assert counter.flush()
+    assert counter.stats() == {"country": {"CN": 1, "US": 1}, "total": {"": 1}}
+    assert counter.today_total() == 1
+
+
+def test_flush_accumulates_across_batches(counter):
+    for _ in range(3):
+        counter.record({"lang": "中文"})
+        counter.flush()
+    assert counter.stats()["total"] == {"": 3}
+    assert counter.stats()["lang"] == {"中文": 3}
+    assert counter.today_total() == 3
+
+
+def test_failed_write_is_retried(counter):
+    counter.record({"country": "CN"})
+    counter.record()
+    other = _lock_database(counter)
+    try:
+        assert not counter.flush()
+        # 增量放回内存，当日总数不受影响
+        assert counter.today_total() == 2
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    counter.record()
+    assert counter.flush()
+    assert counter.stats() == {"country": {"CN": 1}, "total": {"": 3}}
+    assert counter.today_total() == 3
+
+
+def test_failed_read_after_write_does_not_double_count(counter, monkeypatch):
+    counter.record()
+    assert counter.today_total() == 1
+    counter.record()
+
+    def broken_read(day):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(counter, "_read_total", broken_read)
+    assert counter.flush()
+    assert counter.today_total() == 2
+    monkeypatch.undo()
+    assert counter.flush()
+    assert counter.stats()["total"] == {"": 2}
+    assert counter.today_total() == 2
+
+
+def test_total_includes_other_processes(counter):
+    other = VisitCounter(db_path=counter.db_path, flush_interval=3600)
+    try:
+        other.record()
+        other.record()
+        other.flush()
+    finally:
+        other.close()
+    counter.record()
+    counter.flush()
+    assert counter.today_total() == 3
+
+
+def test_unavailable_database_keeps_counting_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    missing = tmp_path / "missing"
+    counter = VisitCounter(db_path=str(missing / "visits.sqlite3"), flush_interval=3600)
+    try:
+        counter.record({"country": "CN"})
+        counter.record()
+        assert counter.today_total() == 2
+        assert not counter.flush()
+        assert counter.today_total() == 2
+        # 目录恢复后下次刷盘重新连接，暂存的计数全部写入
+        missing.mkdir()
+        assert counter.flush()
+        assert counter.stats() == {"country": {"CN": 1}, "total": {"": 2}}
+        assert counter.today_total() == 2
+    finally:
+        counter.close()
+
+
+def test_failed_first_read_shows_pending_count(counter, monkeypatch):
+    counter.record()
+    counter.flush()
+    counter._persisted_totals.clear()
+    counter.record()
+
+    def broken_read(day):
+        raise sqlite3.DatabaseError("database disk image is malformed")
+
+    monkeypatch.setattr(counter, "_read_total", broken_read)
+    assert counter.today_total() == 1
+    monkeypatch.undo()
+    assert counter.flush()
+    assert counter.today_total() == 2
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+from quantile_tables import QuantileTable
+from wealth_model import COUNTRY_DATA, PERCENTILE_CEIL, get_log_normal_percentile, norm_cdf_batch, norm_ppf_batch
+from wealth_thresholds import (
+    TAIL_START, TARGET_TOP_SHARES, country_thresholds, lognormal_pareto_threshold, pareto_alpha, table_pareto_threshold,
+)
+
+SHARES = np.array([0.5, 0.25, 0.1, 0.05, 0.02, 0.011])
+TAIL_SHARES = np.array([0.009, 0.001, 0.0001, 0.00001])
+
+
+@pytest.mark.parametrize("median, sigma", [(60000, 0.9), (190000, 2.5), (4_000_000, 0.6)])
+def test_body_inverts_forward_percentile(median, sigma):
+    thresholds = lognormal_pareto_threshold(SHARES, median, sigma)
+    percentiles = [get_log_normal_percentile(x, median, sigma) for x in thresholds]
+    np.testing.assert_allclose(percentiles, 1 - SHARES, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("median, sigma", [(60000, 0.9), (190000, 2.5)])
+def test_pareto_tail_is_continuous_and_heavier(median, sigma):
+    tail_share = 1 - TAIL_START
+    below, above = lognormal_pareto_threshold([tail_share * (1 + 1e-9), tail_share * (1 - 1e-9)], median, sigma)
+    assert above == pytest.approx(below, rel=1e-7)
+    # 尾部内 S(x) = (1 - p0) · (x / x0)^(-α)
+    x0 = lognormal_pareto_threshold([tail_share], median, sigma)[0]
+    tail = lognormal_pareto_threshold(TAIL_SHARES, median, sigma)
+    np.testing.assert_allclose(tail_share * (tail / x0) ** -pareto_alpha(sigma), TAIL_SHARES, rtol=1e-12)
+    # 比纯对数正态更厚：同一目标排名需要更高的门槛
+    assert np.all(tail > [median * math.exp(-sigma * float(z)) for z in norm_ppf_batch(TAIL_SHARES)])
+
+
+def test_table_threshold_inverts_table_and_extends_with_tail():
+    table = QuantileTable([8000, 20000, 45000, 90000, 200000, 600000], [0.1, 0.3, 0.5, 0.75, 0.9, 0.99])
+    shares = np.array([0.8, 0.6, 0.4, 0.2, 0.05, 0.02])
+    np.testing.assert_allclose(table.percentile_batch(table_pareto_threshold(table, shares)), 1 - shares, atol=1e-10)
+    top = table_pareto_threshold(table, [0.001])[0]
+    assert top == pytest.approx(600000 * 10 ** (1 / table.tail_alpha), rel=1e-12)
+
+
+def test_country_thresholds_per_model():
+    cn = COUNTRY_DATA["CN"]
+    table = QuantileTable([8000, 20000, 45000, 90000, 200000, 600000], [0.1, 0.3, 0.5, 0.75, 0.9, 0.99])
+    result = country_thresholds(cn, "CN", {("CN", "wealth"): table})
+    assert result["top_shares"].tolist() == list(TARGET_TOP_SHARES)
+    np.testing.assert_array_equal(result["income"], lognormal_pareto_threshold(TARGET_TOP_SHARES, cn["medianIncome"], cn["incomeSigma"]))
+    np.testing.assert_array_equal(result["wealth"], table_pareto_threshold(table, TARGET_TOP_SHARES))
+    # 目标排名越靠前门槛越高
+    assert np.all(np.diff(result["income"]) > 0) and np.all(np.diff(result["wealth"]) > 0)
+
+
+def test_forward_path_is_pure_lognormal():
+    # Pareto 尾部只用于门槛表，结果卡片的百分位在前 1% 以上仍为对数正态
+    median, sigma = 60000, 0.9
+    for z in (2.0, 2.5, 3.0, 3.5):
+        value = median * math.exp(sigma * z)
+        assert get_log_normal_percentile(value, median, sigma) == pytest.approx(0.5 * math.erfc(-z / math.sqrt(2)), abs=1e-15)
+    assert get_log_normal_percentile(1e30, median, sigma) == PERCENTILE_CEIL
+
+
+def test_ppf_inverts_cdf(backend):
+    p = np.array([1e-12, 1e-6, 0.01, 0.02425, 0.3, 0.5, 0.9, 0.99, 1 - 1e-9])
+    np.testing.assert_allclose(norm_cdf_batch(norm_ppf_batch(p)), p, rtol=1e-12)
+    edges = norm_ppf_batch([0.0, 1.0, -0.1, 1.1, math.nan])
+    assert edges[0] == -math.inf and edges[1] == math.inf
+    assert np.isnan(edges[2:]).all()
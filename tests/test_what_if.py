@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+import what_if
+from lru_cache import LRUCache
+from what_if import SWEEP_CACHE_SIZE, cached_sweep, run_sweep, sweep_amounts, sweep_key
+from wealth_model import COUNTRY_DATA, get_log_normal_percentile
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+
+def _sweep_charts(at):
+    return [m.value for m in at.markdown if 'viewBox="0 0 300 110"' in m.value]
+
+
+def test_sweep_matches_scalar_and_is_cached():
+    cn = COUNTRY_DATA["CN"]
+    amounts = sweep_amounts(90000, 0.5, 4.0, 2500)
+    key = sweep_key("CN", "income", amounts, "v1")
+    chunks = list(run_sweep(key, cn, "income", amounts, chunk_size=1000))
+    assert [len(p) for _, p in chunks] == [1000, 2000, 2500]
+    expected = [get_log_normal_percentile(a, cn["medianIncome"], cn["incomeSigma"]) for a in amounts]
+    np.testing.assert_allclose(chunks[-1][1], expected, rtol=0, atol=1e-14)
+    np.testing.assert_array_equal(cached_sweep(key)[1], chunks[-1][1])
+    # 命中缓存时只产出一次完整结果
+    hits = list(run_sweep(key, cn, "income", amounts))
+    assert len(hits) == 1 and hits[0] is cached_sweep(key)
+
+
+def test_amounts_are_part_of_the_key():
+    a, b = sweep_amounts(90000, 1, 5, 100), sweep_amounts(180000, 1, 5, 100)
+    assert sweep_key("CN", "income", a, "v1") != sweep_key("CN", "income", b, "v1")
+    assert sweep_key("CN", "income", a, "v1") == sweep_key("CN", "income", sweep_amounts(90000, 1, 5, 100), "v1")
+
+
+def test_interleaved_sessions_keep_their_own_sweep(monkeypatch):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.setattr(what_if, "SWEEP_CACHE", LRUCache(SWEEP_CACHE_SIZE))
+    first = testing.AppTest.from_file(APP_FILE, default_timeout=60).run()
+    second = testing.AppTest.from_file(APP_FILE, default_timeout=60).run()
+    assert not first.exception and not second.exception
+
+    # 两个会话的国家与推演区间相同，收入不同
+    second.number_input[0].set_value(first.number_input[0].value * 3)
+    second.button[0].click().run()
+    first.button[1].click().run()
+    second.button[1].click().run()
+    first_chart, second_chart = _sweep_charts(first), _sweep_charts(second)
+    assert len(first_chart) == 1 and len(second_chart) == 1 and first_chart != second_chart
+
+    # 其他会话推演之后，普通重跑仍画出本会话的结果
+    first.run()
+    second.run()
+    assert _sweep_charts(first) == first_chart
+    assert _sweep_charts(second) == second_chart
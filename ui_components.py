@@ -0,0 +1,299 @@
+"""
+页面组件：多语言文案、底部导航、人群矩阵和指标卡片的渲染函数
+"""
+import inspect
+
+import streamlit as st
+
+from density_chart import render_density
+from history_chart import rank_history_svg
+from html_templates import compile_language_templates
+from what_if import MAX_SWEEP_POINTS, cached_sweep, percentile_batch, run_sweep, sweep_amounts, sweep_key, sweep_svg
+from wealth_matrix import MATRIX_RENDERER, RENDERER_SVG, get_high_cells, render_matrix
+from wealth_model import PERCENTILE_CEIL, format_compact_localized
+
+# ProgressColumn 的 color 参数 Streamlit 1.51 起才有，更早的版本使用默认颜色
+_PROGRESS_COLUMN_COLOR = "color" in inspect.signature(st.column_config.ProgressColumn).parameters
+# st.image 的 width="stretch" Streamlit 1.49 起才有（之后 use_container_width 已弃用），更早的版本仍用 use_container_width
+_IMAGE_STRETCH = ({"width": "stretch"} if inspect.signature(st.image).parameters["width"].default == "content"
+                  else {"use_container_width": True})
+
+
+# -------------------------- 1. 文案 --------------------------
+TRANSLATIONS = {
+    "English": {
+        "title": "Wealth Pyramid", "subtitle": "Where do you stand globally?", 
+        "section_input": "Your Profile", "section_result": "Analysis Result",
+        "location": "Location", "income": "Annual Income", "wealth": "Net Worth", 
+        "btn_calc": "Update Analysis", "card_income": "Income Level", "card_wealth": "Wealth Status", 
+        "rank_prefix": "Top", "rank_approx": "Rank #", 
+        "disclaimer": "Estimations based on Log-Normal Distribution Model", 
+        "nav_1": "Wealth Rank",  # 简化文字适配显示
+        "nav_2": "Global Real Estate",  
+        "nav_3": "Urban Housing",  
+        "nav_4": "Global Legal",  
+        "nav_5": "Global Enterprises",  
+        "nav_6": "Contract Review",  
+        "nav_7": "German Tax",  
+        "nav_8": "Shenzhen Property",
+        "matrix_legend_high": "Top {:.1f}% (You)",
+        "matrix_legend_low": "Remaining Population",
+        "global_rank": "Global Rank",
+        "card_joint": "Income & Wealth",
+        "joint_note": "Ahead of you on both income and wealth",
+        "threshold_title": "How much do I need to reach the top?",
+        "threshold_rank": "Target",
+        "threshold_note": "Above the top 1% this table uses a Pareto tail, which is heavier than the log-normal model behind the result cards, so entering these thresholds ranks you higher there. Result cards show ranks up to the top 0.01%; rows marked * are finer than that",
+        "year": "Data Year",
+        "year_latest": "Latest",
+        "history_title": "Your rank over the years",
+        "history_median": "Median (today's prices)",
+        "compare_title": "Where would the same income and wealth rank in other countries?",
+        "compare_note": "Converted at current exchange rates; click a column header to sort",
+        "compare_country": "Country", "compare_currency": "Currency",
+        "compare_income": "Income", "compare_wealth": "Wealth",
+        "compare_local": "{} (local)", "compare_percentile": "{} percentile", "compare_rank": "{} rank",
+        "what_if_title": "What if my income or wealth changed?",
+        "what_if_metric": "Amount to change",
+        "what_if_range": "Range (multiple of your current amount)",
+        "what_if_steps": "Points",
+        "what_if_run": "Run",
+        "what_if_note": "Dashed line: your current amount. Points are spaced evenly on a log scale"
+    },
+    "中文": {
+        "title": "全球财富金字塔", "subtitle": "你的财富在全球处于什么段位？", 
+        "section_input": "基本信息", "section_result": "分析报告",
+        "location": "居住国家", "income": "税前年收入", "wealth": "家庭净资产", 
+        "btn_calc": "重新计算", "card_income": "年收入水平", "card_wealth": "资产水平", 
+        "rank_prefix": "前", "rank_approx": "绝对排名 第", 
+        "disclaimer": "基于对数正态分布模型估算", 
+        "nav_1": "财富排行", 
+        "nav_2": "世界房产", 
+        "nav_3": "城市房价", 
+        "nav_4": "全球法律", 
+        "nav_5": "全球企业", 
+        "nav_6": "合同审查", 
+        "nav_7": "德国财税", 
+        "nav_8": "深圳房市",
+        "matrix_legend_high": "前 {:.1f}% (你)",
+        "matrix_legend_low": "其他人群",
+        "global_rank": "全球排名",
+        "card_joint": "收入与资产综合",
+        "joint_note": "收入和资产都高于你的人群",
+        "threshold_title": "进入前 x% 需要多少？",
+        "threshold_rank": "目标排名",
+        "threshold_note": "前 1% 以上本表按 Pareto 尾部估算，比结果卡片使用的对数正态模型更厚，输入这些门槛时卡片显示的排名更靠前；卡片的排名最高显示到前 0.01%，标 * 的行比这更靠前",
+        "year": "数据年份",
+        "year_latest": "最新",
+        "history_title": "历年排名变化",
+        "history_median": "中位数（按最新价格）",
+        "compare_title": "同样的收入和资产，在其他国家排第几？",
+        "compare_note": "按当前汇率换算为各国货币；点击表头可排序",
+        "compare_country": "国家", "compare_currency": "货币",
+        "compare_income": "收入", "compare_wealth": "资产",
+        "compare_local": "{}（当地货币）", "compare_percentile": "{}百分位", "compare_rank": "{}排名",
+        "what_if_title": "如果收入或资产变化，排名会怎样？",
+        "what_if_metric": "变化的金额",
+        "what_if_range": "变化范围（当前金额的倍数）",
+        "what_if_steps": "点数",
+        "what_if_run": "开始推演",
+        "what_if_note": "虚线为当前金额；各点按对数等距分布"
+    }
+}
+
+# 各语言的 HTML 模板在导入时生成一次，重跑时只填入动态数值
+TEMPLATES = {lang: compile_language_templates(text) for lang, text in TRANSLATIONS.items()}
+
+# 收入/资产/综合卡片的配色：(主色, 对比色)；共享数据构建时按这些配色预渲染矩阵
+INCOME_COLORS = ("#3b82f6", "#93c5fd")
+WEALTH_COLORS = ("#6366f1", "#a5b4fc")
+JOINT_COLORS = ("#0ea5e9", "#7dd3fc")
+CARD_COLOR_PAIRS = (INCOME_COLORS, WEALTH_COLORS, JOINT_COLORS)
+
+
+# -------------------------- 2. 页面组件 --------------------------
+def render_bottom_nav(lang_key):
+    st.markdown(TEMPLATES[lang_key]["nav"], unsafe_allow_html=True)
+
+def render_header(lang_key):
+    st.markdown(TEMPLATES[lang_key]["header"], unsafe_allow_html=True)
+
+def render_section_title(lang_key, section):
+    """section 为 section_input 或 section_result"""
+    st.markdown(TEMPLATES[lang_key][section], unsafe_allow_html=True)
+
+def card_header_html(lang_key, metric, color):
+    """指标卡片的标题栏（未闭合的 metric-card 容器，由调用方在卡片内容后闭合）"""
+    return TEMPLATES[lang_key]["card_header"][metric].format(color=color)
+
+def render_footer(lang_key, visit_text):
+    st.markdown(TEMPLATES[lang_key]["footer"].format(visit_text=visit_text), unsafe_allow_html=True)
+
+def render_wealth_matrix(percentile, color_high, color_low, lang_key):
+    """
+    渲染双色人群矩阵图
+    :param percentile: 用户的百分位（0-1）
+    :param color_high: 高段位颜色（用户所在区间）
+    :param color_low: 低段位颜色（其他人群）
+    :param lang_key: 语言标识
+    """
+    top_percent = (1 - percentile) * 100
+    high_cells = get_high_cells(percentile)
+
+    # 图片只取决于 (high_cells, 两种颜色)，命中缓存时无需重新绘制
+    image = render_matrix(MATRIX_RENDERER, high_cells, color_high, color_low)
+    if MATRIX_RENDERER == RENDERER_SVG:
+        st.markdown(image, unsafe_allow_html=True)
+    else:
+        st.image(image, **_IMAGE_STRETCH)
+    
+    # 显示图例
+    legend_html = TEMPLATES[lang_key]["legend"].format(color_high=color_high, color_low=color_low, top_percent=top_percent)
+    st.markdown(legend_html, unsafe_allow_html=True)
+
+def render_joint_card(t, percentile, rank, color_high, color_low, lang_key):
+    """联合排名卡片：收入和资产都高于用户的人群占比，没有金额与全球排名"""
+    render_wealth_matrix(percentile, color_high, color_low, lang_key)
+    html = TEMPLATES[lang_key]["joint_card"].format(
+        color_high=color_high,
+        top_percent=(1 - percentile) * 100,
+        width=percentile * 100,
+        rank=format_compact_localized(rank, lang_key),
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+def render_density_chart(country_code, country, metric, value, color_high, color_low, lang_key, data_version, table=None):
+    """对数坐标的分布密度曲线：背景按国家/指标/语言缓存，每次只叠加用户标记与前 X% 阴影"""
+    image = render_density(MATRIX_RENDERER, country_code, country, metric, value, color_high, color_low, lang_key, data_version, table)
+    if MATRIX_RENDERER == RENDERER_SVG:
+        st.markdown(image, unsafe_allow_html=True)
+    else:
+        st.image(image, **_IMAGE_STRETCH)
+
+def render_threshold_table(thresholds, currency, lang_key):
+    """
+    反向查询的门槛表，整张表只发送一个 HTML 元素
+    :param thresholds: {"top_shares": [...], "income": [...], "wealth": [...]}
+    """
+    row = TEMPLATES[lang_key]["threshold_row"]
+    # 比 PERCENTILE_CEIL 更靠前的目标排名在结果卡片中会被截断，标 * 区分
+    rows = "".join(
+        row.format(top=f"{share * 100:g}%" + ("*" if share < 1 - PERCENTILE_CEIL else ""), currency=currency,
+                   income=format_compact_localized(income, lang_key), wealth=format_compact_localized(wealth, lang_key))
+        for share, income, wealth in zip(thresholds["top_shares"], thresholds["income"], thresholds["wealth"])
+    )
+    st.markdown(TEMPLATES[lang_key]["threshold_table"].format(rows=rows), unsafe_allow_html=True)
+    st.caption(TRANSLATIONS[lang_key]["threshold_note"])
+
+def render_rank_history(history, currency, lang_key):
+    """
+    历年排名小图：收入与资产两条线，下方各一行列出首末年份的排名与中位数
+    :param history: history_chart.rank_over_time 的结果
+    """
+    metrics = (("income", INCOME_COLORS[0]), ("wealth", WEALTH_COLORS[0]))
+    row = TEMPLATES[lang_key]["history_row"]
+    text = TRANSLATIONS[lang_key]
+    rows = "".join(
+        row.format(
+            color=color, label=text[metric], currency=currency,
+            first_top=f"{(1 - history[metric][0]) * 100:.1f}%", last_top=f"{(1 - history[metric][-1]) * 100:.1f}%",
+            first_median=format_compact_localized(history[f"median_{metric}"][0], lang_key),
+            last_median=format_compact_localized(history[f"median_{metric}"][-1], lang_key),
+        )
+        for metric, color in metrics
+    )
+    svg = rank_history_svg(history["years"], [(history[metric], color) for metric, color in metrics])
+    st.markdown(svg + rows, unsafe_allow_html=True)
+
+def render_metric_card(t, amount, currency, percentile, rank, global_percentile, global_rank, color_high, color_low, lang_key):
+    # 渲染人群矩阵
+    render_wealth_matrix(percentile, color_high, color_low, lang_key)
+
+    # 渲染数值信息
+    html = TEMPLATES[lang_key]["metric_card"].format(
+        currency=currency,
+        amount=format_compact_localized(amount, lang_key),
+        color_high=color_high,
+        top_percent=(1 - percentile) * 100,
+        width=percentile * 100,
+        rank=format_compact_localized(rank, lang_key),
+        global_top_percent=(1 - global_percentile) * 100,
+        global_rank=format_compact_localized(global_rank, lang_key),
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+def render_country_comparison(comparison, result, countries, lang_key):
+    """
+    跨国比较表：st.dataframe 自带按列排序，百分位列显示为进度条
+    数据以 pyarrow 表传入，Streamlit 直接序列化，不经过 pandas
+    :param comparison: country_compare.CountryComparison
+    :param result: comparison.compare 的结果
+    """
+    import pyarrow as pa
+
+    text = TRANSLATIONS[lang_key]
+    name_field = "name_zh" if lang_key == "中文" else "name_en"
+    columns = {
+        "country": [countries[code][name_field] for code in comparison.codes],
+        "currency": [countries[code]["currency"] for code in comparison.codes],
+    }
+    column_config = {
+        "country": st.column_config.TextColumn(text["compare_country"], pinned=True),
+        "currency": st.column_config.TextColumn(text["compare_currency"], width="small"),
+    }
+    for metric, color in (("income", INCOME_COLORS[0]), ("wealth", WEALTH_COLORS[0])):
+        label = text[f"compare_{metric}"]
+        columns[f"{metric}_local"] = result[f"{metric}_local"]
+        columns[f"{metric}_percentile"] = result[f"{metric}_percentile"] * 100
+        columns[f"{metric}_rank"] = result[f"{metric}_rank"]
+        column_config[f"{metric}_local"] = st.column_config.NumberColumn(text["compare_local"].format(label), format="compact")
+        column_config[f"{metric}_percentile"] = st.column_config.ProgressColumn(
+            text["compare_percentile"].format(label), format="%.1f%%", min_value=0, max_value=100,
+            **({"color": color} if _PROGRESS_COLUMN_COLOR else {}))
+        column_config[f"{metric}_rank"] = st.column_config.NumberColumn(text["compare_rank"].format(label), format="localized")
+    st.dataframe(pa.table(columns), hide_index=True, column_config=column_config)
+    st.caption(text["compare_note"])
+
+def render_what_if(country_code, country, amounts, data_version, lang_key, tables=None):
+    """
+    收入/资产推演：只在提交表单的那次运行中逐块计算，每块完成就重画同一个占位图，第一批点立即出现；
+    其他重跑只画出缓存中的结果（没有则不显示），不会因为修改收入/资产、切换年份而重新推演
+    :param amounts: {"income": 金额, "wealth": 金额}，为当前输入的本币金额
+    :param tables: 当前数据版本的分位数表，按 (国家, 指标) 查找
+    """
+    text = TRANSLATIONS[lang_key]
+    # 放在表单中：拖动滑块、修改点数时不触发重跑，点击按钮后才开始计算
+    with st.form("what_if_form", border=False):
+        c1, c2, c3 = st.columns([1, 2, 1])
+        with c1:
+            metric = st.radio(text["what_if_metric"], ("income", "wealth"), horizontal=True,
+                              format_func=lambda m: text[f"compare_{m}"])
+        with c2:
+            low, high = st.slider(text["what_if_range"], 0.1, 10.0, (1.0, 5.0), step=0.1, format="%.1fx")
+        with c3:
+            steps = st.number_input(text["what_if_steps"], min_value=10, max_value=MAX_SWEEP_POINTS, value=1000, step=100)
+        submitted = st.form_submit_button(text["what_if_run"])
+    if low >= high:
+        return
+
+    table = (tables or {}).get((country_code, metric))
+    current = max(float(amounts[metric]), 1.0)
+    sweep = sweep_amounts(current, low, high, steps)
+    key = sweep_key(country_code, metric, sweep, data_version)
+    if submitted:
+        chunks = run_sweep(key, country, metric, sweep, table)
+    else:
+        cached = cached_sweep(key)
+        if cached is None:
+            return
+        chunks = (cached,)
+
+    color = (INCOME_COLORS if metric == "income" else WEALTH_COLORS)[0]
+    # 曲线单调，纵轴范围由两个端点决定，逐块刷新时坐标轴保持不动
+    share_range = tuple(1 - percentile_batch(country, metric, sweep[[-1, 0]], table))
+    placeholder = st.empty()
+    for done_amounts, percentiles in chunks:
+        placeholder.markdown(
+            sweep_svg(done_amounts, percentiles, share_range, color, country["currency"], lang_key, marker=current),
+            unsafe_allow_html=True)
+    st.caption(text["what_if_note"])
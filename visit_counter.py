@@ -0,0 +1,209 @@
+import atexit
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# 访问统计存储位置与刷盘策略
+VISIT_DB_FILE = os.environ.get("WEALTHRANK_VISIT_DB", "visit_stats.sqlite3")
+FLUSH_INTERVAL_SECONDS = 5.0
+# 旧版 JSON 计数文件，仅在首次建库时用于导入当天计数
+LEGACY_COUNTER_FILE = "visit_stats.json"
+
+# 维度 "total" 记录总访问量，其余维度（country / lang）记录细分统计
+TOTAL_DIMENSION = "total"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS visit_counts (
+    day       TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    count     INTEGER NOT NULL,
+    PRIMARY KEY (day, dimension, key)
+)
+"""
+
+# 以增量方式累加，多个进程同时写入也不会丢失计数
+_UPSERT = """
+INSERT INTO visit_counts (day, dimension, key, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (day, dimension, key) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def _today():
+    return datetime.date.today().isoformat()
+
+
+class VisitCounter:
+    """
+    进程内访问计数器：计数只在内存中累加，由后台线程定期批量写入 SQLite (WAL)
+    每天一行，不会覆盖历史数据；读取当日总数直接返回内存值，不访问磁盘
+    """
+
+    def __init__(self, db_path=VISIT_DB_FILE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()      # (day, dimension, key) -> 尚未落盘的增量
+        self._persisted_totals = {}    # day -> 上次刷盘时数据库中的总数（含其他进程）
+        self._inflight = Counter()     # 正在写入中的增量，写完之前仍计入当日总数
+        self._stop = threading.Event()
+        self._conn = None
+        try:
+            self._conn = self._connect()
+        except sqlite3.Error as e:
+            # 数据库不可用（目录只读、文件损坏或被锁）时照常计数，刷盘时再重试连接
+            logger.error("访问统计数据库 %s 不可用，计数暂存内存: %s", db_path, e)
+        self._thread = threading.Thread(target=self._flush_loop, name="visit-counter-flush", daemon=True)
+        self._thread.start()
+
+    # ---------- 存储 ----------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            is_new = conn.execute("SELECT name FROM sqlite_master WHERE name = 'visit_counts'").fetchone() is None
+            conn.execute(_SCHEMA)
+            if is_new:
+                self._import_legacy_file(conn)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _connection(self):
+        """数据库连接，启动时连接失败的在此重试；失败时抛出 sqlite3.Error（调用方持 _flush_lock）"""
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _import_legacy_file(self, conn):
+        if not os.path.exists(LEGACY_COUNTER_FILE):
+            return
+        try:
+            with open(LEGACY_COUNTER_FILE, "r") as f:
+                legacy = json.load(f)
+            conn.execute(_UPSERT, (str(legacy["date"]), TOTAL_DIMENSION, "", int(legacy["count"])))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("忽略无法解析的旧计数文件 %s: %s", LEGACY_COUNTER_FILE, e)
+
+    def _read_total(self, day):
+        row = self._connection().execute(
+            "SELECT count FROM visit_counts WHERE day = ? AND dimension = ? AND key = ''",
+            (day, TOTAL_DIMENSION),
+        ).fetchone()
+        return row[0] if row else 0
+
+    # ---------- 计数 ----------
+    def record(self, dimensions=None, new_visit=True):
+        """
+        记录一次访问（纯内存操作）
+        :param dimensions: 细分维度，如 {"country": "CN", "lang": "中文"}
+        :param new_visit: 是否计入当日总访问量
+        """
+        day = _today()
+        with self._lock:
+            if new_visit:
+                self._pending[(day, TOTAL_DIMENSION, "")] += 1
+            for dimension, key in (dimensions or {}).items():
+                self._pending[(day, dimension, str(key))] += 1
+
+    def today_total(self):
+        """当日总访问量 = 上次刷盘时的库内总数 + 本进程尚未落盘的增量"""
+        day = _today()
+        with self._lock:
+            persisted = self._persisted_totals.get(day)
+            pending = self._pending[(day, TOTAL_DIMENSION, "")] + self._inflight[(day, TOTAL_DIMENSION, "")]
+        if persisted is None:
+            # 每个进程每天只会从磁盘读取一次；读取失败时只显示本进程的计数，下次刷盘后更正
+            with self._flush_lock:
+                try:
+                    persisted = self._read_total(day)
+                except sqlite3.Error as e:
+                    logger.warning("读取当日访问总数失败，暂时只计本进程: %s", e)
+                    persisted = 0
+            with self._lock:
+                self._persisted_totals.setdefault(day, persisted)
+        return persisted + pending
+
+    def flush(self):
+        """把内存中的增量在一个事务内原子写入，并刷新当日总数"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+                self._inflight = batch
+            day = _today()
+            try:
+                if batch:
+                    conn = self._connection()
+                    with conn:
+                        conn.execute("BEGIN IMMEDIATE")
+                        conn.executemany(_UPSERT, [(d, dim, key, n) for (d, dim, key), n in batch.items()])
+            except sqlite3.Error as e:
+                # 写入失败（事务已回滚）时把增量放回内存，下次再试，避免丢失计数
+                logger.warning("访问计数写入失败，稍后重试: %s", e)
+                with self._lock:
+                    self._pending.update(batch)
+                    self._inflight = Counter()
+                return False
+            # 增量已提交，之后读取总数失败也不能再放回内存，否则下次会重复计数
+            try:
+                total = self._read_total(day)
+            except sqlite3.Error as e:
+                logger.warning("读取当日访问总数失败，沿用内存中的值: %s", e)
+                with self._lock:
+                    persisted = self._persisted_totals.get(day)
+                    if persisted is not None:
+                        self._persisted_totals = {day: persisted + batch[(day, TOTAL_DIMENSION, "")]}
+                    self._inflight = Counter()
+                return True
+            with self._lock:
+                self._persisted_totals = {day: total}
+                self._inflight = Counter()
+            return True
+
+    def stats(self, day=None):
+        """读取某天（默认今天）各维度的已落盘计数，用于分析"""
+        day = day or _today()
+        with self._flush_lock:
+            rows = self._connection().execute(
+                "SELECT dimension, key, count FROM visit_counts WHERE day = ? ORDER BY dimension, count DESC",
+                (day,),
+            ).fetchall()
+        result = {}
+        for dimension, key, count in rows:
+            result.setdefault(dimension, {})[key] = count
+        return result
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._flush_lock:
+            if self._conn is not None:
+                self._conn.close()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+# -------------------------- 进程级单例 --------------------------
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_visit_counter():
+    """返回进程内共享的计数器；Streamlit 每次重跑脚本都会复用同一个实例"""
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = VisitCounter()
+            atexit.register(_counter.close)
+        return _counter
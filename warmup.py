@@ -0,0 +1,125 @@
+"""
+启动预热：服务开始接受连接之前填满进程级缓存，容器重启后的第一个访客不再承担冷启动开销
+
+各模块的缓存都是进程级的（模块全局变量、LRU），Streamlit 每次运行脚本时导入的是同一批模块，
+因此在同一进程内、启动服务之前调用 warm_up 即可，由 serve.py 负责：
+
+- 数据快照、分位数表、历史数据与共享查找表的挂载
+- 全球 CDF 网格与各国相关系数对应的二元正态网格（冷启动中最慢的计算）
+- 每个国家 × 语言的密度曲线背景，以及默认输入（中位数 × 1.5）对应的标记
+- 人群矩阵：svg 全部 200 种状态；matplotlib 只画默认输入对应的状态（同时完成 matplotlib 导入与字体缓存），
+  其余状态交给后台预热线程
+- 以 AppTest 按每种语言完整运行一次页面脚本：Streamlit 自身在首次运行时才做的工作
+  （emoji 表导入与正则编译、脚本编译等，约占冷启动首屏的一半）以及页面用到的其余模块都在这里完成；
+  运行期间权限表换成内存库，预热的令牌不会写入真实的权限记录
+"""
+import os
+import time
+
+from country_dataset import get_dataset_store
+from density_chart import BACKGROUND_CACHE_SIZE, render_density
+from entitlements import EntitlementStore, load_code_hashes, set_entitlement_store
+from global_rank import dataset_version, get_global_cdf
+from history_store import get_history_store
+from joint_rank import country_correlation, get_bivariate_grid, get_joint_rank
+from quantile_tables import get_quantile_tables
+from shared_store import get_shared_store
+from ui_components import CARD_COLOR_PAIRS, INCOME_COLORS, JOINT_COLORS, TRANSLATIONS, WEALTH_COLORS
+from wealth_matrix import (
+    MATRIX_RENDERER, RENDERER_SVG, get_high_cells, prewarm_matrix_cache, render_matrix, start_matrix_prewarm,
+)
+from wealth_model import METRIC_FIELDS, get_country_percentile
+
+# 与输入区的默认值一致：收入/资产默认填该国中位数的 1.5 倍
+DEFAULT_AMOUNT_FACTOR = 1.5
+METRIC_COLORS = {"income": INCOME_COLORS, "wealth": WEALTH_COLORS}
+
+
+def default_amounts(country):
+    """输入区的默认金额 {"income": ..., "wealth": ...}"""
+    return {metric: int(country[fields[0]] * DEFAULT_AMOUNT_FACTOR) for metric, fields in METRIC_FIELDS.items()}
+
+
+def run_app_script(app_file, languages, countries):
+    """用 AppTest 按每种语言运行一次页面；预先标记为已计数，预热不计入访问统计，权限查询使用内存库"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(app_file), default_timeout=60)
+    at.session_state["has_counted"] = True
+    at.session_state["counted_dimensions"] = {("country", code) for code in countries} | {("lang", lang) for lang in languages}
+    previous = set_entitlement_store(EntitlementStore(load_code_hashes(), db_path=":memory:"))
+    try:
+        at.run()
+        for lang in languages:
+            at.selectbox[0].set_value(lang).run()
+    finally:
+        set_entitlement_store(previous).close()
+    if at.exception:
+        raise RuntimeError(f"预热运行页面脚本失败: {at.exception[0].message}")
+
+
+def warm_up(renderer=MATRIX_RENDERER, languages=None, app_file=None):
+    """
+    同步预热全部进程级缓存
+    :param renderer: 矩阵与密度曲线的渲染后端，与服务进程一致
+    :param languages: 预渲染的语言，默认全部
+    :param app_file: 页面脚本路径；给出时最后完整运行一次页面
+    :return: [(阶段, 耗时秒), ...]
+    """
+    stages = []
+    last = time.perf_counter()
+
+    def lap(name):
+        nonlocal last
+        now = time.perf_counter()
+        stages.append((name, now - last))
+        last = now
+
+    dataset = get_dataset_store().current()
+    countries = dataset.records
+    tables = get_quantile_tables()
+    get_history_store()
+    get_shared_store()
+    lap("dataset")
+
+    # 与页面的计算方式相同，缓存键才能命中
+    data_version = dataset_version(countries, tables, base_version=dataset.version)
+    get_global_cdf(countries, tables, data_version)
+    lap("global_cdf")
+
+    for country in countries.values():
+        get_bivariate_grid(country_correlation(country))
+    lap("joint_grids")
+
+    # 背景缓存放不下时只预热排在前面的国家（下拉框顺序，第一个是默认选项）
+    languages = list(languages or TRANSLATIONS)
+    per_country = len(languages) * len(METRIC_COLORS)
+    default_cells = set()
+    for code in list(countries)[:max(BACKGROUND_CACHE_SIZE // per_country, 1)]:
+        country = countries[code]
+        amounts = default_amounts(country)
+        percentiles = {}
+        for metric, (color_high, color_low) in METRIC_COLORS.items():
+            table = tables.get((code, metric))
+            percentiles[metric] = get_country_percentile(country, metric, amounts[metric], table)
+            default_cells.add((get_high_cells(percentiles[metric]), color_high, color_low))
+            for lang in languages:
+                render_density(renderer, code, country, metric, amounts[metric], color_high, color_low, lang, data_version, table)
+        joint_percentile, _ = get_joint_rank(country, percentiles["income"], percentiles["wealth"])
+        default_cells.add((get_high_cells(joint_percentile), *JOINT_COLORS))
+    lap("density")
+
+    if renderer == RENDERER_SVG:
+        prewarm_matrix_cache(CARD_COLOR_PAIRS, renderer)
+    else:
+        for high_cells, color_high, color_low in sorted(default_cells):
+            render_matrix(renderer, high_cells, color_high, color_low)
+    lap("matrix")
+
+    if app_file:
+        run_app_script(app_file, languages, countries)
+        lap("script")
+    # PNG 矩阵全部画完要几十秒，其余状态在后台补齐；放在最后，不与上面的预热争抢 GIL
+    if renderer != RENDERER_SVG:
+        start_matrix_prewarm(CARD_COLOR_PAIRS, renderer)
+    return stages
@@ -0,0 +1,238 @@
+import importlib.util
+import io
+import os
+import threading
+
+import numpy as np
+
+from lru_cache import LRUCache
+from shared_store import get_shared_store
+
+# -------------------------- 1. 矩阵参数 --------------------------
+# 矩阵大小（20x10的网格，共200个单元格）
+MATRIX_ROWS = 10
+MATRIX_COLS = 20
+TOTAL_CELLS = MATRIX_ROWS * MATRIX_COLS
+
+# 编码后图片缓存的最大条目数：200 种状态 x 3 组配色（收入、资产、综合），留有余量
+MATRIX_CACHE_SIZE = 768
+
+# 可选的渲染后端：svg 为纯文本内联 SVG（不依赖 matplotlib），matplotlib 为原先的 PNG 渲染
+RENDERER_SVG = "svg"
+RENDERER_MATPLOTLIB = "matplotlib"
+
+# 与 st.pyplot 默认的 savefig 参数保持一致，保证缓存图片与原先显示效果相同
+PNG_SAVEFIG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight", "transparent": True}
+
+
+def get_high_cells(percentile):
+    """由百分位计算高段位单元格数量（1..200）"""
+    high_cells = int(round(TOTAL_CELLS * (1 - percentile)))
+    return max(1, min(high_cells, TOTAL_CELLS))  # 确保至少1个单元格
+
+
+def build_matrix(high_cells):
+    """按行依次填充高段位单元格，再反转矩阵，让高段位显示在右上角"""
+    matrix = (np.arange(TOTAL_CELLS) < high_cells).astype(int).reshape(MATRIX_ROWS, MATRIX_COLS)
+    return matrix[::-1, ::-1]
+
+
+def resolve_matrix_renderer(name):
+    """校验渲染后端设置；选择 matplotlib 但未安装时回退到 svg"""
+    name = (name or RENDERER_SVG).strip().lower()
+    if name not in (RENDERER_SVG, RENDERER_MATPLOTLIB):
+        raise ValueError(f"未知的矩阵渲染后端: {name!r}（可选 svg / matplotlib）")
+    if name == RENDERER_MATPLOTLIB and importlib.util.find_spec("matplotlib") is None:
+        return RENDERER_SVG
+    return name
+
+
+# 人群矩阵渲染后端：svg（默认，无需 matplotlib）或 matplotlib（PNG，原实现）
+MATRIX_RENDERER = resolve_matrix_renderer(os.environ.get("WEALTHRANK_MATRIX_RENDERER", RENDERER_SVG))
+
+
+# -------------------------- 2. 图片缓存 --------------------------
+MATRIX_IMAGE_CACHE = LRUCache(MATRIX_CACHE_SIZE)
+
+
+# -------------------------- 3. matplotlib 渲染 --------------------------
+def _draw_matrix_png(high_cells, color_high, color_low):
+    # 使用面向对象的 Figure 接口而不经过 pyplot，不依赖全局状态，可在后台线程中安全渲染
+    from matplotlib.figure import Figure
+    import matplotlib.patches as patches
+
+    matrix = build_matrix(high_cells)
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    fig.patch.set_alpha(0)
+    ax.patch.set_alpha(0)
+
+    # 绘制矩阵单元格
+    cell_width = 1 / MATRIX_COLS
+    cell_height = 1 / MATRIX_ROWS
+
+    for i in range(MATRIX_ROWS):
+        for j in range(MATRIX_COLS):
+            # 选择单元格颜色
+            if matrix[i, j] == 1:
+                cell_color = color_high
+                alpha = 0.8
+            else:
+                cell_color = color_low
+                alpha = 0.2
+
+            rect = patches.Rectangle(
+                (j * cell_width, i * cell_height), cell_width, cell_height,
+                linewidth=0.5, edgecolor='#f1f5f9',
+                facecolor=cell_color, alpha=alpha
+            )
+            ax.add_patch(rect)
+
+    # 添加用户位置标记（在第一个高段位单元格中心）
+    high_pos = np.argwhere(matrix == 1)[0]
+    marker_x = (high_pos[1] + 0.5) * cell_width
+    marker_y = (high_pos[0] + 0.5) * cell_height
+
+    ax.scatter(
+        marker_x, marker_y,
+        color=color_high, s=100,
+        edgecolor='white', linewidth=2,
+        zorder=10, alpha=1
+    )
+    ax.text(
+        marker_x, marker_y, '●',
+        ha='center', va='center',
+        color='white', fontsize=8,
+        zorder=11
+    )
+
+    # 图表样式设置
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis('off')
+    fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, **PNG_SAVEFIG_OPTIONS)
+    return buf.getvalue()
+
+
+def render_matrix_png(high_cells, color_high, color_low):
+    """
+    返回人群矩阵的 PNG 字节，按 (后端, high_cells, color_high, color_low) 缓存
+    图例是单独的 HTML，不在图片内，因此不参与缓存键
+    """
+    key = (RENDERER_MATPLOTLIB, high_cells, color_high, color_low)
+    return MATRIX_IMAGE_CACHE.get_or_create(key, lambda: _draw_matrix_png(high_cells, color_high, color_low))
+
+
+# -------------------------- 4. SVG 渲染 --------------------------
+# SVG 坐标系：每个单元格 10x10，整体 200x100，与 matplotlib 图 8x4 英寸的宽高比一致
+SVG_CELL = 10
+# matplotlib 中 1pt 对应的 SVG 单位（图宽 8 英寸 = 576pt）
+_PT = MATRIX_COLS * SVG_CELL / 576
+
+
+def _region_path(matrix, value):
+    """值为 value 的单元格按行合并为矩形，每行每段连续单元格只需一条子路径"""
+    parts = []
+    for i in range(MATRIX_ROWS):
+        # matplotlib 中第 i 行自下而上，SVG 的 y 轴向下，因此需要翻转行号
+        y = (MATRIX_ROWS - 1 - i) * SVG_CELL
+        j = 0
+        while j < MATRIX_COLS:
+            if matrix[i, j] != value:
+                j += 1
+                continue
+            start = j
+            while j < MATRIX_COLS and matrix[i, j] == value:
+                j += 1
+            w = (j - start) * SVG_CELL
+            parts.append(f"M{start * SVG_CELL} {y}h{w}v{SVG_CELL}h-{w}z")
+    return "".join(parts)
+
+
+def _cell_pattern(pattern_id, color, opacity, stroke):
+    # 单元格图案：填充与描边放在 10x10 的图块中平铺，合并后的矩形仍显示出每个单元格的边框
+    return (
+        f'<pattern id="{pattern_id}" width="{SVG_CELL}" height="{SVG_CELL}" patternUnits="userSpaceOnUse">'
+        f'<path fill="{color}" fill-opacity="{opacity}" stroke-opacity="{opacity}" {stroke} '
+        f'd="M0 0h{SVG_CELL}v{SVG_CELL}h-{SVG_CELL}z"/></pattern>'
+    )
+
+
+def _draw_matrix_svg(high_cells, color_high, color_low):
+    matrix = build_matrix(high_cells)
+    width, height = MATRIX_COLS * SVG_CELL, MATRIX_ROWS * SVG_CELL
+
+    # 用户位置标记：与 matplotlib 版本相同，位于第一个高段位单元格中心
+    high_pos = np.argwhere(matrix == 1)[0]
+    marker_x = (high_pos[1] + 0.5) * SVG_CELL
+    marker_y = (MATRIX_ROWS - 1 - high_pos[0] + 0.5) * SVG_CELL
+
+    # 图案 id 只由颜色决定：同页两张卡片配色不同互不冲突，相同配色的定义也完全一致
+    high_id, low_id = f"wm-h-{color_high.lstrip('#')}", f"wm-l-{color_low.lstrip('#')}"
+    stroke = f'stroke="#f1f5f9" stroke-width="{0.5 * _PT:.3f}"'
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'style="width:100%;height:auto;display:block">'
+        f'<defs>{_cell_pattern(low_id, color_low, ".2", stroke)}{_cell_pattern(high_id, color_high, ".8", stroke)}</defs>'
+        f'<path fill="url(#{low_id})" d="{_region_path(matrix, 0)}"/>'
+        f'<path fill="url(#{high_id})" d="{_region_path(matrix, 1)}"/>'
+        f'<circle cx="{marker_x:g}" cy="{marker_y:g}" r="{5 * _PT:.2f}" fill="{color_high}" '
+        f'stroke="#fff" stroke-width="{2 * _PT:.2f}"/>'
+        f'<circle cx="{marker_x:g}" cy="{marker_y:g}" r="{2.4 * _PT:.2f}" fill="#fff"/>'
+        f'</svg>'
+    )
+
+
+def render_matrix_svg(high_cells, color_high, color_low):
+    """返回人群矩阵的内联 SVG 字符串，缓存方式与 PNG 版本相同"""
+    key = (RENDERER_SVG, high_cells, color_high, color_low)
+    return MATRIX_IMAGE_CACHE.get_or_create(key, lambda: _draw_matrix_svg(high_cells, color_high, color_low))
+
+
+def matrix_store_key(renderer, high_cells, color_high, color_low):
+    return f"matrix/{renderer}/{high_cells}/{color_high}/{color_low}"
+
+
+def render_matrix(renderer, high_cells, color_high, color_low):
+    """
+    按后端名称分派，返回 SVG 字符串或 PNG 字节
+    共享数据中已有预渲染图时直接读取，不进入本进程的 LRU 缓存
+    """
+    store = get_shared_store()
+    if store is not None:
+        image = store.blob(matrix_store_key(renderer, high_cells, color_high, color_low))
+        if image is not None:
+            return image.decode("utf-8") if renderer == RENDERER_SVG else image
+    if renderer == RENDERER_SVG:
+        return render_matrix_svg(high_cells, color_high, color_low)
+    return render_matrix_png(high_cells, color_high, color_low)
+
+
+# -------------------------- 5. 启动预热 --------------------------
+_prewarm_lock = threading.Lock()
+_prewarm_started = False
+
+
+def prewarm_matrix_cache(color_pairs, renderer=RENDERER_MATPLOTLIB):
+    """同步渲染每组配色下全部 200 种状态"""
+    for color_high, color_low in color_pairs:
+        for high_cells in range(1, TOTAL_CELLS + 1):
+            render_matrix(renderer, high_cells, color_high, color_low)
+
+
+def start_matrix_prewarm(color_pairs, renderer=RENDERER_MATPLOTLIB):
+    """在后台线程中预热缓存，每个进程只启动一次；返回是否为本次调用启动"""
+    global _prewarm_started
+    with _prewarm_lock:
+        if _prewarm_started:
+            return False
+        _prewarm_started = True
+    threading.Thread(
+        target=prewarm_matrix_cache, args=(list(color_pairs), renderer),
+        name="matrix-prewarm", daemon=True
+    ).start()
+    return True
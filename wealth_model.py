@@ -0,0 +1,308 @@
+import math
+import numpy as np
+
+# scipy 为可选依赖：存在时使用其原生向量化 erf / ndtr / ndtri，否则退回下方的纯 numpy 实现
+# scipy.special 导入较慢，首次向量化计算时才导入（None 表示尚未尝试，False 表示未安装）
+_scipy_special = None
+
+def _scipy():
+    global _scipy_special
+    if _scipy_special is None:
+        try:
+            from scipy import special
+            _scipy_special = special
+        except ImportError:
+            _scipy_special = False
+    return _scipy_special
+
+# -------------------------- 1. 国家基础数据 --------------------------
+# 指标 -> (中位数字段, 对数正态 sigma 字段)
+METRIC_FIELDS = {
+    "income": ("medianIncome", "incomeSigma"),
+    "wealth": ("medianWealth", "wealthSigma"),
+}
+# 指标 -> 基尼系数字段；sigma 默认由基尼系数换算，也可由 distribution_fit.py 按分位点拟合
+GINI_FIELDS = {
+    "income": "incomeGini",
+    "wealth": "wealthGini",
+}
+
+def sigma_to_gini(sigma):
+    """对数正态分布的基尼系数：G = 2Φ(σ/√2) - 1 = erf(σ/2)"""
+    return math.erf(sigma / 2)
+
+def gini_to_sigma(gini):
+    """
+    sigma_to_gini 的反函数，σ = 2·erf⁻¹(G)；多个值一次换算用 gini_to_sigma_batch
+    :param gini: 基尼系数，取值 (0, 1)
+    """
+    if not 0 < gini < 1:
+        raise ValueError(f"基尼系数必须在 (0, 1) 区间内: {gini!r}")
+    # erf 在 x > 0 上单调递增且为凹函数，从 0 出发的牛顿迭代单调收敛
+    x = 0.0
+    for _ in range(100):
+        step = (math.erf(x) - gini) * math.sqrt(math.pi) / 2 * math.exp(x * x)
+        x -= step
+        if abs(step) < 1e-15:
+            break
+    return 2 * x
+
+def with_sigma(record):
+    """补上由基尼系数换算的 sigma 字段，返回新的记录"""
+    record = dict(record)
+    for metric, (_, sigma_field) in METRIC_FIELDS.items():
+        record[sigma_field] = gini_to_sigma(record[GINI_FIELDS[metric]])
+    return record
+
+# usdRate: 每 1 美元对应的当地货币数，用于跨国换算（全球排名）
+# incomeGini / wealthGini 为收入、财富的基尼系数（各国统计局 / 瑞信全球财富报告）
+COUNTRY_DATA = {code: with_sigma(record) for code, record in {
+    "CN": {"name_en": "China", "name_zh": "中国", "currency": "¥", "population": 1411750000, "medianIncome": 60000, "medianWealth": 120000, "incomeGini": 0.47, "wealthGini": 0.70, "usdRate": 7.2},
+    "US": {"name_en": "USA", "name_zh": "美国", "currency": "$", "population": 331900000, "medianIncome": 45000, "medianWealth": 190000, "incomeGini": 0.40, "wealthGini": 0.85, "usdRate": 1.0},
+    "JP": {"name_en": "Japan", "name_zh": "日本", "currency": "¥", "population": 125100000, "medianIncome": 4000000, "medianWealth": 15000000, "incomeGini": 0.33, "wealthGini": 0.65, "usdRate": 150.0},
+}.items()}
+
+# 百分位的上下限，避免出现 0% / 100% 这类无意义的排名
+PERCENTILE_FLOOR = 0.0001
+PERCENTILE_CEIL = 0.9999
+
+# 正向查询（百分位）所用分布模型的标识，参与数据版本计算：模型变化后依赖百分位的预计算结果（全球 CDF、共享数据）随之失效
+# 门槛表在前 1% 以上另接 Pareto 尾部（见 wealth_thresholds），只用于反向查询，不影响这里的百分位
+MODEL_VERSION = "lognormal"
+
+# -------------------------- 2. 单值计算 --------------------------
+def get_log_normal_percentile(value, median, shape_parameter):
+    if value <= 1: return PERCENTILE_FLOOR
+    try:
+        mu = math.log(median)
+        sigma = shape_parameter
+        z = (math.log(value) - mu) / sigma
+        percentile = 0.5 * (1 + math.erf(z / math.sqrt(2)))
+        return min(max(percentile, PERCENTILE_FLOOR), PERCENTILE_CEIL)
+    except: return PERCENTILE_FLOOR
+
+def uses_quantile_table(country, table):
+    """按国家选择模型：country["model"] 为 "lognormal" 时强制使用对数正态，否则有分位数表就用表"""
+    return table is not None and country.get("model", "auto") != "lognormal"
+
+def get_country_percentile(country, metric, value, table=None):
+    """
+    get_log_normal_percentile 的通用入口，按国家选择对数正态或经验分位数表
+    :param country: COUNTRY_DATA 中的国家记录
+    :param metric: "income" 或 "wealth"
+    :param table: 该国家该指标的 QuantileTable（可选）
+    """
+    if uses_quantile_table(country, table):
+        return table.percentile(value)
+    median_field, shape_field = METRIC_FIELDS[metric]
+    return get_log_normal_percentile(value, country[median_field], country[shape_field])
+
+def get_absolute_rank(population, percentile):
+    """由百分位估算绝对排名（至少为第 1 名）"""
+    return max(1, math.floor(population * (1 - percentile)))
+
+def format_compact_localized(num, lang_key):
+    if lang_key == "中文":
+        if num >= 1e8: return f"{num/1e8:.2f}亿"
+        if num >= 1e4: return f"{num/1e4:.1f}万"
+        return f"{num:,.0f}"
+    else:
+        if num >= 1e9: return f"{num/1e9:.1f}B"
+        if num >= 1e6: return f"{num/1e6:.1f}M"
+        if num >= 1e4: return f"{num/1e3:.0f}k"
+        return f"{num:,.0f}"
+
+# -------------------------- 3. 向量化批量计算 --------------------------
+# 无 scipy 时的 erf / erfc：W. J. Cody (1969) 的有理逼近（SPECFUN 中 CALERF 的系数），
+# 系数按 _polyval 的顺序（最高次在前）排列。三段：
+#   a ≤ 0.46875：erf(a) = a · P(a²) / Q(a²)
+#   0.46875 < a ≤ 4：erfc(a) = exp(-a²) · P(a) / Q(a)
+#   a > 4：erfc(a) = exp(-a²) / a · (1/√π - P(1/a²) / (a² · Q(1/a²)))
+# exp(-a²) 拆成 exp(-s²)·exp(-(a-s)(a+s))（s 取 a 截断到 1/16），尾部不因 a² 的舍入失去精度；相对误差约 1e-15
+_ERF_SMALL = 0.46875
+_ERFC_ASYMPTOTIC = 4.0
+_ERF_SMALL_P = (1.85777706184603153e-1, 3.16112374387056560e+0, 1.13864154151050156e+2, 3.77485237685302021e+2, 3.20937758913846947e+3)
+_ERF_SMALL_Q = (1.0, 2.36012909523441209e+1, 2.44024637934444173e+2, 1.28261652607737228e+3, 2.84423683343917062e+3)
+_ERFC_MID_P = (2.15311535474403846e-8, 5.64188496988670089e-1, 8.88314979438837594e+0, 6.61191906371416295e+1, 2.98635138197400131e+2,
+               8.81952221241769090e+2, 1.71204761263407058e+3, 2.05107837782607147e+3, 1.23033935479799725e+3)
+_ERFC_MID_Q = (1.0, 1.57449261107098347e+1, 1.17693950891312499e+2, 5.37181101862009858e+2, 1.62138957456669019e+3,
+               3.29079923573345963e+3, 4.36261909014324716e+3, 3.43936767414372164e+3, 1.23033935480374942e+3)
+_ERFC_TAIL_P = (1.63153871373020978e-2, 3.05326634961232344e-1, 3.60344899949804439e-1, 1.25781726111229246e-1, 1.60837851487422766e-2, 6.58749161529837803e-4)
+_ERFC_TAIL_Q = (1.0, 2.56852019228982242e+0, 1.87295284992346725e+0, 5.27905102951428412e-1, 6.05183413124413191e-2, 2.33520497626869185e-3)
+# a 超过此值时 erfc 在双精度下已下溢为 0（同时让 inf 不产生 inf - inf）
+_ERFC_UNDERFLOW = 30.0
+
+def _erf_small(x):
+    y = x * x
+    return x * _polyval(_ERF_SMALL_P, y) / _polyval(_ERF_SMALL_Q, y)
+
+def _exp_neg_square(a):
+    """exp(-a²)，a² 的舍入不放大到结果中"""
+    s = np.trunc(a * 16) / 16
+    return np.exp(-s * s) * np.exp(-(a - s) * (a + s))
+
+def _erfc_nonnegative(a):
+    """erfc(a)，a 为 >= 0 的 float64 数组（inf 得到 0，NaN 得到 NaN）"""
+    a = np.asarray(a, dtype=np.float64)
+    result = np.full_like(a, np.nan)
+    with np.errstate(all="ignore"):
+        small = a <= _ERF_SMALL
+        if small.any():
+            result[small] = 1 - _erf_small(a[small])
+        mid = (a > _ERF_SMALL) & (a <= _ERFC_ASYMPTOTIC)
+        if mid.any():
+            y = a[mid]
+            result[mid] = _exp_neg_square(y) * _polyval(_ERFC_MID_P, y) / _polyval(_ERFC_MID_Q, y)
+        tail = a > _ERFC_ASYMPTOTIC
+        if tail.any():
+            y = np.minimum(a[tail], _ERFC_UNDERFLOW)
+            w = 1 / (y * y)
+            r = w * _polyval(_ERFC_TAIL_P, w) / _polyval(_ERFC_TAIL_Q, w)
+            result[tail] = _exp_neg_square(y) / y * (1 / math.sqrt(math.pi) - r)
+    return result
+
+def _erfc(x):
+    x = np.asarray(x, dtype=np.float64)
+    result = _erfc_nonnegative(np.abs(x))
+    np.subtract(2, result, out=result, where=x < 0)
+    return result
+
+def _erf(x):
+    special = _scipy()
+    if special:
+        return special.erf(x)
+    x = np.asarray(x, dtype=np.float64)
+    result = np.asarray(np.copysign(1 - _erfc_nonnegative(np.abs(x)), x))
+    small = np.abs(x) <= _ERF_SMALL
+    if small.any():
+        result[small] = _erf_small(x[small])
+    return result
+
+def gini_to_sigma_batch(gini):
+    """
+    gini_to_sigma 的向量化版本：同样从 0 出发做牛顿迭代，所有元素收敛后停止
+    :param gini: 基尼系数数组；区间 (0, 1) 以外（含 NaN）得到 NaN
+    """
+    gini = np.asarray(gini, dtype=np.float64)
+    valid = (gini > 0) & (gini < 1)
+    target = np.where(valid, gini, 0.5)
+    x = np.zeros_like(target)
+    for _ in range(100):
+        step = (_erf(x) - target) * (math.sqrt(math.pi) / 2) * np.exp(x * x)
+        x -= step
+        if np.all(np.abs(step) < 1e-15):
+            break
+    return np.where(valid, 2 * x, np.nan)
+
+def norm_cdf_batch(x):
+    """标准正态 CDF；用 erfc 计算，左尾很小的概率也不会因相消而失去精度"""
+    special = _scipy()
+    if special:
+        return special.ndtr(x)
+    return 0.5 * _erfc(-np.asarray(x, dtype=np.float64) / math.sqrt(2))
+
+# Acklam 有理逼近的系数（相对误差约 1e-9，再经一步 Halley 迭代达到双精度）
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+_PPF_LOW = 0.02425
+
+def _polyval(coeffs, x):
+    result = np.zeros_like(x)
+    for c in coeffs:
+        result = result * x + c
+    return result
+
+def norm_ppf_batch(p):
+    """
+    标准正态分布的分位函数 Φ⁻¹（向量化）
+    :param p: 概率数组，取值 (0, 1)；0 / 1 得到 ∓inf，区间外或 NaN 得到 NaN
+    """
+    p = np.asarray(p, dtype=np.float64)
+    special = _scipy()
+    if special:
+        return special.ndtri(p)
+    with np.errstate(all="ignore"):
+        tail = np.minimum(p, 1 - p)
+        q = np.sqrt(-2 * np.log(tail))
+        x_tail = _polyval(_PPF_C, q) / (_polyval(_PPF_D, q) * q + 1)
+        x_tail = np.where(p < 0.5, x_tail, -x_tail)
+        r = (p - 0.5) ** 2
+        x_mid = _polyval(_PPF_A, r) * (p - 0.5) / (_polyval(_PPF_B, r) * r + 1)
+        x = np.where(tail < _PPF_LOW, x_tail, x_mid)
+        # Halley 迭代一步
+        e = norm_cdf_batch(x) - p
+        u = e * math.sqrt(2 * math.pi) * np.exp(0.5 * x * x)
+        refined = x - u / (1 + 0.5 * x * u)
+        x = np.where(np.isfinite(refined), refined, x)
+    x = np.where(p == 0, -np.inf, np.where(p == 1, np.inf, x))
+    return np.where((p < 0) | (p > 1) | np.isnan(p), np.nan, x)
+
+def get_log_normal_percentile_batch(values, medians, shape_parameters):
+    """
+    get_log_normal_percentile 的向量化版本，结果与单值函数逐元素一致（无 scipy 时误差在 1e-15 量级）
+    :param values: 收入/资产数组
+    :param medians: 中位数（标量或与 values 同形的数组）
+    :param shape_parameters: 形状参数 sigma（标量或数组）
+    :return: float64 百分位数组；values 为 NaN 时对应结果为 NaN
+    """
+    values, medians, sigmas = np.broadcast_arrays(
+        np.asarray(values, dtype=np.float64),
+        np.asarray(medians, dtype=np.float64),
+        np.asarray(shape_parameters, dtype=np.float64),
+    )
+    with np.errstate(all="ignore"):
+        z = (np.log(values) - np.log(medians)) / sigmas
+        percentile = np.array(np.clip(0.5 * (1 + _erf(z / math.sqrt(2))), PERCENTILE_FLOOR, PERCENTILE_CEIL))
+        # 与单值函数相同的兜底规则：value <= 1，或 log/除零会抛异常的参数
+        fallback = (values <= 1) | (medians <= 0) | (sigmas == 0)
+    percentile[fallback] = PERCENTILE_FLOOR
+    return percentile
+
+def get_absolute_rank_batch(populations, percentiles):
+    """get_absolute_rank 的向量化版本，返回 float64 数组（无效输入为 NaN）"""
+    populations = np.asarray(populations, dtype=np.float64)
+    percentiles = np.asarray(percentiles, dtype=np.float64)
+    # np.maximum 会传播 NaN，无效行保持 NaN
+    return np.maximum(1.0, np.floor(populations * (1 - percentiles)))
+
+def score_batch(country_codes, incomes, wealths, country_data=COUNTRY_DATA, quantile_tables=None):
+    """
+    批量计算收入/资产的百分位和绝对排名
+    :param country_codes: 国家代码数组（如 "CN"），未知代码对应结果为 NaN
+    :param incomes: 年收入数组
+    :param wealths: 净资产数组
+    :param country_data: 国家参数表，默认为内置 COUNTRY_DATA
+    :param quantile_tables: 可选的 {(国家代码, 指标): QuantileTable}，按国家替换对数正态模型
+    :return: dict，包含 income_percentile / income_rank / wealth_percentile / wealth_rank 四个数组
+    """
+    codes, index = np.unique(np.asarray(country_codes, dtype=str), return_inverse=True)
+    index = index.reshape(-1)
+    known = np.array([code in country_data for code in codes], dtype=bool)
+
+    def column(field):
+        # 每个出现过的国家取一次参数，再按 index 展开到每一行
+        params = np.array([country_data[c][field] if c in country_data else np.nan for c in codes], dtype=np.float64)
+        return params[index]
+
+    population = column("population")
+    inc_pct = get_log_normal_percentile_batch(incomes, *map(column, METRIC_FIELDS["income"]))
+    wlh_pct = get_log_normal_percentile_batch(wealths, *map(column, METRIC_FIELDS["wealth"]))
+    # 使用经验分位数表的国家，只对该国家的行重新计算
+    for metric, values, pct in (("income", incomes, inc_pct), ("wealth", wealths, wlh_pct)):
+        for i, code in enumerate(codes):
+            table = (quantile_tables or {}).get((code, metric))
+            if known[i] and uses_quantile_table(country_data[code], table):
+                rows = index == i
+                pct[rows] = table.percentile_batch(np.asarray(values, dtype=np.float64)[rows])
+    unknown = ~known[index]
+    inc_pct[unknown] = np.nan
+    wlh_pct[unknown] = np.nan
+
+    return {
+        "income_percentile": inc_pct,
+        "income_rank": get_absolute_rank_batch(population, inc_pct),
+        "wealth_percentile": wlh_pct,
+        "wealth_rank": get_absolute_rank_batch(population, wlh_pct),
+    }
@@ -0,0 +1,98 @@
+"""
+反向查询：给定目标排名（前 1% / 0.1% ...），求所需的收入与资产门槛
+
+主体沿用正向查询的对数正态（或经验分位数表），在 TAIL_START 以内是 get_country_percentile 的反函数；
+超过 TAIL_START 后接 Pareto 尾部：
+    S(x) = (1 - p0) · (x / x0)^(-α),  x0 为 p0 处的对数正态分位数
+α 按光滑拼接取值（x0 处两侧密度相等）：α = φ(z0) / (σ · (1 - p0))，因此 α·σ 与国家无关
+经验分位数表在表最高点以上接 Pareto 尾部，α 由最高的两个分位点估计（见 QuantileTable.tail_alpha）
+Pareto 尾部比对数正态更厚，前 0.01% 以上的门槛不再挤在一起；正向查询（结果卡片）仍为纯对数正态 / 分位数表，
+前 1% 以上两者的差异即尾部模型的差异
+
+所有目标排名一次向量化计算，整张门槛表只需一次调用
+"""
+import math
+
+import numpy as np
+
+from wealth_model import METRIC_FIELDS, norm_ppf_batch, uses_quantile_table
+
+# 从该百分位开始使用 Pareto 尾部
+TAIL_START = 0.99
+_TAIL_Z0 = 2.3263478740408408  # Φ⁻¹(0.99)
+# α·σ，与国家无关
+TAIL_RATE = math.exp(-0.5 * _TAIL_Z0 * _TAIL_Z0) / math.sqrt(2 * math.pi) / (1 - TAIL_START)
+
+# 门槛表默认列出的目标排名（前 x，占总人口的比例）
+TARGET_TOP_SHARES = (0.5, 0.25, 0.1, 0.05, 0.01, 0.005, 0.001, 0.0001, 0.00001)
+# 分位数表二分求逆的迭代次数（区间长度缩小到 2^-40）
+_BISECT_ITERATIONS = 40
+
+
+def pareto_alpha(sigma):
+    """光滑拼接的 Pareto 指数：拼接点处对数正态密度与 Pareto 密度相等"""
+    return TAIL_RATE / sigma
+
+
+def lognormal_pareto_threshold(top_shares, median, sigma):
+    """
+    对数正态主体 + Pareto 尾部的分位函数（向量化）
+    :param top_shares: 目标排名（前 x），如 0.01 表示前 1%；用上尾概率而非百分位作参数，极小的比例也不丢失精度
+    :return: 与 top_shares 同形的门槛数组
+    """
+    top_shares = np.asarray(top_shares, dtype=np.float64)
+    tail_share = 1 - TAIL_START
+    with np.errstate(all="ignore"):
+        # Φ⁻¹(1 - s) = -Φ⁻¹(s)
+        body = median * np.exp(-sigma * norm_ppf_batch(top_shares))
+        x0 = median * np.exp(-sigma * norm_ppf_batch(tail_share))
+        tail = x0 * (top_shares / tail_share) ** (-1 / pareto_alpha(sigma))
+    return np.where(top_shares < tail_share, tail, body)
+
+
+def _invert_table(table, probabilities):
+    """对分位数表的 PCHIP 插值逐区间二分求逆，结果与 table.percentile 互为反函数"""
+    p_nodes = table.probabilities
+    k = np.clip(np.searchsorted(p_nodes, probabilities, side="right") - 1, 0, len(p_nodes) - 2)
+    x0, x1 = table.log_values[k], table.log_values[k + 1]
+    lo, hi = x0.copy(), x1.copy()
+    for _ in range(_BISECT_ITERATIONS):
+        mid = 0.5 * (lo + hi)
+        below = table._interpolate(k, mid) < probabilities
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    return 0.5 * (lo + hi)
+
+
+def table_pareto_threshold(table, top_shares):
+    """
+    经验分位数表的门槛：表内用 PCHIP 的反函数；表最低点以下取最低点；
+    表最高点以上接 Pareto 尾部，与 table.percentile 使用同一个 α
+    """
+    top_shares = np.asarray(top_shares, dtype=np.float64)
+    probabilities = 1 - top_shares
+    log_values = _invert_table(table, np.clip(probabilities, table.probabilities[0], table.probabilities[-1]))
+
+    top_tail = 1 - table.probabilities[-1]
+    with np.errstate(all="ignore"):
+        tail = table.log_values[-1] - np.log(top_shares / top_tail) / table.tail_alpha
+    log_values = np.where(top_shares < top_tail, tail, log_values)
+    return np.exp(log_values)
+
+
+def country_thresholds(country, code=None, quantile_tables=None, top_shares=TARGET_TOP_SHARES):
+    """
+    一个国家的完整门槛表
+    :param country: 国家记录
+    :param code: 国家代码，用于查找分位数表
+    :return: {"top_shares": 数组, "income": 门槛数组, "wealth": 门槛数组}
+    """
+    top_shares = np.asarray(top_shares, dtype=np.float64)
+    result = {"top_shares": top_shares}
+    for metric, (median_field, shape_field) in METRIC_FIELDS.items():
+        table = (quantile_tables or {}).get((code, metric))
+        if uses_quantile_table(country, table):
+            result[metric] = table_pareto_threshold(table, top_shares)
+        else:
+            result[metric] = lognormal_pareto_threshold(top_shares, country[median_field], country[shape_field])
+    return result
@@ -0,0 +1,124 @@
+"""
+收入/资产推演：把金额按倍数扫过一个区间，画出排名随金额变化的曲线
+
+金额在 [当前金额 × 下限倍数, 当前金额 × 上限倍数] 上按对数等距取点，分块向量化计算百分位；
+run_sweep 每算完一块就产出一次已完成的部分，页面逐块刷新同一个占位元素，第一批点立即出现，
+块与块之间 Streamlit 可以响应新的交互（中止本次运行），上万个点的推演也不会卡住会话
+只有提交推演表单的那次运行才计算；完成的推演按 (国家, 指标, 起止金额, 点数, 数据版本) 放入进程级 LRU 缓存，
+其他重跑（提交收入/资产、切换年份等）只画出缓存中的结果，不重新计算
+键中是实际的起止金额而不是倍数，金额不同的会话各占一项，互不覆盖；收入/资产修改后为新的键，下次提交时重新推演
+
+曲线单调，作图时均匀抽取至多 CHART_POINTS 个点，每次刷新发送的数据量与推演点数无关
+"""
+import math
+
+import numpy as np
+
+from lru_cache import LRUCache
+from wealth_model import (
+    METRIC_FIELDS, PERCENTILE_FLOOR, format_compact_localized, get_log_normal_percentile_batch, uses_quantile_table,
+)
+
+MAX_SWEEP_POINTS = 10_000
+SWEEP_CHUNK_SIZE = 1000
+SWEEP_CACHE_SIZE = 256
+CHART_POINTS = 400
+
+SVG_WIDTH, SVG_HEIGHT = 300, 110
+PLOT_LEFT, PLOT_RIGHT = 14, 286
+PLOT_TOP, PLOT_BOTTOM = 14, 84
+
+# 键: sweep_key 的返回值，值: (金额数组, 百分位数组)
+SWEEP_CACHE = LRUCache(SWEEP_CACHE_SIZE)
+
+
+# -------------------------- 1. 计算 --------------------------
+def sweep_amounts(amount, low, high, steps):
+    """当前金额 × [low, high] 上对数等距的 steps 个金额"""
+    steps = min(max(int(steps), 2), MAX_SWEEP_POINTS)
+    return np.geomspace(amount * low, amount * high, steps)
+
+
+def percentile_batch(country, metric, values, table=None):
+    """get_country_percentile 的向量化版本：按国家选择对数正态或分位数表"""
+    if uses_quantile_table(country, table):
+        return table.percentile_batch(values)
+    median_field, shape_field = METRIC_FIELDS[metric]
+    return get_log_normal_percentile_batch(values, country[median_field], country[shape_field])
+
+
+def sweep_key(country_code, metric, amounts, data_version):
+    """推演的缓存键：(国家, 指标, 起始金额, 结束金额, 点数, 数据版本)，金额取 6 位小数"""
+    return country_code, metric, round(float(amounts[0]), 6), round(float(amounts[-1]), 6), len(amounts), data_version
+
+
+def cached_sweep(key):
+    """缓存中已完成的推演 (金额数组, 百分位数组)；没有时返回 None"""
+    return SWEEP_CACHE.get(key)
+
+
+def run_sweep(key, country, metric, amounts, table=None, chunk_size=SWEEP_CHUNK_SIZE):
+    """
+    生成器：逐块产出 (金额数组, 已完成的百分位数组)，全部完成后写入缓存；缓存命中时只产出一次完整结果
+    :param key: 缓存键，见 sweep_key
+    """
+    cached = cached_sweep(key)
+    if cached is not None:
+        yield cached
+        return
+    percentiles = np.empty(len(amounts))
+    for start in range(0, len(amounts), chunk_size):
+        end = min(start + chunk_size, len(amounts))
+        percentiles[start:end] = percentile_batch(country, metric, amounts[start:end], table)
+        yield amounts, percentiles[:end]
+    # 中途被新的运行中止时不会走到这里，缓存中只有完整的结果
+    SWEEP_CACHE.put(key, (amounts, percentiles))
+
+
+# -------------------------- 2. SVG --------------------------
+def sweep_svg(amounts, percentiles, share_range, color, currency, lang_key, marker=None):
+    """
+    排名曲线：横轴为金额（对数），纵轴为「前 x%」（对数，排名越靠前越高）
+    :param amounts: 全部推演金额，决定横轴范围；percentiles 可以只覆盖前面一部分
+    :param share_range: (最小, 最大) 的「前 x」比例，决定纵轴范围，逐块刷新时保持不变
+    :param marker: 当前金额，在区间内时画一条虚线
+    """
+    log_lo, log_hi = math.log(amounts[0]), math.log(amounts[-1])
+    x_span = (log_hi - log_lo) or 1.0
+    share_lo, share_hi = (math.log10(max(s, PERCENTILE_FLOOR)) for s in share_range)
+    if share_hi - share_lo < 1:
+        mid = (share_hi + share_lo) / 2
+        share_lo, share_hi = mid - 0.5, mid + 0.5
+
+    def x_of(amount):
+        return PLOT_LEFT + (math.log(amount) - log_lo) / x_span * (PLOT_RIGHT - PLOT_LEFT)
+
+    def y_of(pct):
+        share = math.log10(max(1 - pct, PERCENTILE_FLOOR))
+        return PLOT_TOP + (share - share_lo) / (share_hi - share_lo) * (PLOT_BOTTOM - PLOT_TOP)
+
+    done = len(percentiles)
+    index = np.unique(np.linspace(0, done - 1, min(done, CHART_POINTS)).astype(int))
+    points = [f"{x_of(a):.1f} {y_of(p):.1f}" for a, p in zip(amounts[index].tolist(), percentiles[index].tolist())]
+    last_x, last_y = points[-1].split()
+    last_top = (1 - float(percentiles[-1])) * 100
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+        f'style="width:100%;height:auto;display:block">',
+        f'<path d="M{PLOT_LEFT} {PLOT_BOTTOM}H{PLOT_RIGHT}" stroke="#e2e8f0" stroke-width="1"/>',
+    ]
+    if marker is not None and amounts[0] <= marker <= amounts[-1]:
+        parts.append(f'<path d="M{x_of(marker):.1f} {PLOT_TOP}V{PLOT_BOTTOM}" stroke="#94a3b8" stroke-width="1" '
+                     f'stroke-dasharray="2 2"/>')
+    if len(points) > 1:
+        parts.append(f'<path d="M{"L".join(points)}" fill="none" stroke="{color}" stroke-width="1.5"/>')
+    parts.append(f'<circle cx="{last_x}" cy="{last_y}" r="2.5" fill="{color}"/>')
+    anchor = "end" if float(last_x) > SVG_WIDTH / 2 else "start"
+    parts.append(f'<text x="{last_x}" y="{max(float(last_y) - 5, 8):.1f}" font-size="8" fill="{color}" '
+                 f'text-anchor="{anchor}">{last_top:.2g}%</text>')
+    for amount, anchor in ((amounts[0], "start"), (amounts[-1], "end")):
+        parts.append(f'<text x="{x_of(amount):.1f}" y="{SVG_HEIGHT - 4}" font-size="8" fill="#94a3b8" '
+                     f'text-anchor="{anchor}">{currency}{format_compact_localized(amount, lang_key)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)